@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, collapses whitespace and drops trailing punctuation."""
+    return " ".join(query.casefold().split()).rstrip(" ?!.")
+
+
+@dataclass
+class _Entry:
+    result: dict
+    vector: Optional[np.ndarray]
+    created_at: float
+
+
+class AnswerCache:
+    """
+    Cache of RAG pipeline results keyed by the normalised question.
+
+    Lookups first try an exact match on the normalised question, then (with a
+    query embedding) the most similar cached question, which must reach
+    ``similarity_threshold`` cosine similarity. Entries expire after
+    ``ttl_seconds`` and the least recently used are evicted beyond
+    ``max_entries``.
+
+    Every lookup and store passes the VectorDatabase ``version`` it is working
+    against; when the version moves on, the whole cache is dropped, because any
+    answer may depend on the chunks that changed.
+    Usage:
+        cache = AnswerCache(max_entries=1000, ttl_seconds=3600)
+        pipeline = RetrievalAugmentedQAPipeline(llm, vector_db, answer_cache=cache)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = 3600.0,
+        similarity_threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        # Stacked, unit-normalised query vectors for similarity lookups; rebuilt after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[Tuple[Hashable, str]] = []
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _sync_version(self, version: int) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def get(self, query: str, params: Hashable, version: int) -> Optional[dict]:
+        """Returns the cached result for this exact (normalised) question, or None."""
+        key = (params, normalize_query(query))
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.monotonic()):
+                del self._entries[key]
+                self._matrix = None
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.result
+
+    def get_similar(
+        self, query_vector, params: Hashable, version: int
+    ) -> Optional[dict]:
+        """Returns the result cached for the most similar question above the threshold, or None."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(version)
+            if self._matrix is None:
+                self._matrix_keys = [
+                    key for key, entry in self._entries.items() if entry.vector is not None
+                ]
+                self._matrix = (
+                    np.stack([self._entries[key].vector for key in self._matrix_keys])
+                    if self._matrix_keys
+                    else np.empty((0, query.shape[0]), dtype=np.float32)
+                )
+            if self._matrix.shape[0] == 0 or self._matrix.shape[1] != query.shape[0]:
+                return None
+            scores = self._matrix @ query
+            for row in np.argsort(-scores):
+                if scores[row] < self.similarity_threshold:
+                    break
+                key = self._matrix_keys[row]
+                entry = self._entries.get(key)
+                if key[0] != params or entry is None or self._expired(entry, now):
+                    continue
+                self._entries.move_to_end(key)
+                self.semantic_hits += 1
+                return entry.result
+            return None
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def put(
+        self,
+        query: str,
+        params: Hashable,
+        version: int,
+        result: dict,
+        query_vector=None,
+    ) -> None:
+        """
+        Stores ``result``; it is dropped if the database has changed since
+        ``version`` was read, since the answer may already be stale.
+        """
+        vector = None
+        if query_vector is not None:
+            vector = np.asarray(query_vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        key = (params, normalize_query(query))
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return
+            self._sync_version(version)
+            self._entries[key] = _Entry(result, vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -0,0 +1,146 @@
+import math
+import re
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Word runs, with CJK ideographs and kana split into single characters since
+# those scripts do not separate words with spaces.
+_TOKEN = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]|[^\W\u3040-\u30ff\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring.
+
+    Each document is stored under a string key; a posting list per term holds
+    the ids of the documents containing it and the term frequencies. A query is
+    scored only against the postings of its own terms, so lexical lookups cost
+    time proportional to the matching documents rather than the corpus.
+    Usage:
+        index = BM25Index()
+        index.add("doc-1", "The mayor election results")
+        index.search("mayor election", k=5)
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys: List[str] = []
+        self._key_to_id: Dict[str, int] = {}
+        self._doc_lengths: List[int] = []
+        self._total_length = 0
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # Posting lists as arrays, rebuilt lazily after inserts touch a term
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths_array: Optional[np.ndarray] = None
+        # Removed documents stay in the postings until the index is rebuilt
+        self._removed: set = set()
+        self._removed_array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._key_to_id)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_to_id
+
+    def add(self, key: str, text: Optional[str] = None) -> None:
+        """Indexes ``text`` (the key itself by default); keys already indexed are skipped."""
+        if key in self._key_to_id:
+            return
+        doc_id = len(self.keys)
+        self.keys.append(key)
+        self._key_to_id[key] = doc_id
+        terms = Counter(tokenize(key if text is None else text))
+        length = sum(terms.values())
+        self._doc_lengths.append(length)
+        self._total_length += length
+        for term, frequency in terms.items():
+            doc_ids, frequencies = self._postings.setdefault(term, ([], []))
+            doc_ids.append(doc_id)
+            frequencies.append(frequency)
+            self._posting_arrays.pop(term, None)
+
+    def remove(self, key: str) -> bool:
+        doc_id = self._key_to_id.pop(key, None)
+        if doc_id is None:
+            return False
+        self._removed.add(doc_id)
+        self._removed_array = None
+        self._total_length -= self._doc_lengths[doc_id]
+        return True
+
+    def add_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def _posting_array(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            arrays = (
+                np.asarray(postings[0], dtype=np.int64),
+                np.asarray(postings[1], dtype=np.float32),
+            )
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def search(
+        self, query: str, k: int, allowed: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Returns up to ``k`` (key, BM25 score) pairs; documents sharing no term
+        with the query, or whose key is not in ``allowed`` (when given), are omitted.
+        """
+        n_docs = len(self._key_to_id)
+        if n_docs == 0 or k <= 0:
+            return []
+        if self._lengths_array is None or len(self._lengths_array) != len(self.keys):
+            self._lengths_array = np.asarray(self._doc_lengths, dtype=np.float32)
+        lengths = self._lengths_array
+        average_length = self._total_length / n_docs or 1.0
+
+        matched_ids, matched_scores = [], []
+        for term in set(tokenize(query)):
+            arrays = self._posting_array(term)
+            if arrays is None:
+                continue
+            doc_ids, frequencies = arrays
+            # Posting lists still count removed documents until the index is
+            # rebuilt, which slightly underestimates idf but keeps it positive
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / average_length)
+            matched_ids.append(doc_ids)
+            matched_scores.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+        if not matched_ids:
+            return []
+
+        doc_ids = np.concatenate(matched_ids)
+        unique_ids, positions = np.unique(doc_ids, return_inverse=True)
+        totals = np.zeros(len(unique_ids), dtype=np.float32)
+        np.add.at(totals, positions, np.concatenate(matched_scores))
+        if self._removed:
+            if self._removed_array is None:
+                self._removed_array = np.fromiter(self._removed, dtype=np.int64)
+            keep = ~np.isin(unique_ids, self._removed_array)
+            unique_ids, totals = unique_ids[keep], totals[keep]
+        if allowed is not None:
+            keep = np.fromiter(
+                (self.keys[doc_id] in allowed for doc_id in unique_ids.tolist()),
+                dtype=bool,
+                count=len(unique_ids),
+            )
+            unique_ids, totals = unique_ids[keep], totals[keep]
+        if len(unique_ids) == 0:
+            return []
+        k = min(k, len(unique_ids))
+        top = np.argpartition(-totals, k - 1)[:k]
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return [(self.keys[unique_ids[i]], float(totals[i])) for i in top]
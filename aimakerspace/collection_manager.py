@@ -0,0 +1,238 @@
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+@dataclass
+class _LoadedCollection:
+    db: VectorDatabase
+    saved_version: int
+    pins: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class CollectionManager:
+    """
+    Named, isolated VectorDatabase collections (e.g. one per user or session),
+    each saved in its own directory under ``root``.
+
+    Collections are loaded on first use (memory-mapped, see
+    ``VectorDatabase.load``) and kept in an LRU of at most ``max_loaded``.
+    Beyond that, and whenever ``evict_idle`` runs, the least recently used
+    unpinned collections are dropped from memory and saved if they changed.
+    Only that decision is taken under the manager's lock; saving happens
+    outside it, so requests for other collections never wait on disk I/O.
+    ``get`` does not save at all: collections it pushes over capacity are
+    written by the next ``write_evicted`` call, which callers on an event
+    loop should run in a worker thread. Until then (and while being written)
+    an evicted collection stays in memory and ``get`` hands it back.
+    Pin a collection while something writes to it in the background, such as
+    an ingestion job, so it is never evicted mid-write.
+    Usage:
+        manager = CollectionManager("vector_store/collections", embedding_model)
+        db = manager.get("alice", create=True)
+        await asyncio.to_thread(manager.write_evicted)
+        manager.pin("alice")
+        ...
+        manager.unpin("alice")
+    """
+
+    NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+    def __init__(self, root: str, embedding_model, max_loaded: int = 16):
+        self.root = root
+        self.embedding_model = embedding_model
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[str, _LoadedCollection]" = OrderedDict()
+        # Evicted collections until their save completes, and those not yet being saved
+        self._evicting: Dict[str, _LoadedCollection] = {}
+        self._unwritten: List[str] = []
+        # Reentrant: pin() calls get() while holding it
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        if not self.NAME_PATTERN.match(name):
+            raise ValueError(
+                "Collection names must be 1-64 letters, digits, '-' or '_', "
+                f"got '{name}'"
+            )
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return (
+                name in self._loaded
+                or name in self._evicting
+                or os.path.isfile(os.path.join(self._path(name), VectorDatabase.SIDECAR_FILENAME))
+            )
+
+    def get(self, name: str, create: bool = False) -> VectorDatabase:
+        """
+        Returns the collection's database, loading it from disk if needed.
+
+        :raises KeyError: if the collection does not exist and ``create`` is False
+        """
+        path = self._path(name)
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is None:
+                # Evicted but possibly not written yet: the in-memory copy is the current one
+                entry = self._evicting.get(name)
+                if entry is not None:
+                    del self._evicting[name]
+                elif os.path.isfile(os.path.join(path, VectorDatabase.SIDECAR_FILENAME)):
+                    db = VectorDatabase.load(path, embedding_model=self.embedding_model)
+                    entry = _LoadedCollection(db, saved_version=db.version)
+                    self.loads += 1
+                elif create:
+                    db = VectorDatabase(embedding_model=self.embedding_model, storage="matrix")
+                    # Never saved, so even an empty new collection is written on eviction
+                    entry = _LoadedCollection(db, saved_version=-1)
+                else:
+                    raise KeyError(name)
+                self._loaded[name] = entry
+                self._detach_over_capacity()
+            self._loaded.move_to_end(name)
+            entry.last_used = time.monotonic()
+            return entry.db
+
+    def pin(self, name: str) -> VectorDatabase:
+        """Like ``get(name, create=True)``, and keeps the collection loaded until ``unpin``."""
+        with self._lock:
+            db = self.get(name, create=True)
+            self._loaded[name].pins += 1
+            return db
+
+    def unpin(self, name: str) -> None:
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None and entry.pins > 0:
+                entry.pins -= 1
+                entry.last_used = time.monotonic()
+
+    def _write(self, name: str, entry: _LoadedCollection) -> None:
+        # Called without the lock. save() writes a snapshot and returns its
+        # version, so writes made during the save leave the collection marked
+        # as changed and are picked up by the next one
+        if entry.db.version != entry.saved_version:
+            entry.saved_version = entry.db.save(self._path(name))
+
+    def save(self, name: str) -> None:
+        with self._lock:
+            entry = self._loaded.get(name) or self._evicting.get(name)
+        if entry is not None:
+            self._write(name, entry)
+
+    def save_all(self) -> None:
+        with self._lock:
+            names = list(self._loaded)
+        for name in names:
+            self.save(name)
+        self.write_evicted()
+
+    def _detach(self, name: str) -> bool:
+        """Unloads an unpinned collection, leaving it to be written; call with the lock held."""
+        entry = self._loaded.get(name)
+        if entry is None or entry.pins > 0:
+            return False
+        del self._loaded[name]
+        self._evicting[name] = entry
+        self._unwritten.append(name)
+        self.evictions += 1
+        return True
+
+    def _detach_over_capacity(self) -> None:
+        for name in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            self._detach(name)
+
+    def write_evicted(self) -> List[str]:
+        """Saves the collections evicted but not yet written; returns their names."""
+        written = []
+        while True:
+            with self._lock:
+                if not self._unwritten:
+                    return written
+                name = self._unwritten.pop(0)
+                entry = self._evicting.get(name)
+            if entry is None:  # reloaded by get() in the meantime
+                continue
+            try:
+                self._write(name, entry)
+            finally:
+                with self._lock:
+                    if self._evicting.get(name) is entry:
+                        del self._evicting[name]
+            written.append(name)
+
+    @property
+    def unwritten(self) -> int:
+        """Number of evicted collections waiting for ``write_evicted``."""
+        return len(self._unwritten)
+
+    def evict(self, name: str) -> bool:
+        """Saves (if changed) and unloads an unpinned collection; returns whether it was evicted."""
+        with self._lock:
+            evicted = self._detach(name)
+        if evicted:
+            self.write_evicted()
+        return evicted
+
+    def evict_idle(self, idle_seconds: float) -> List[str]:
+        """Evicts unpinned collections unused for ``idle_seconds``; returns their names."""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            idle = [name for name, entry in self._loaded.items() if entry.last_used < cutoff]
+            evicted = [name for name in idle if self._detach(name)]
+        self.write_evicted()
+        return evicted
+
+    def delete(self, name: str) -> bool:
+        """
+        Removes a collection from memory and disk; returns False if it was
+        pinned, missing or is still being written after an eviction.
+        """
+        path = self._path(name)
+        with self._lock:
+            if name in self._evicting:
+                return False
+            entry = self._loaded.get(name)
+            if entry is not None:
+                if entry.pins > 0:
+                    return False
+                del self._loaded[name]
+            elif not os.path.isdir(path):
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+            return True
+
+    def names(self) -> List[str]:
+        with self._lock:
+            on_disk = {
+                name
+                for name in os.listdir(self.root)
+                if self.NAME_PATTERN.match(name)
+                and os.path.isfile(os.path.join(self.root, name, VectorDatabase.SIDECAR_FILENAME))
+            }
+            return sorted(on_disk | set(self._loaded) | set(self._evicting))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": {name: len(entry.db) for name, entry in self._loaded.items()},
+                "unwritten": self.unwritten,
+                "max_loaded": self.max_loaded,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
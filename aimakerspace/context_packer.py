@@ -0,0 +1,199 @@
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from aimakerspace.bm25_index import tokenize
+from aimakerspace.tokenizer import count_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+")
+# Too common to tell a relevant sentence from an irrelevant one
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how in is it its of on or "
+    "the their this to was were what when where which who why will with".split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+
+@dataclass
+class PackedContext:
+    """The packed (text, score) passages plus the token counts before and after packing."""
+
+    contexts: List[Tuple[str, float]] = field(default_factory=list)
+    chunks_in: int = 0
+    chunks_merged: int = 0
+    chunks_dropped: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["contexts"]
+        data["tokens_saved"] = self.tokens_saved
+        return data
+
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks into the context sent to the LLM.
+
+    Chunks are packed in four steps:
+      1. chunks scoring below ``min_score``, or below ``min_relative_score`` times
+         the best score (which works for any search mode's score scale), are dropped;
+      2. chunks from the same source document that overlap or touch (see the
+         ``doc_id``/``start``/``end`` metadata written by ``split_documents``) are
+         merged into one passage, so the splitter's overlap is sent only once;
+      3. with ``extract_sentences``, each passage is cut down to the sentences
+         sharing a word with the question (passages with no such sentence are
+         kept whole, as they were retrieved for their meaning);
+      4. passages are added best-first until ``max_tokens`` is reached; the one
+         that crosses the budget is trimmed to whole sentences.
+    Usage:
+        packer = ContextPacker(max_tokens=2000, min_relative_score=0.5)
+        packed = packer.pack(question, vector_db.search_by_text(question, k=8), vector_db.get_metadata)
+        print(packed.tokens_saved)
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = 3000,
+        min_score: Optional[float] = None,
+        min_relative_score: Optional[float] = None,
+        merge_overlaps: bool = True,
+        extract_sentences: bool = False,
+    ):
+        self.max_tokens = max_tokens
+        self.min_score = min_score
+        self.min_relative_score = min_relative_score
+        self.merge_overlaps = merge_overlaps
+        self.extract_sentences = extract_sentences
+        self.queries = 0
+        self.tokens_in = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def pack(
+        self,
+        query: str,
+        contexts: List[Tuple[str, float]],
+        get_metadata: Optional[Callable[[str], Optional[dict]]] = None,
+    ) -> PackedContext:
+        """Packs (text, score) pairs, best first; ``get_metadata`` maps a chunk to its metadata."""
+        packed = PackedContext(chunks_in=len(contexts))
+        packed.tokens_in = sum(count_tokens(text) for text, _ in contexts)
+
+        kept = self._above_threshold(contexts)
+        packed.chunks_dropped = len(contexts) - len(kept)
+        passages = self._merge(kept, get_metadata) if self.merge_overlaps and get_metadata else kept
+        packed.chunks_merged = len(kept) - len(passages)
+        if self.extract_sentences:
+            terms = set(tokenize(query)) - _STOPWORDS
+            passages = [(self._relevant_sentences(text, terms), score) for text, score in passages]
+
+        budget = self.max_tokens
+        for text, score in passages:
+            tokens = count_tokens(text)
+            if budget is not None and tokens > budget:
+                text = self._trim(text, budget)
+                if not text:
+                    continue
+                tokens = count_tokens(text)
+            packed.contexts.append((text, score))
+            packed.tokens_out += tokens
+            if budget is not None:
+                budget -= tokens
+        packed.chunks_dropped += len(passages) - len(packed.contexts)
+
+        with self._lock:
+            self.queries += 1
+            self.tokens_in += packed.tokens_in
+            self.tokens_saved += packed.tokens_saved
+        return packed
+
+    def _above_threshold(self, contexts: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        if not contexts:
+            return []
+        cutoff = self.min_score
+        if self.min_relative_score is not None:
+            best = max(score for _, score in contexts)
+            relative = best * self.min_relative_score
+            cutoff = relative if cutoff is None else max(cutoff, relative)
+        if cutoff is None:
+            return list(contexts)
+        return [(text, score) for text, score in contexts if score >= cutoff]
+
+    @staticmethod
+    def _merge(
+        contexts: List[Tuple[str, float]], get_metadata: Callable[[str], Optional[dict]]
+    ) -> List[Tuple[str, float]]:
+        """Merges overlapping or adjacent chunks of one document; passages keep their best score."""
+        passages = []  # [text, score, group, start, end]
+        spans = {}
+        for text, score in contexts:
+            metadata = get_metadata(text) or {}
+            start, end = metadata.get("start"), metadata.get("end")
+            # Offsets must describe this exact text, or the merge could drop characters.
+            # Without a source the chunk's document is unknown, so it is never merged.
+            if (
+                metadata.get("source") is None
+                or not isinstance(start, int)
+                or not isinstance(end, int)
+                or end - start != len(text)
+            ):
+                passages.append([text, score, None, None, None])
+                continue
+            group = (metadata.get("source"), metadata.get("doc_id"))
+            spans.setdefault(group, []).append(len(passages))
+            passages.append([text, score, group, start, end])
+
+        for indices in spans.values():
+            indices.sort(key=lambda i: passages[i][3])
+            current = passages[indices[0]]
+            for i in indices[1:]:
+                passage = passages[i]
+                if passage[3] > current[4]:
+                    current = passage
+                    continue
+                if passage[4] > current[4]:
+                    current[0] += passage[0][current[4] - passage[3]:]
+                    current[4] = passage[4]
+                current[1] = max(current[1], passage[1])
+                passage[0] = None
+
+        merged = [(text, score) for text, score, *_ in passages if text is not None]
+        merged.sort(key=lambda passage: passage[1], reverse=True)
+        return merged
+
+    @staticmethod
+    def _relevant_sentences(text: str, terms: set) -> str:
+        sentences = split_sentences(text)
+        relevant = [sentence for sentence in sentences if terms.intersection(tokenize(sentence))]
+        return " ".join(relevant) if relevant else text
+
+    @staticmethod
+    def _trim(text: str, budget: int) -> str:
+        """The longest prefix of whole sentences within ``budget`` tokens, or ""."""
+        kept, used = [], 0
+        for sentence in split_sentences(text):
+            tokens = count_tokens(sentence)
+            if used + tokens > budget:
+                break
+            kept.append(sentence)
+            used += tokens
+        return " ".join(kept)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "tokens_in": self.tokens_in,
+                "tokens_saved": self.tokens_saved,
+                "max_tokens": self.max_tokens,
+            }
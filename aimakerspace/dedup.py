@@ -0,0 +1,255 @@
+import hashlib
+import re
+import threading
+import zlib
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from aimakerspace.tokenizer import count_tokens_many
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class DedupReport:
+    """Counts of chunks seen, dropped and kept by a ChunkDeduplicator."""
+
+    chunks_in: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    tokens_saved: int = 0
+
+    @property
+    def chunks_saved(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    @property
+    def chunks_kept(self) -> int:
+        return self.chunks_in - self.chunks_saved
+
+    def add(self, other: "DedupReport") -> None:
+        self.chunks_in += other.chunks_in
+        self.exact_duplicates += other.exact_duplicates
+        self.near_duplicates += other.near_duplicates
+        self.tokens_saved += other.tokens_saved
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["chunks_saved"] = self.chunks_saved
+        data["chunks_kept"] = self.chunks_kept
+        return data
+
+
+class ChunkDeduplicator:
+    """
+    Drops duplicate chunks before they are embedded.
+
+    Exact duplicates are detected by a SHA-256 of the whitespace-normalised
+    text. With ``near_duplicates=True``, chunks whose word-shingle Jaccard
+    similarity to an earlier chunk is estimated (by MinHash) to be at least
+    ``threshold`` are dropped too, which catches repeated headers, footers and
+    boilerplate pages that differ only in page numbers or dates. Candidate
+    pairs are found with LSH banding, so each chunk is compared against a
+    handful of earlier chunks rather than all of them.
+
+    The first chunk seen wins; later duplicates are dropped together with
+    their metadata. State is kept across calls, so one deduplicator can cover
+    many batches and documents; chunks deleted from the index must be passed
+    to ``forget``, or their later re-insertion would be dropped as a duplicate.
+
+    When ``filter`` is given the chunks' metadata, every kept chunk remembers
+    the documents (``owner_field`` values) holding it, including those whose
+    copy was dropped, with each one's metadata. ``release`` removes a document
+    from those owners before it is deleted or replaced, so chunks that other
+    documents still contain are kept.
+    Usage:
+        deduplicator = ChunkDeduplicator(near_duplicates=True)
+        await vector_db.abuild_from_list(chunks, deduplicator=deduplicator)
+        print(deduplicator.report.to_dict())
+    """
+
+    def __init__(
+        self,
+        near_duplicates: bool = False,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 0,
+        owner_field: str = "source",
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.owner_field = owner_field
+        self.report = DedupReport()
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self._hashes: Set[bytes] = set()
+        # Forgotten signatures leave a None, so bucket indices stay valid
+        self._signatures: List[Optional[np.ndarray]] = []
+        self._signature_index: Dict[bytes, int] = {}
+        self._signature_digests: List[bytes] = []
+        # Kept chunk digest -> its text and {owner: metadata}; owner -> digests it holds
+        self._texts: Dict[bytes, str] = {}
+        self._owners: Dict[bytes, Dict[Any, dict]] = {}
+        self._owned: Dict[Any, Set[bytes]] = defaultdict(set)
+        self._buckets: Dict[tuple, List[int]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))
+        }
+        return np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of ``text``'s word shingles (``num_perm`` values)."""
+        shingles = self._shingles(text)
+        # (a * x + b) mod p stays below 2**64 because a, x, b < 2**32
+        hashed = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[tuple]:
+        rows = self.num_perm // self.bands
+        return [
+            (band, signature[band * rows : (band + 1) * rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _near_duplicate_of(self, signature: np.ndarray, band_keys: List[tuple]) -> Optional[bytes]:
+        """Digest of an earlier chunk ``signature`` nearly duplicates, if any."""
+        candidates = {index for key in band_keys for index in self._buckets.get(key, ())}
+        for index in sorted(candidates):
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                return self._signature_digests[index]
+        return None
+
+    def _add_owner(self, digest: bytes, metadata: Optional[dict]) -> None:
+        owner = (metadata or {}).get(self.owner_field)
+        if owner is not None and digest in self._texts:
+            self._owners[digest][owner] = metadata
+            self._owned[owner].add(digest)
+
+    def filter(
+        self, texts: List[str], metadatas: Optional[List[Optional[dict]]] = None
+    ) -> Tuple[List[int], DedupReport]:
+        """
+        Returns the indices of ``texts`` to keep, in order, and the counts for
+        this call, which are also added to the running ``report``. With
+        ``metadatas`` (aligned with ``texts``), each chunk's document is
+        recorded as an owner of the kept chunk it matches.
+        """
+        keep, dropped, report = [], [], DedupReport(chunks_in=len(texts))
+        if metadatas is None:
+            metadatas = [None] * len(texts)
+        with self._lock:
+            for index, (text, metadata) in enumerate(zip(texts, metadatas)):
+                digest = hashlib.sha256(self._normalize(text).encode("utf-8")).digest()
+                if digest in self._hashes:
+                    report.exact_duplicates += 1
+                    dropped.append(text)
+                    self._add_owner(digest, metadata)
+                    continue
+                if self.near_duplicates:
+                    signature = self.signature(text)
+                    band_keys = self._band_keys(signature)
+                    original = self._near_duplicate_of(signature, band_keys)
+                    if original is not None:
+                        report.near_duplicates += 1
+                        dropped.append(text)
+                        self._add_owner(original, metadata)
+                        continue
+                    for key in band_keys:
+                        self._buckets[key].append(len(self._signatures))
+                    self._signature_index[digest] = len(self._signatures)
+                    self._signatures.append(signature)
+                    self._signature_digests.append(digest)
+                self._hashes.add(digest)
+                self._texts[digest] = text
+                self._owners[digest] = {}
+                self._add_owner(digest, metadata)
+                keep.append(index)
+            report.tokens_saved = sum(count_tokens_many(dropped)) if dropped else 0
+            self.report.add(report)
+        return keep, report
+
+    def forget(self, texts: Iterable[str]) -> int:
+        """
+        Stops treating ``texts`` as seen (e.g. after their chunks were deleted),
+        so they and their near-duplicates are kept again. Returns how many were known.
+        """
+        forgotten = 0
+        with self._lock:
+            for text in texts:
+                digest = hashlib.sha256(self._normalize(text).encode("utf-8")).digest()
+                if digest not in self._hashes:
+                    continue
+                self._hashes.discard(digest)
+                forgotten += 1
+                self._texts.pop(digest, None)
+                for owner in self._owners.pop(digest, {}):
+                    self._owned[owner].discard(digest)
+                index = self._signature_index.pop(digest, None)
+                if index is None:
+                    continue
+                for key in self._band_keys(self._signatures[index]):
+                    bucket = self._buckets[key]
+                    bucket.remove(index)
+                    if not bucket:
+                        del self._buckets[key]
+                self._signatures[index] = None
+        return forgotten
+
+    def release(self, owner: Any) -> Dict[str, dict]:
+        """
+        Removes ``owner`` (e.g. a source filename about to be deleted or
+        replaced) from the owners of the chunks it holds. Chunks left without
+        owners are forgotten; for those other documents still hold, returns
+        chunk text -> the metadata of one remaining owner.
+        """
+        shared, orphaned = {}, []
+        with self._lock:
+            for digest in self._owned.pop(owner, set()):
+                owners = self._owners.get(digest)
+                if owners is None:
+                    continue
+                owners.pop(owner, None)
+                if owners:
+                    shared[self._texts[digest]] = next(iter(owners.values()))
+                else:
+                    orphaned.append(self._texts[digest])
+        self.forget(orphaned)
+        return shared
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hashes.clear()
+            self._signatures.clear()
+            self._signature_index.clear()
+            self._signature_digests.clear()
+            self._texts.clear()
+            self._owners.clear()
+            self._owned.clear()
+            self._buckets.clear()
+            self.report = DedupReport()
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from aimakerspace.bm25_index import tokenize
+
+
+class EmbeddingBackend:
+    """
+    Interface shared by every embedding model the VectorDatabase can use.
+
+    Subclasses set ``embeddings_model_name`` (recorded with saved stores, so a
+    store is never queried with vectors from another model) and implement
+    ``get_embeddings``; the single-text and async variants default to it, with
+    the async ones run in a worker thread so they never block the event loop.
+    """
+
+    embeddings_model_name: str = "unknown"
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.get_embeddings, list_of_text)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embeddings([text]))[0]
+
+    async def abatch_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        """Embeds an arbitrarily long list of texts, in input order."""
+        return await self.async_get_embeddings(list_of_text)
+
+    def cache_stats(self) -> Optional[dict]:
+        return None
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+class HashedTfidfEmbedding(EmbeddingBackend):
+    """
+    CPU-only local embeddings: hashed TF-IDF features projected to ``dimension``.
+
+    Each word and (with ``ngram_range=(1, 2)``) word pair of a text is hashed
+    to one of ``dimension`` columns with a random sign, weighted by a sublinear
+    term frequency (1 + log tf) and, once ``fit`` has been called on a corpus,
+    by its smoothed inverse document frequency; the vector is then
+    unit-normalised. Vectors need no network call and take microseconds, but
+    match on shared words rather than meaning, so recall on paraphrases is
+    lower than with a trained model.
+
+    Large inputs are embedded in batches of ``batch_size`` texts on a thread
+    pool. The IDF table can be saved and reloaded with ``idf_path``; it is part
+    of ``embeddings_model_name``, so a store embedded without it (or with
+    another one) refuses to load with this model.
+    Usage:
+        model = HashedTfidfEmbedding(dimension=512).fit(chunks)
+        vector_db = VectorDatabase(embedding_model=model, storage="matrix")
+    """
+
+    # Document frequencies are counted over this many hash buckets
+    IDF_BUCKETS = 1 << 20
+
+    def __init__(
+        self,
+        dimension: int = 512,
+        ngram_range: Tuple[int, int] = (1, 2),
+        idf_path: Optional[str] = None,
+        batch_size: int = 256,
+        max_workers: Optional[int] = None,
+    ):
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.idf_path = idf_path
+        self.batch_size = batch_size
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.idf: Optional[np.ndarray] = None
+        if idf_path and os.path.isfile(idf_path):
+            self.idf = np.load(idf_path)
+
+    @property
+    def embeddings_model_name(self) -> str:
+        name = f"hashed-tfidf-{self.dimension}-ngram{self.ngram_range[0]}{self.ngram_range[1]}"
+        if self.idf is not None:
+            name += f"-idf{zlib.crc32(self.idf.tobytes()):08x}"
+        return name
+
+    def _features(self, text: str) -> Iterable[str]:
+        words = tokenize(text)
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            if n == 1:
+                yield from words
+            else:
+                for i in range(len(words) - n + 1):
+                    yield " ".join(words[i : i + n])
+
+    def fit(self, texts: Iterable[str]) -> "HashedTfidfEmbedding":
+        """Learns IDF weights from ``texts`` (and saves them to ``idf_path``, if set)."""
+        document_frequency = np.zeros(self.IDF_BUCKETS, dtype=np.int64)
+        n_documents = 0
+        for text in texts:
+            buckets = {_feature_hash(feature) % self.IDF_BUCKETS for feature in self._features(text)}
+            if buckets:
+                document_frequency[np.fromiter(buckets, dtype=np.int64, count=len(buckets))] += 1
+            n_documents += 1
+        self.idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+        if self.idf_path:
+            os.makedirs(os.path.dirname(self.idf_path) or ".", exist_ok=True)
+            with open(self.idf_path, "wb") as f:
+                np.save(f, self.idf)
+        return self
+
+    def _embed_batch(self, list_of_text: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(list_of_text), self.dimension), dtype=np.float32)
+        for row, text in enumerate(list_of_text):
+            counts = {}
+            for feature in self._features(text):
+                hashed = _feature_hash(feature)
+                counts[hashed] = counts.get(hashed, 0) + 1
+            if not counts:
+                continue
+            hashes = np.fromiter(counts, dtype=np.int64, count=len(counts))
+            weights = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            if self.idf is not None:
+                weights *= self.idf[hashes % self.IDF_BUCKETS]
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dimension, signs * weights)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="hashed-tfidf"
+            )
+        return self._executor
+
+    def _batches(self, list_of_text: List[str]) -> List[List[str]]:
+        return [
+            list_of_text[start : start + self.batch_size]
+            for start in range(0, len(list_of_text), self.batch_size)
+        ]
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        """Unit-normalised float32 vectors, one per text."""
+        if len(list_of_text) <= self.batch_size:
+            return list(self._embed_batch(list_of_text))
+        matrices = self._pool().map(self._embed_batch, self._batches(list_of_text))
+        return [vector for matrix in matrices for vector in matrix]
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        # Small enough to run inline, even from the event loop
+        return self._embed_batch([text])[0]
+
+    async def async_get_embedding(self, text: str) -> np.ndarray:
+        return self.get_embedding(text)
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        matrices = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._pool(), self._embed_batch, batch)
+                for batch in self._batches(list_of_text)
+            )
+        )
+        return [vector for matrix in matrices for vector in matrix]
+
+
+EMBEDDING_BACKENDS = ("openai", "hashed-tfidf")
+
+
+def create_embedding_backend(name: str = "openai", **options) -> EmbeddingBackend:
+    """
+    Builds the embedding backend configured by ``name``: "openai" (the
+    ``EmbeddingModel`` API client) or "hashed-tfidf" (``HashedTfidfEmbedding``);
+    ``options`` go to its constructor.
+    """
+    if name == "openai":
+        # Imported here so the local backend works without the OpenAI dependencies
+        from aimakerspace.openai_utils.embedding import EmbeddingModel
+
+        return EmbeddingModel(**options)
+    if name == "hashed-tfidf":
+        return HashedTfidfEmbedding(**options)
+    raise ValueError(f"Unknown embedding backend '{name}'; expected one of {EMBEDDING_BACKENDS}")
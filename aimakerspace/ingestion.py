@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Callable, List, Optional
+
+from aimakerspace.dedup import ChunkDeduplicator
+from aimakerspace.text_utils import CharacterTextSplitter, Document
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+@dataclass
+class IngestionJob:
+    """Status record for one uploaded file moving through the ingestion queue."""
+
+    job_id: str
+    path: str
+    filename: str
+    status: str = "queued"  # queued -> running -> completed | failed
+    chunks_total: int = 0
+    chunks_done: int = 0
+    chunks_deduplicated: int = 0
+    tokens_saved: int = 0
+    chunks_deleted: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    delete_file: bool = True
+    collection: Optional[str] = None
+    # Per-job targets; None means the queue's own vector_db and deduplicator
+    _vector_db: Optional[VectorDatabase] = field(default=None, repr=False)
+    _deduplicator: Optional[ChunkDeduplicator] = field(default=None, repr=False)
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if not f.name.startswith("_") and f.name not in ("path", "delete_file")
+        }
+
+    async def wait(self) -> "IngestionJob":
+        await self._done.wait()
+        return self
+
+
+class IngestionQueue:
+    """
+    Background ingestion of uploaded files into a live VectorDatabase.
+
+    Each job is parsed in a worker thread, split, then embedded and inserted in
+    batches of ``embed_batch_size`` chunks, so new chunks become searchable as
+    soon as their batch is embedded and queries keep being served in between.
+    An optional ``deduplicator`` is shared by all jobs, so chunks repeated
+    across uploads are embedded only once. A job can target another
+    VectorDatabase (e.g. a tenant's collection) and deduplicator instead.
+
+    With ``replace_existing``, uploading a file whose name is already stored
+    replaces it: once the new version is in, chunks of the old version that no
+    longer appear are deleted. When deleted rows exceed ``compact_threshold`` of
+    the database it is compacted in the background of the worker.
+    Usage:
+        queue = IngestionQueue(vector_db, loader_factory=get_loader_for_file)
+        await queue.start()
+        job = queue.submit("/tmp/upload.pdf", "report.pdf")
+        await job.wait()
+    """
+
+    def __init__(
+        self,
+        vector_db: VectorDatabase,
+        loader_factory: Callable[[str, str], object],
+        splitter: Optional[CharacterTextSplitter] = None,
+        num_workers: int = 2,
+        embed_batch_size: int = 256,
+        max_jobs_kept: int = 1000,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        replace_existing: bool = True,
+        compact_threshold: Optional[float] = 0.25,
+    ):
+        self.vector_db = vector_db
+        self.loader_factory = loader_factory
+        self.splitter = splitter or CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        self.num_workers = num_workers
+        self.embed_batch_size = embed_batch_size
+        self.max_jobs_kept = max_jobs_kept
+        self.deduplicator = deduplicator
+        self.replace_existing = replace_existing
+        self.compact_threshold = compact_threshold
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.num_workers)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        path: str,
+        filename: str,
+        delete_file: bool = True,
+        vector_db: Optional[VectorDatabase] = None,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        collection: Optional[str] = None,
+    ) -> IngestionJob:
+        """
+        Queues a file for ingestion; with ``delete_file`` it is removed once processed.
+
+        ``vector_db`` and ``deduplicator`` override the queue's own for this job;
+        ``collection`` is only recorded for status reporting.
+        """
+        if self._queue is None:
+            raise RuntimeError("IngestionQueue.start() must be awaited before submitting jobs.")
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex,
+            path=path,
+            filename=filename,
+            delete_file=delete_file,
+            collection=collection,
+            _vector_db=vector_db,
+            _deduplicator=deduplicator,
+        )
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.max_jobs_kept:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            self.jobs.pop(oldest_id)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: IngestionJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        vector_db = job._vector_db if job._vector_db is not None else self.vector_db
+        deduplicator = job._deduplicator
+        if deduplicator is None and vector_db is self.vector_db:
+            deduplicator = self.deduplicator
+        try:
+            chunks = await asyncio.to_thread(self._load_and_split, job)
+            job.chunks_total = len(chunks)
+            # Released before inserting, so only the previous version's chunks are
+            # candidates, and they no longer count as already seen: its unchanged
+            # and edited chunks are ingested again. Chunks other files share stay.
+            old_keys, shared = set(), {}
+            if self.replace_existing:
+                old_keys, shared = vector_db.release_document(job.filename, deduplicator)
+            for start in range(0, len(chunks), self.embed_batch_size):
+                batch = chunks[start : start + self.embed_batch_size]
+                if deduplicator is not None:
+                    keep, report = deduplicator.filter(
+                        [chunk.text for chunk in batch], [chunk.metadata for chunk in batch]
+                    )
+                    job.chunks_deduplicated += report.chunks_saved
+                    job.tokens_saved += report.tokens_saved
+                    batch = [batch[i] for i in keep]
+                if batch:
+                    await vector_db.abuild_from_list(
+                        [chunk.text for chunk in batch], [chunk.metadata for chunk in batch]
+                    )
+                job.chunks_done += min(self.embed_batch_size, len(chunks) - start)
+            vector_db.hand_over(job.filename, shared)
+            if old_keys:
+                job.chunks_deleted = vector_db.delete(old_keys - {chunk.text for chunk in chunks})
+                if self.compact_threshold is not None and vector_db.dead_fraction > self.compact_threshold:
+                    await vector_db.acompact()
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if job.delete_file and os.path.exists(job.path):
+                os.remove(job.path)
+            job._done.set()
+
+    def _load_and_split(self, job: IngestionJob) -> List[Document]:
+        loader = self.loader_factory(job.filename, job.path)
+        chunks = []
+        for chunk in self.splitter.split_documents(loader.lazy_load()):
+            if chunk.text.strip():
+                # Record the uploaded filename rather than the temporary path
+                chunk.metadata["source"] = job.filename
+                chunks.append(chunk)
+        return chunks
@@ -0,0 +1,171 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index for cosine search.
+
+    Vectors are assigned to the nearest of ``n_lists`` spherical k-means
+    centroids. A query is scored only against the rows in its ``nprobe`` closest
+    lists, so ``nprobe`` trades recall (higher) against latency (lower).
+
+    The index stores row ids only; the unit-normalised vectors themselves stay
+    in the caller's matrix and are passed to ``search``.
+    Usage:
+        index = IVFIndex(n_lists=256, nprobe=8)
+        index.train(matrix)
+        index.add(np.arange(len(matrix)), matrix)
+        row_ids, scores = index.search(query, matrix, k=5)
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 20,
+        max_training_points: int = 100_000,
+        seed: int = 0,
+    ):
+        if nprobe < 1:
+            raise ValueError("nprobe must be at least 1")
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.max_training_points = max_training_points
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._assignment = np.empty(0, dtype=np.int64)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Fits the centroids with spherical k-means on (a sample of) unit vectors."""
+        if vectors.shape[0] == 0:
+            raise ValueError("Cannot train an IVF index on an empty matrix.")
+        rng = np.random.default_rng(self.seed)
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(vectors.shape[0])))
+        n_lists = min(n_lists, vectors.shape[0])
+        if vectors.shape[0] > self.max_training_points:
+            sample = vectors[
+                rng.choice(vectors.shape[0], self.max_training_points, replace=False)
+            ]
+        else:
+            sample = vectors
+
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty clusters with random points so every list stays useful.
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.n_lists = n_lists
+        self.centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._assignment = np.empty(0, dtype=np.int64)
+
+    def add(self, row_ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Assigns rows to their nearest list; re-adding a row id moves it."""
+        if not self.is_trained:
+            raise ValueError("IVF index must be trained before adding vectors.")
+        row_ids = np.asarray(row_ids, dtype=np.int64).reshape(-1)
+        if row_ids.size == 0:
+            return
+        labels = np.argmax(np.atleast_2d(vectors) @ self.centroids.T, axis=1)
+
+        needed = int(row_ids.max()) + 1
+        if needed > self._assignment.shape[0]:
+            grown = np.full(max(needed, 2 * self._assignment.shape[0]), -1, dtype=np.int64)
+            grown[: self._assignment.shape[0]] = self._assignment
+            self._assignment = grown
+
+        for row_id, label in zip(row_ids.tolist(), labels.tolist()):
+            previous = int(self._assignment[row_id])
+            if previous == label:
+                continue
+            if previous >= 0:
+                self._lists[previous].remove(row_id)
+                self._list_arrays[previous] = None
+            self._lists[label].append(row_id)
+            self._list_arrays[label] = None
+            self._assignment[row_id] = label
+
+    def remapped(self, old_to_new: np.ndarray) -> "IVFIndex":
+        """
+        Returns a copy whose row ids are renumbered through ``old_to_new``
+        (-1 drops a row), e.g. after the caller compacted its matrix. The
+        centroids are kept, so no vector is reassigned.
+        """
+        index = IVFIndex(self.n_lists, self.nprobe, self.n_iter, self.max_training_points, self.seed)
+        index.centroids = self.centroids
+        index._lists = []
+        index._assignment = np.full(int(old_to_new.max(initial=-1)) + 1, -1, dtype=np.int64)
+        for label, rows in enumerate(self._lists):
+            mapped = old_to_new[np.asarray(rows, dtype=np.int64)] if rows else np.empty(0, dtype=np.int64)
+            mapped = mapped[mapped >= 0]
+            index._lists.append(mapped.tolist())
+            index._assignment[mapped] = label
+        index._list_arrays = [None] * len(index._lists)
+        return index
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays[list_id]
+        if array is None:
+            array = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Returns the row ids stored in the ``nprobe`` lists closest to ``query``."""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.n_lists)
+        arrays = [self._list_array(list_id) for list_id in probes.tolist()]
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+
+    def search(
+        self,
+        query: np.ndarray,
+        matrix: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k search for a unit-normalised query.
+
+        :param matrix: The unit-normalised vectors the row ids refer to
+        :param mask: Optional boolean mask over rows; only rows set in it are scored
+        :return: (row_ids, scores), best first
+        """
+        candidate_ids = self.candidates(query, nprobe)
+        if mask is not None:
+            candidate_ids = candidate_ids[mask[candidate_ids]]
+        if candidate_ids.size == 0:
+            return candidate_ids, np.empty(0, dtype=np.float32)
+        scores = matrix[candidate_ids] @ query
+        k = min(k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidate_ids[top], scores[top]
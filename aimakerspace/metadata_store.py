@@ -0,0 +1,217 @@
+import operator
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+_RANGE_OPERATORS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+class MetadataStore:
+    """
+    Per-record metadata stored column-wise, one Python list per field.
+
+    Row i belongs to the i-th key inserted, which is also row i of the
+    VectorDatabase matrix, so a filter evaluates to a boolean mask over the
+    stored vectors and can narrow the candidates before any scoring happens.
+    Deleted keys leave a tombstoned row behind (so rows stay aligned) that no
+    mask ever selects, until ``compacted`` drops them.
+    Equality filters use a per-column value -> rows index, range filters a
+    float64 view of numeric columns; both are built lazily and dropped when the
+    column changes.
+
+    Filters are dicts of field conditions, all of which must hold:
+        {"source": "report.pdf"}                      equality
+        {"loader": {"$in": ["pdf", "docx"]}}          membership ($nin negates)
+        {"page": {"$gte": 2, "$lt": 5}}               ranges ($gt, $gte, $lt, $lte)
+        {"source": {"$ne": "a.pdf"}, "page": {"$exists": True}}
+    """
+
+    OPERATORS = ("$eq", "$ne", "$in", "$nin", "$exists", *_RANGE_OPERATORS)
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self._key_to_row: Dict[str, int] = {}
+        self.columns: Dict[str, List[Any]] = {}
+        self._value_index: Dict[str, Dict[Any, List[int]]] = {}
+        self._numeric: Dict[str, Optional[np.ndarray]] = {}
+        self._deleted_rows: Set[int] = set()
+        self._live_mask: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        """Number of live (not deleted) records."""
+        return len(self._key_to_row)
+
+    @property
+    def deleted_count(self) -> int:
+        return len(self._deleted_rows)
+
+    def row_of(self, key: str) -> Optional[int]:
+        return self._key_to_row.get(key)
+
+    def delete(self, key: str) -> bool:
+        """Tombstones ``key``'s row; returns False if the key is unknown."""
+        row = self._key_to_row.pop(key, None)
+        if row is None:
+            return False
+        self._deleted_rows.add(row)
+        self._live_mask = None
+        return True
+
+    def live_mask(self) -> np.ndarray:
+        """Boolean mask over all rows, False for deleted ones."""
+        if self._live_mask is None or len(self._live_mask) != len(self.keys):
+            mask = np.ones(len(self.keys), dtype=bool)
+            if self._deleted_rows:
+                mask[list(self._deleted_rows)] = False
+            self._live_mask = mask
+        return self._live_mask
+
+    def compacted(self, rows: np.ndarray) -> "MetadataStore":
+        """A new store holding only ``rows`` (e.g. the live ones), renumbered from 0."""
+        rows = rows.tolist()
+        return MetadataStore.from_columns(
+            [self.keys[row] for row in rows],
+            {name: [column[row] for row in rows] for name, column in self.columns.items()},
+        )
+
+    def _invalidate(self, name: str) -> None:
+        self._value_index.pop(name, None)
+        self._numeric.pop(name, None)
+
+    def set(self, key: str, metadata: Optional[dict]) -> int:
+        """
+        Registers ``key`` and returns its row. Existing metadata is replaced
+        when ``metadata`` is given and kept when it is None.
+        """
+        row = self._key_to_row.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self._key_to_row[key] = row
+            for name, column in self.columns.items():
+                column.append(None)
+                # A new empty cell leaves the value index valid
+                self._numeric.pop(name, None)
+        elif metadata is None:
+            return row
+        else:
+            for name, column in self.columns.items():
+                if column[row] is not None and name not in metadata:
+                    column[row] = None
+                    self._invalidate(name)
+
+        for name, value in (metadata or {}).items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = [None] * len(self.keys)
+            column[row] = value
+            self._invalidate(name)
+        return row
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self._key_to_row.get(key)
+        if row is None:
+            return None
+        metadata = {
+            name: column[row] for name, column in self.columns.items() if column[row] is not None
+        }
+        return metadata or None
+
+    def to_columns(self, keys: Iterable[str]) -> Dict[str, list]:
+        """Columns reordered to follow ``keys`` (for persistence)."""
+        rows = [self._key_to_row[key] for key in keys]
+        return {name: [column[row] for row in rows] for name, column in self.columns.items()}
+
+    @classmethod
+    def from_columns(cls, keys: List[str], columns: Dict[str, list]) -> "MetadataStore":
+        store = cls()
+        store.keys = list(keys)
+        store._key_to_row = {key: row for row, key in enumerate(store.keys)}
+        store.columns = {name: list(values) for name, values in columns.items()}
+        return store
+
+    def _rows_equal_to(self, name: str, values: Iterable[Any]) -> np.ndarray:
+        index = self._value_index.get(name)
+        if index is None:
+            index = defaultdict(list)
+            for row, value in enumerate(self.columns.get(name, ())):
+                if value is not None:
+                    try:
+                        index[value].append(row)
+                    except TypeError:  # unhashable values never match equality filters
+                        pass
+            self._value_index[name] = index
+        mask = np.zeros(len(self.keys), dtype=bool)
+        for value in values:
+            rows = index.get(value)
+            if rows:
+                mask[rows] = True
+        return mask
+
+    def _numeric_column(self, name: str) -> Optional[np.ndarray]:
+        if name not in self._numeric:
+            column = self.columns.get(name, [])
+            numeric = all(
+                value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+                for value in column
+            )
+            self._numeric[name] = (
+                np.array([np.nan if value is None else value for value in column], dtype=np.float64)
+                if numeric
+                else None
+            )
+        return self._numeric[name]
+
+    def _range_mask(self, name: str, op: str, bound: Any) -> np.ndarray:
+        compare = _RANGE_OPERATORS[op]
+        numeric = self._numeric_column(name)
+        if numeric is not None and isinstance(bound, (int, float)):
+            with np.errstate(invalid="ignore"):
+                return compare(numeric, bound)
+
+        def matches(value):
+            try:
+                return value is not None and compare(value, bound)
+            except TypeError:
+                return False
+
+        column = self.columns.get(name, [None] * len(self.keys))
+        return np.fromiter((matches(value) for value in column), dtype=bool, count=len(self.keys))
+
+    def _condition_mask(self, name: str, condition: Any) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        mask = np.ones(len(self.keys), dtype=bool)
+        for op, argument in condition.items():
+            if op == "$eq":
+                mask &= self._rows_equal_to(name, [argument])
+            elif op == "$ne":
+                mask &= ~self._rows_equal_to(name, [argument])
+            elif op == "$in":
+                mask &= self._rows_equal_to(name, argument)
+            elif op == "$nin":
+                mask &= ~self._rows_equal_to(name, argument)
+            elif op == "$exists":
+                column = self.columns.get(name, [None] * len(self.keys))
+                exists = np.fromiter(
+                    (value is not None for value in column), dtype=bool, count=len(self.keys)
+                )
+                mask &= exists if argument else ~exists
+            elif op in _RANGE_OPERATORS:
+                mask &= self._range_mask(name, op, argument)
+            else:
+                raise ValueError(f"Unknown filter operator '{op}'; expected one of {self.OPERATORS}")
+        return mask
+
+    def mask(self, filter: dict) -> np.ndarray:
+        """Boolean mask over live rows matching every condition in ``filter``."""
+        mask = self.live_mask().copy()
+        for name, condition in filter.items():
+            mask &= self._condition_mask(name, condition)
+        return mask
@@ -1,22 +1,32 @@
-from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from typing import Optional
 import os
 
+from aimakerspace.openai_utils.clients import (
+    ClientConfig,
+    get_async_openai_client,
+    get_openai_client,
+)
+
 load_dotenv()
 
 
 class ChatOpenAI:
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    def __init__(
+        self, model_name: str = "gpt-4o-mini", client_config: Optional[ClientConfig] = None
+    ):
         self.model_name = model_name
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if self.openai_api_key is None:
             raise ValueError("OPENAI_API_KEY is not set")
+        # Clients are shared across instances and requests (see clients.py)
+        self.client_config = client_config or ClientConfig.from_env()
 
     def run(self, messages, text_only: bool = True, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
 
-        client = OpenAI()
+        client = get_openai_client(self.client_config)
         response = client.chat.completions.create(
             model=self.model_name, messages=messages, **kwargs
         )
@@ -26,11 +36,25 @@ class ChatOpenAI:
 
         return response
     
+    async def arun(self, messages, text_only: bool = True, **kwargs):
+        if not isinstance(messages, list):
+            raise ValueError("messages must be a list")
+
+        client = get_async_openai_client(self.client_config)
+        response = await client.chat.completions.create(
+            model=self.model_name, messages=messages, **kwargs
+        )
+
+        if text_only:
+            return response.choices[0].message.content
+
+        return response
+
     async def astream(self, messages, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
         
-        client = AsyncOpenAI()
+        client = get_async_openai_client(self.client_config)
 
         stream = await client.chat.completions.create(
             model=self.model_name,
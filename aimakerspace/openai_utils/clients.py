@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+import warnings
+import weakref
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from typing import Dict, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """
+    Connection settings for the shared OpenAI clients.
+
+    Clients are pooled per distinct config, so every wrapper built with equal
+    settings reuses the same keep-alive connections.
+    """
+
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    max_retries: int = 2
+    base_url: Optional[str] = None
+    api_key: Optional[str] = field(default=None, repr=False)
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        """Builds a config from OPENAI_HTTP_* environment variables, if set."""
+        defaults = cls()
+        return cls(
+            timeout=float(os.getenv("OPENAI_HTTP_TIMEOUT", defaults.timeout)),
+            connect_timeout=float(
+                os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)
+            ),
+            max_connections=int(
+                os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", defaults.max_connections)
+            ),
+            max_keepalive_connections=int(
+                os.getenv(
+                    "OPENAI_HTTP_MAX_KEEPALIVE", defaults.max_keepalive_connections
+                )
+            ),
+            keepalive_expiry=float(
+                os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)
+            ),
+            http2=os.getenv("OPENAI_HTTP2", "").lower() in ("1", "true", "yes"),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", defaults.max_retries)),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+        )
+
+    def _http_client_kwargs(self) -> dict:
+        http2 = self.http2
+        if http2 and find_spec("h2") is None:
+            warnings.warn("http2=True requires the 'h2' package; falling back to HTTP/1.1")
+            http2 = False
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": http2,
+        }
+
+    def _openai_kwargs(self) -> dict:
+        kwargs = {"max_retries": self.max_retries}
+        if self.base_url is not None:
+            kwargs["base_url"] = self.base_url
+        if self.api_key is not None:
+            kwargs["api_key"] = self.api_key
+        return kwargs
+
+
+_lock = threading.Lock()
+_sync_clients: Dict[ClientConfig, OpenAI] = {}
+# httpx async connection pools are bound to the event loop that first used them,
+# so async clients are pooled per running loop as well as per config.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientConfig, AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_openai_client(config: Optional[ClientConfig] = None) -> OpenAI:
+    """Returns the shared, thread-safe synchronous client for ``config``."""
+    config = config or ClientConfig()
+    client = _sync_clients.get(config)
+    if client is None:
+        with _lock:
+            client = _sync_clients.get(config)
+            if client is None:
+                client = OpenAI(
+                    http_client=openai.DefaultHttpxClient(**config._http_client_kwargs()),
+                    **config._openai_kwargs(),
+                )
+                _sync_clients[config] = client
+    return client
+
+
+def get_async_openai_client(config: Optional[ClientConfig] = None) -> AsyncOpenAI:
+    """
+    Returns the shared asynchronous client for ``config`` on the running event loop.
+
+    Outside a running loop a fresh, unpooled client is returned.
+    """
+    config = config or ClientConfig()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _new_async_client(config)
+
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(config)
+        if client is None:
+            client = _new_async_client(config)
+            clients[config] = client
+    return client
+
+
+def _new_async_client(config: ClientConfig) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        http_client=openai.DefaultAsyncHttpxClient(**config._http_client_kwargs()),
+        **config._openai_kwargs(),
+    )
+
+
+def close_clients() -> None:
+    """Closes the pooled synchronous clients (e.g. on application shutdown)."""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
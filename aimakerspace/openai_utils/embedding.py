@@ -1,17 +1,67 @@
 from dotenv import load_dotenv
-from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from typing import List, Optional, Tuple
 import os
 import asyncio
+import random
+from dataclasses import replace
 
+from aimakerspace.openai_utils.clients import (
+    ClientConfig,
+    get_async_openai_client,
+    get_openai_client,
+)
+from aimakerspace.embedding_backends import EmbeddingBackend
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+from aimakerspace.tokenizer import count_tokens_many
+from aimakerspace.tracing import tracer
 
-class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small"):
+# Errors worth retrying with backoff; anything else is raised immediately.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def batch_texts_by_tokens(
+    list_of_text: List[str], max_batch_size: int, max_batch_tokens: int
+) -> List[List[str]]:
+    """
+    Splits texts into consecutive batches that respect both the per-request
+    input count and token limits. A single text over the token limit gets a
+    batch of its own and is left for the API to reject or truncate.
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for text, tokens in zip(list_of_text, count_tokens_many(list_of_text)):
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingModel(EmbeddingBackend):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = 2048,
+        max_batch_tokens: int = 250_000,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        retry_base_delay: float = 1.0,
+        client_config: Optional[ClientConfig] = None,
+    ):
         load_dotenv()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.async_client = AsyncOpenAI()
-        self.client = OpenAI()
+        self.client_config = client_config or ClientConfig.from_env()
+        self._client = None
+        self._async_client = None
 
         if self.openai_api_key is None:
             raise ValueError(
@@ -19,34 +69,227 @@ class EmbeddingModel:
             )
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
+        self.cache = cache
 
-    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = await self.async_client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
+        # Bulk embedding settings (see abatch_get_embeddings)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+    @property
+    def client(self):
+        """The shared synchronous client, unless one was assigned explicitly."""
+        return self._client or get_openai_client(self.client_config)
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    @property
+    def async_client(self):
+        """The shared asynchronous client for the running loop, unless assigned explicitly."""
+        return self._async_client or get_async_openai_client(self.client_config)
+
+    @async_client.setter
+    def async_client(self, client) -> None:
+        self._async_client = client
+
+    @property
+    def _bulk_async_client(self):
+        """
+        The async client for ``abatch_get_embeddings``, with the SDK's own retries
+        turned off: that method retries with its own backoff, and retrying in
+        both places would multiply the attempts per batch.
+        """
+        return self._async_client or get_async_openai_client(
+            replace(self.client_config, max_retries=0)
         )
 
+    def _cache_lookup(
+        self, list_of_text: List[str]
+    ) -> Tuple[List[Optional[List[float]]], List[str]]:
+        """Returns cached embeddings (None where missing) and the unique texts to request."""
+        if self.cache is None:
+            return [None] * len(list_of_text), list(dict.fromkeys(list_of_text))
+        cached = self.cache.get_many(self.embeddings_model_name, list_of_text)
+        return cached, self._count_lookups(list_of_text, cached)
+
+    async def _acache_lookup(
+        self, list_of_text: List[str]
+    ) -> Tuple[List[Optional[List[float]]], List[str]]:
+        """Like ``_cache_lookup``, with the disk tier read off the event loop."""
+        if self.cache is None:
+            return [None] * len(list_of_text), list(dict.fromkeys(list_of_text))
+        cached = await self.cache.aget_many(self.embeddings_model_name, list_of_text)
+        return cached, self._count_lookups(list_of_text, cached)
+
+    @staticmethod
+    def _count_lookups(
+        list_of_text: List[str], cached: List[Optional[List[float]]]
+    ) -> List[str]:
+        misses = [text for text, vector in zip(list_of_text, cached) if vector is None]
+        tracer.count("embedding_cache_lookups_total", len(list_of_text) - len(misses), result="hit")
+        tracer.count("embedding_cache_lookups_total", len(misses), result="miss")
+        return list(dict.fromkeys(misses))
+
+    def _count_requested_tokens(self, list_of_text: List[str]) -> None:
+        if tracer.enabled and list_of_text:
+            tracer.count("tokens_total", sum(count_tokens_many(list_of_text)), kind="embedding")
+
+    def _cached_query(self, text: str) -> Optional[List[float]]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self.embeddings_model_name, text)
+        tracer.count("embedding_cache_lookups_total", result="miss" if cached is None else "hit")
+        return cached
+
+    async def _acached_query(self, text: str) -> Optional[List[float]]:
+        if self.cache is None:
+            return None
+        cached = (await self.cache.aget_many(self.embeddings_model_name, [text]))[0]
+        tracer.count("embedding_cache_lookups_total", result="miss" if cached is None else "hit")
+        return cached
+
+    def _merge_results(
+        self,
+        list_of_text: List[str],
+        cached: List[Optional[List[float]]],
+        requested: List[str],
+        fetched: List[List[float]],
+    ) -> List[List[float]]:
+        if self.cache is not None and requested:
+            self.cache.put_many(self.embeddings_model_name, requested, fetched)
+        return self._combine(list_of_text, cached, requested, fetched)
+
+    async def _amerge_results(
+        self,
+        list_of_text: List[str],
+        cached: List[Optional[List[float]]],
+        requested: List[str],
+        fetched: List[List[float]],
+    ) -> List[List[float]]:
+        if self.cache is not None and requested:
+            await self.cache.aput_many(self.embeddings_model_name, requested, fetched)
+        return self._combine(list_of_text, cached, requested, fetched)
+
+    @staticmethod
+    def _combine(
+        list_of_text: List[str],
+        cached: List[Optional[List[float]]],
+        requested: List[str],
+        fetched: List[List[float]],
+    ) -> List[List[float]]:
+        by_text = dict(zip(requested, fetched))
+        return [
+            vector if vector is not None else by_text[text]
+            for text, vector in zip(list_of_text, cached)
+        ]
+
+    async def _async_request_embeddings(
+        self, list_of_text: List[str], client=None
+    ) -> List[List[float]]:
+        client = client or self.async_client
+        embedding_response = await client.embeddings.create(
+            input=list_of_text, model=self.embeddings_model_name
+        )
         return [embeddings.embedding for embeddings in embedding_response.data]
 
-    async def async_get_embedding(self, text: str) -> List[float]:
-        embedding = await self.async_client.embeddings.create(
-            input=text, model=self.embeddings_model_name
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        with tracer.span("embed_batch"):
+            cached, requested = await self._acache_lookup(list_of_text)
+            fetched = []
+            if requested:
+                self._count_requested_tokens(requested)
+                fetched = await self._async_request_embeddings(requested)
+
+            return await self._amerge_results(list_of_text, cached, requested, fetched)
+
+    async def abatch_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        """
+        Embeds an arbitrarily long list of texts.
+
+        Cache misses are split into batches under ``max_batch_size`` inputs and
+        ``max_batch_tokens`` tokens, sent concurrently with at most
+        ``max_concurrency`` requests in flight, and retried with jittered
+        exponential backoff on rate-limit and transient errors. Results are
+        returned in input order.
+        """
+        with tracer.span("embed_batch"):
+            return await self._abatch_get_embeddings(list_of_text)
+
+    async def _abatch_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        cached, requested = await self._acache_lookup(list_of_text)
+        self._count_requested_tokens(requested)
+        batches = batch_texts_by_tokens(
+            requested, self.max_batch_size, self.max_batch_tokens
         )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self._bulk_async_client
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        return await self._async_request_embeddings(batch, client)
+                    except RETRYABLE_ERRORS:
+                        if attempt == self.max_retries:
+                            raise
+                        delay = self.retry_base_delay * (2 ** attempt)
+                        await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+        batch_results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        fetched = [vector for batch_vectors in batch_results for vector in batch_vectors]
+        return await self._amerge_results(list_of_text, cached, requested, fetched)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        cached = await self._acached_query(text)
+        if cached is not None:
+            return cached
+
+        self._count_requested_tokens([text])
+        with tracer.span("embedding_request"):
+            embedding = await self.async_client.embeddings.create(
+                input=text, model=self.embeddings_model_name
+            )
 
-        return embedding.data[0].embedding
+        vector = embedding.data[0].embedding
+        if self.cache is not None:
+            await self.cache.aput_many(self.embeddings_model_name, [text], [vector])
+        return vector
 
     def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = self.client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
-        )
+        with tracer.span("embed_batch"):
+            cached, requested = self._cache_lookup(list_of_text)
+            fetched = []
+            if requested:
+                self._count_requested_tokens(requested)
+                embedding_response = self.client.embeddings.create(
+                    input=requested, model=self.embeddings_model_name
+                )
+                fetched = [embeddings.embedding for embeddings in embedding_response.data]
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+            return self._merge_results(list_of_text, cached, requested, fetched)
 
     def get_embedding(self, text: str) -> List[float]:
-        embedding = self.client.embeddings.create(
-            input=text, model=self.embeddings_model_name
-        )
+        cached = self._cached_query(text)
+        if cached is not None:
+            return cached
+
+        self._count_requested_tokens([text])
+        with tracer.span("embedding_request"):
+            embedding = self.client.embeddings.create(
+                input=text, model=self.embeddings_model_name
+            )
+
+        vector = embedding.data[0].embedding
+        if self.cache is not None:
+            self.cache.put(self.embeddings_model_name, text, vector)
+        return vector
 
-        return embedding.data[0].embedding
+    def cache_stats(self) -> Optional[dict]:
+        return self.cache.stats() if self.cache is not None else None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for embeddings, keyed by (model name, SHA-256 of the text).
+
+    Entries live in an in-memory LRU tier and, when ``db_path`` is given, in a
+    SQLite file as well, so cached embeddings survive restarts and can be shared
+    between processes. Memory misses that hit on disk are promoted to memory.
+    The SQLite file runs in WAL mode so readers in other processes do not block
+    writers; async callers should use ``aget_many``/``aput_many``, which move
+    disk access off the event loop.
+    Usage:
+        cache = EmbeddingCache(max_entries=50_000, db_path="embeddings.sqlite3")
+        model = EmbeddingModel(cache=cache)
+        print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        db_path: Optional[str] = None,
+        timeout: float = 30.0,
+    ):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # A sqlite3 connection must not be used by two threads at once.
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._connection = None
+        if db_path is not None:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                db_path, timeout=timeout, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model_name, [text])[0]
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Looks up each text; returns None in the positions that missed."""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        from_disk = self._read_disk(missing) if missing else {}
+
+        with self._lock:
+            for key, vector in from_disk.items():
+                found[key] = vector
+                self._remember(key, vector)
+                self.disk_hits += 1
+
+            results = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(vector.tolist())
+            return results
+
+    async def aget_many(
+        self, model_name: str, texts: List[str]
+    ) -> List[Optional[List[float]]]:
+        if self._connection is None:
+            return self.get_many(model_name, texts)
+        return await asyncio.to_thread(self.get_many, model_name, texts)
+
+    def put(self, model_name: str, text: str, embedding: List[float]) -> None:
+        self.put_many(model_name, [text], [embedding])
+
+    def put_many(
+        self, model_name: str, texts: List[str], embeddings: List[List[float]]
+    ) -> None:
+        rows = []
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = self.make_key(model_name, text)
+                vector = np.asarray(embedding, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+        if rows:
+            self._write_disk(rows)
+
+    async def aput_many(
+        self, model_name: str, texts: List[str], embeddings: List[List[float]]
+    ) -> None:
+        if self._connection is None:
+            self.put_many(model_name, texts, embeddings)
+        else:
+            await asyncio.to_thread(self.put_many, model_name, texts, embeddings)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._disk_lock:
+            if self._connection is None:
+                return found
+            # Stay well below SQLite's limit on bound parameters per statement.
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _write_disk(self, rows: List[Tuple[str, bytes]]) -> None:
+        with self._disk_lock:
+            if self._connection is None:
+                return
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM embeddings")
+                self._connection.commit()
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,15 +1,76 @@
-import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from string import Formatter
+from typing import List, Optional, Tuple
+
+
+class CompiledTemplate:
+    """
+    A prompt template parsed once into literal text and placeholder slots.
+
+    Rendering fills the slots and joins the parts in one pass, instead of
+    scanning the template for placeholders and running ``str.format`` on every
+    call. Missing variables render as "" (as ``BasePrompt.format_prompt``
+    always did); ``{{``/``}}`` escapes and format specs such as ``{score:.3f}``
+    follow ``str.format``.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        parts: List[Optional[str]] = []
+        # (index into parts, variable name, conversion, format spec)
+        slots: List[Tuple[int, str, Optional[str], str]] = []
+        for literal, name, spec, conversion in Formatter().parse(template):
+            if literal:
+                parts.append(literal)
+            if name is not None:
+                slots.append((len(parts), name, conversion, spec or ""))
+                parts.append(None)
+        self._parts = parts
+        self._slots = slots
+        self.variables: Tuple[str, ...] = tuple(name for _, name, _, _ in slots)
+        self.variable_set = frozenset(self.variables)
+        # A template without placeholders always renders to the same text
+        self._literal = None if slots else "".join(parts)
+
+    def render(self, values: dict) -> str:
+        if not self._slots:
+            return self._literal
+        parts = self._parts.copy()
+        for index, name, conversion, spec in self._slots:
+            value = values.get(name, "")
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            elif conversion == "s":
+                value = str(value)
+            parts[index] = value if type(value) is str and not spec else format(value, spec)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> CompiledTemplate:
+    """Returns the compiled form of ``template``, parsed once per distinct template."""
+    return CompiledTemplate(template)
 
 
 class BasePrompt:
-    def __init__(self, prompt):
+    def __init__(self, prompt, cache_size: int = 0):
         """
         Initializes the BasePrompt object with a prompt template.
 
         :param prompt: A string that can contain placeholders within curly braces
+        :param cache_size: Number of recent renderings to keep; a prompt rendered
+            again with the same values (typically a system prompt) then returns
+            the identical string without re-rendering
         """
         self.prompt = prompt
-        self._pattern = re.compile(r"\{([^}]+)\}")
+        self.compiled = compile_template(prompt)
+        self.cache_size = cache_size
+        self._renders: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
 
     def format_prompt(self, **kwargs):
         """
@@ -18,8 +79,24 @@ class BasePrompt:
         :param kwargs: The values to substitute into the prompt string
         :return: The formatted prompt string
         """
-        matches = self._pattern.findall(self.prompt)
-        return self.prompt.format(**{match: kwargs.get(match, "") for match in matches})
+        if not self.cache_size:
+            return self.compiled.render(kwargs)
+        # Typed so that equal values of different types (1, 1.0, True) render separately
+        key = tuple([
+            (type(value), value)
+            for value in (kwargs.get(name, "") for name in self.compiled.variables)
+        ])
+        try:
+            text = self._renders.get(key)
+        except TypeError:  # unhashable values are rendered every time
+            return self.compiled.render(kwargs)
+        if text is None:
+            text = self.compiled.render(kwargs)
+            with self._lock:
+                self._renders[key] = text
+                if len(self._renders) > self.cache_size:
+                    self._renders.popitem(last=False)
+        return text
 
     def get_input_variables(self):
         """
@@ -27,18 +104,18 @@ class BasePrompt:
 
         :return: List of input variable names
         """
-        return self._pattern.findall(self.prompt)
+        return list(self.compiled.variables)
 
 
 class RolePrompt(BasePrompt):
-    def __init__(self, prompt, role: str):
+    def __init__(self, prompt, role: str, cache_size: int = 0):
         """
         Initializes the RolePrompt object with a prompt template and a role.
 
         :param prompt: A string that can contain placeholders within curly braces
         :param role: The role for the message ('system', 'user', or 'assistant')
         """
-        super().__init__(prompt)
+        super().__init__(prompt, cache_size)
         self.role = role
 
     def create_message(self, format=True, **kwargs):
@@ -50,23 +127,23 @@ class RolePrompt(BasePrompt):
         """
         if format:
             return {"role": self.role, "content": self.format_prompt(**kwargs)}
-        
+
         return {"role": self.role, "content": self.prompt}
 
 
 class SystemRolePrompt(RolePrompt):
-    def __init__(self, prompt: str):
-        super().__init__(prompt, "system")
+    def __init__(self, prompt: str, cache_size: int = 0):
+        super().__init__(prompt, "system", cache_size)
 
 
 class UserRolePrompt(RolePrompt):
-    def __init__(self, prompt: str):
-        super().__init__(prompt, "user")
+    def __init__(self, prompt: str, cache_size: int = 0):
+        super().__init__(prompt, "user", cache_size)
 
 
 class AssistantRolePrompt(RolePrompt):
-    def __init__(self, prompt: str):
-        super().__init__(prompt, "assistant")
+    def __init__(self, prompt: str, cache_size: int = 0):
+        super().__init__(prompt, "assistant", cache_size)
 
 
 if __name__ == "__main__":
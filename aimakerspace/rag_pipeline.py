@@ -1,4 +1,11 @@
+import time
+from contextlib import contextmanager, nullcontext
+
 from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.answer_cache import AnswerCache
+from aimakerspace.context_packer import ContextPacker
+from aimakerspace.tokenizer import count_tokens
+from aimakerspace.tracing import tracer
 from aimakerspace.openai_utils.chatmodel import ChatOpenAI
 from aimakerspace.openai_utils.prompts import (
     UserRolePrompt,
@@ -26,8 +33,10 @@ Question: {user_query}
 
 Please provide your answer based solely on the context above."""
 
+# Rendered once per (response_style, response_length) and reused afterwards
 rag_system_prompt = SystemRolePrompt(
     RAG_SYSTEM_TEMPLATE,
+    cache_size=16,
     # strict=True,
     # defaults={
     #     "response_style": "concise",
@@ -46,16 +55,29 @@ rag_user_prompt = UserRolePrompt(
 
 class RetrievalAugmentedQAPipeline:
     def __init__(self, llm: ChatOpenAI, vector_db_retriever: VectorDatabase, 
-                 response_style: str = "detailed", include_scores: bool = False) -> None:
+                 response_style: str = "detailed", include_scores: bool = False,
+                 search_mode: str = "vector", answer_cache: AnswerCache = None,
+                 context_packer: ContextPacker = None) -> None:
         self.llm = llm
         self.vector_db_retriever = vector_db_retriever
         self.response_style = response_style
         self.include_scores = include_scores
+        # "vector", "lexical" or "hybrid" (see VectorDatabase.search_by_text)
+        self.search_mode = search_mode
+        # Optional AnswerCache; hits skip retrieval and the LLM call entirely
+        self.answer_cache = answer_cache
+        # Optional ContextPacker; merges, filters and trims chunks to a token budget
+        self.context_packer = context_packer
+
+    def _build_messages(self, user_query: str, context_list: list, **system_kwargs) -> dict:
+        packing = None
+        if self.context_packer is not None:
+            with tracer.span("pack_context"):
+                packed = self.context_packer.pack(
+                    user_query, context_list, self.vector_db_retriever.get_metadata
+                )
+            context_list, packing = packed.contexts, packed.to_dict()
 
-    def run_pipeline(self, user_query: str, k: int = 4, **system_kwargs) -> dict:
-        # Retrieve relevant contexts
-        context_list = self.vector_db_retriever.search_by_text(user_query, k=k)
-        
         context_prompt = ""
         similarity_scores = []
         
@@ -81,16 +103,231 @@ class RetrievalAugmentedQAPipeline:
         formatted_user_prompt = rag_user_prompt.create_message(**user_params)
 
         return {
-            "response": self.llm.run([formatted_system_prompt, formatted_user_prompt]), 
+            "messages": [formatted_system_prompt, formatted_user_prompt],
             "context": context_list,
             "context_count": len(context_list),
             "similarity_scores": similarity_scores if self.include_scores else None,
+            "context_packing": packing,
             "prompts_used": {
                 "system": formatted_system_prompt,
                 "user": formatted_user_prompt
             }
         }
 
+    def _cache_params(self, k: int, mode: str, filter: dict, system_kwargs: dict) -> tuple:
+        return (
+            k,
+            mode,
+            repr(sorted(filter.items())) if filter else None,
+            tuple(sorted((key, repr(value)) for key, value in system_kwargs.items())),
+        )
+
+    def _cached_exact(self, user_query: str, params: tuple):
+        hit = self.answer_cache.get(user_query, params, self.vector_db_retriever.version)
+        return None if hit is None else {**hit, "cached": "exact"}
+
+    def _cached_similar(self, query_vector, params: tuple):
+        """Looks up a paraphrase by ``query_vector`` (None in lexical mode); records the miss."""
+        if query_vector is not None:
+            hit = self.answer_cache.get_similar(query_vector, params, self.vector_db_retriever.version)
+            if hit is not None:
+                return {**hit, "cached": "semantic"}
+        self.answer_cache.record_miss()
+        return None
+
+    def _cache_lookup(self, user_query: str, params: tuple, mode: str):
+        """
+        Returns (cached result or None, query vector or None). The query is only
+        embedded for the similarity lookup, and the vector is then reused for
+        retrieval on a miss.
+        """
+        hit = self._cached_exact(user_query, params)
+        if hit is not None:
+            return hit, None
+        query_vector = None
+        if mode != "lexical":
+            with tracer.span("embed_query"):
+                query_vector = self.vector_db_retriever.embedding_model.get_embedding(user_query)
+        return self._cached_similar(query_vector, params), query_vector
+
+    async def _acache_lookup(self, user_query: str, params: tuple, mode: str):
+        hit = self._cached_exact(user_query, params)
+        if hit is not None:
+            return hit, None
+        query_vector = None
+        if mode != "lexical":
+            with tracer.span("embed_query"):
+                query_vector = await self.vector_db_retriever.embedding_model.async_get_embedding(
+                    user_query
+                )
+        return self._cached_similar(query_vector, params), query_vector
+
+    def run_pipeline(self, user_query: str, k: int = 4, mode: str = None, filter: dict = None,
+                     timings: bool = False, **system_kwargs) -> dict:
+        """
+        Retrieves the k most relevant chunks (optionally restricted by a metadata
+        ``filter``, see VectorDatabase.search) and answers from them. With
+        ``timings``, the result carries a per-stage "timings" breakdown in ms.
+        """
+        with _traced_request(timings) as breakdown:
+            result = self._run_pipeline(user_query, k, mode or self.search_mode, filter, system_kwargs)
+        return result if breakdown is None else {**result, "timings": breakdown}
+
+    def _run_pipeline(self, user_query: str, k: int, mode: str, filter: dict, system_kwargs: dict) -> dict:
+        if self.answer_cache is None:
+            # Retrieve relevant contexts
+            context_list = self.vector_db_retriever.search_by_text(
+                user_query, k=k, mode=mode, filter=filter
+            )
+        else:
+            params = self._cache_params(k, mode, filter, system_kwargs)
+            version = self.vector_db_retriever.version
+            with tracer.span("answer_cache"):
+                hit, query_vector = self._cache_lookup(user_query, params, mode)
+            if hit is not None:
+                return hit
+            if query_vector is None and mode != "lexical":
+                with tracer.span("embed_query"):
+                    query_vector = self.vector_db_retriever.embedding_model.get_embedding(user_query)
+            context_list = self.vector_db_retriever.search_query(
+                user_query, query_vector, k, mode, filter=filter
+            )
+
+        result = self._build_messages(user_query, context_list, **system_kwargs)
+        messages = result.pop("messages")
+        with tracer.span("llm"):
+            response = self.llm.run(messages)
+        _count_llm_tokens(messages, response)
+        result = {"response": response, **result}
+        if self.answer_cache is not None:
+            self.answer_cache.put(user_query, params, version, result, query_vector)
+        return result
+
+    async def _aretrieve(self, user_query: str, k: int, mode: str, filter: dict, system_kwargs: dict):
+        """Returns (cached result or None, context list, cache store arguments or None)."""
+        if self.answer_cache is None:
+            context_list = await self.vector_db_retriever.asearch_by_text(
+                user_query, k=k, mode=mode, filter=filter
+            )
+            return None, context_list, None
+        params = self._cache_params(k, mode, filter, system_kwargs)
+        version = self.vector_db_retriever.version
+        with tracer.span("answer_cache"):
+            hit, query_vector = await self._acache_lookup(user_query, params, mode)
+        if hit is not None:
+            return hit, None, None
+        if query_vector is None and mode != "lexical":
+            with tracer.span("embed_query"):
+                query_vector = await self.vector_db_retriever.embedding_model.async_get_embedding(
+                    user_query
+                )
+        if mode != "vector":
+            await self.vector_db_retriever.aload_lexical_index()
+        context_list = self.vector_db_retriever.search_query(
+            user_query, query_vector, k, mode, filter=filter
+        )
+        return None, context_list, (params, version, query_vector)
+
+    async def arun_pipeline(self, user_query: str, k: int = 4, mode: str = None, filter: dict = None,
+                            timings: bool = False, **system_kwargs) -> dict:
+        """Async version of run_pipeline: embedding, retrieval and the LLM call never block the event loop."""
+        with _traced_request(timings) as breakdown:
+            result = await self._arun_pipeline(
+                user_query, k, mode or self.search_mode, filter, system_kwargs
+            )
+        return result if breakdown is None else {**result, "timings": breakdown}
+
+    async def _arun_pipeline(self, user_query: str, k: int, mode: str, filter: dict,
+                             system_kwargs: dict) -> dict:
+        hit, context_list, store = await self._aretrieve(user_query, k, mode, filter, system_kwargs)
+        if hit is not None:
+            return hit
+
+        result = self._build_messages(user_query, context_list, **system_kwargs)
+        messages = result.pop("messages")
+        with tracer.span("llm"):
+            response = await self.llm.arun(messages)
+        _count_llm_tokens(messages, response)
+        result = {"response": response, **result}
+        if store is not None:
+            params, version, query_vector = store
+            self.answer_cache.put(user_query, params, version, result, query_vector)
+        return result
+
+    async def astream_pipeline(self, user_query: str, k: int = 4, mode: str = None, filter: dict = None,
+                               timings: bool = False, **system_kwargs) -> dict:
+        """
+        Retrieves context, then returns the same dict as run_pipeline except that
+        "response" is an async iterator yielding answer tokens as they arrive.
+        A cached answer is yielded as a single token. The "timings" breakdown
+        gains "llm_first_token" and "llm" once the stream has been consumed.
+        Usage:
+            result = await rag_pipeline.astream_pipeline(question)
+            async for token in result["response"]:
+                print(token, end="")
+        """
+        with _traced_request(timings) as breakdown:
+            hit, context_list, store = await self._aretrieve(
+                user_query, k, mode or self.search_mode, filter, system_kwargs
+            )
+            if hit is None:
+                result = self._build_messages(user_query, context_list, **system_kwargs)
+        extra = {} if breakdown is None else {"timings": breakdown}
+        if hit is not None:
+            return {**hit, "response": _single_token(hit["response"]), **extra}
+
+        messages = result.pop("messages")
+        tokens = _traced_stream(self.llm.astream(messages), messages, breakdown)
+        if store is not None:
+            tokens = self._cache_stream(tokens, user_query, store, result)
+        return {"response": tokens, **result, **extra}
+
+    async def _cache_stream(self, tokens, user_query: str, store: tuple, result: dict):
+        # Only a stream that ran to completion is cached
+        answer = []
+        async for token in tokens:
+            answer.append(token)
+            yield token
+        params, version, query_vector = store
+        self.answer_cache.put(
+            user_query, params, version, {"response": "".join(answer), **result}, query_vector
+        )
+
+
+@contextmanager
+def _traced_request(timings: bool):
+    """Spans a whole request; yields its timing breakdown dict, or None when not requested."""
+    with tracer.timings() if timings else nullcontext() as breakdown:
+        with tracer.span("rag_request"):
+            yield breakdown
+
+
+def _count_llm_tokens(messages: list, response: str) -> None:
+    if tracer.enabled:
+        tracer.count("tokens_total", sum(count_tokens(m["content"]) for m in messages), kind="prompt")
+        tracer.count("tokens_total", count_tokens(response or ""), kind="completion")
+
+
+async def _traced_stream(tokens, messages: list, breakdown: dict = None):
+    # Runs in the consumer's context, so stage times are added to the breakdown explicitly
+    start = time.perf_counter()
+    first_token, answer = None, []
+    async for token in tokens:
+        if first_token is None:
+            first_token = time.perf_counter() - start
+            tracer.observe("llm_first_token", first_token)
+        answer.append(token)
+        yield token
+    elapsed = time.perf_counter() - start
+    tracer.observe("llm", elapsed)
+    _count_llm_tokens(messages, "".join(answer))
+    if breakdown is not None:
+        breakdown["llm_first_token"] = (first_token or elapsed) * 1000
+        breakdown["llm"] = elapsed * 1000
+
+
+async def _single_token(text: str):
+    yield text
 
 if __name__ == "__main__":
     chat_openai = ChatOpenAI()
@@ -1,45 +1,158 @@
+import hashlib
+import io
 import os
-from typing import List
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from pypdf import PdfReader
 from PIL import Image
 import pytesseract
 import docx
 
+from aimakerspace.tokenizer import cached_count_tokens
+from aimakerspace.tracing import tracer
 
-class TextFileLoader:
-    def __init__(self, path: str, encoding: str = "utf-8"):
+
+@dataclass
+class Document:
+    """A loaded document: its text plus metadata such as its source path and loader type."""
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+# Maps a lower-case file extension (".pdf") to the loader class that handles it.
+LOADER_REGISTRY: Dict[str, type] = {}
+
+
+def register_loader(*extensions: str):
+    """Class decorator that registers a loader for the given file extensions."""
+    def decorator(cls):
+        cls.extensions = tuple(ext.lower() for ext in extensions)
+        for ext in cls.extensions:
+            LOADER_REGISTRY[ext] = cls
+        return cls
+    return decorator
+
+
+def get_loader_class(file_path: str) -> type:
+    ext = os.path.splitext(file_path)[1].lower()
+    loader_class = LOADER_REGISTRY.get(ext)
+    if loader_class is None:
+        raise ValueError(f"Unsupported file type: '{ext or file_path}'")
+    return loader_class
+
+
+def get_loader(path: str, **kwargs) -> "BaseLoader":
+    """Returns a DirectoryLoader for directories, otherwise the registered loader for the file."""
+    if os.path.isdir(path):
+        return DirectoryLoader(path, **kwargs)
+    return get_loader_class(path)(path, **kwargs)
+
+
+def iter_files(path: str, extensions: Tuple[str, ...]) -> Iterator[str]:
+    """Walks ``path`` once, yielding files whose lower-cased extension is in ``extensions``."""
+    for root, _, files in os.walk(path):
+        for file in files:
+            if file.lower().endswith(extensions):
+                yield os.path.join(root, file)
+
+
+def _bounded_ordered_map(executor, fn, iterable, max_in_flight: int) -> Iterator:
+    """
+    Like ``executor.map`` but keeps at most ``max_in_flight`` tasks submitted,
+    so results are produced lazily, in input order, with bounded memory.
+    """
+    pending = deque()
+    for args in iterable:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class BaseLoader:
+    """
+    Common base for the file loaders.
+
+    Subclasses are registered for their extensions with ``@register_loader`` and
+    implement ``_read_file``, which yields (text, metadata) pairs for one file.
+    ``lazy_load`` then streams ``Document`` objects one at a time for a single
+    file or a whole directory, while ``load``/``load_documents`` keep filling
+    ``self.documents`` with plain strings as before.
+    """
+    extensions: Tuple[str, ...] = ()
+    loader_type = "base"
+    # Loaders that take ``max_workers`` and run their own worker pool
+    uses_worker_pool = False
+
+    def __init__(self, path: str):
         self.documents = []
         self.path = path
-        self.encoding = encoding
+
+    @property
+    def invalid_path_message(self) -> str:
+        return f"Provided path is neither a valid directory nor a {'/'.join(self.extensions)} file."
+
+    def _matches(self, file_path: str) -> bool:
+        return file_path.lower().endswith(self.extensions)
+
+    def _read_file(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        raise NotImplementedError
+
+    def _files(self) -> Iterator[str]:
+        if os.path.isdir(self.path):
+            return iter_files(self.path, self.extensions)
+        return iter([self.path])
+
+    def _documents_for(self, file_path: str) -> Iterator[Document]:
+        pages = tracer.traced_iter("load", self._read_file(file_path), loader=self.loader_type)
+        for text, metadata in pages:
+            yield Document(
+                text, {"source": file_path, "loader": self.loader_type, **metadata}
+            )
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Yields documents one at a time instead of collecting them in memory."""
+        for file_path in self._files():
+            yield from self._documents_for(file_path)
 
     def load(self):
         if os.path.isdir(self.path):
             self.load_directory()
-        elif os.path.isfile(self.path) and self.path.endswith(".txt"):
+        elif os.path.isfile(self.path) and self._matches(self.path):
             self.load_file()
         else:
-            raise ValueError(
-                "Provided path is neither a valid directory nor a .txt file."
-            )
+            raise ValueError(self.invalid_path_message)
 
-    def load_file(self):
-        with open(self.path, "r", encoding=self.encoding) as f:
-            self.documents.append(f.read())
+    def load_file(self, file_path: Optional[str] = None):
+        for text, _ in self._read_file(file_path or self.path):
+            self.documents.append(text)
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".txt"):
-                    with open(
-                        os.path.join(root, file), "r", encoding=self.encoding
-                    ) as f:
-                        self.documents.append(f.read())
+        for document in self.lazy_load():
+            self.documents.append(document.text)
 
     def load_documents(self):
         self.load()
         return self.documents
 
 
+@register_loader(".txt")
+class TextFileLoader(BaseLoader):
+    loader_type = "text"
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        super().__init__(path)
+        self.encoding = encoding
+
+    def _read_file(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        with open(file_path, "r", encoding=self.encoding) as f:
+            yield f.read(), {}
+
+
 class CharacterTextSplitter:
     def __init__(
         self,
@@ -53,11 +166,13 @@ class CharacterTextSplitter:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
-    def split(self, text: str) -> List[str]:
-        chunks = []
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yields the (start, end) character offsets of each chunk without slicing the text."""
         for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
-            chunks.append(text[i : i + self.chunk_size])
-        return chunks
+            yield i, min(i + self.chunk_size, len(text))
+
+    def split(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.iter_spans(text)]
 
     def split_texts(self, texts: List[str]) -> List[str]:
         chunks = []
@@ -65,11 +180,188 @@ class CharacterTextSplitter:
             chunks.extend(self.split(text))
         return chunks
 
+    def iter_split_spans(self, texts: Iterable[str]) -> Iterator[Tuple[int, int, int]]:
+        """
+        Lazily yields (doc_id, start, end) spans over ``texts``, where doc_id is
+        the text's position in the iterable. No chunk strings are created, so
+        callers can slice only the chunks they actually consume.
+        """
+        for doc_id, text in enumerate(texts):
+            for start, end in self.iter_spans(text):
+                yield doc_id, start, end
+
+    def split_documents(
+        self, documents: Iterable[Union[str, "Document"]]
+    ) -> Iterator["Document"]:
+        """
+        Lazily splits documents (or plain strings) into chunk documents.
+
+        Each chunk keeps its parent's metadata plus ``doc_id``, ``start`` and
+        ``end``, the chunk's character offsets in the parent text, so retrieved
+        chunks can be mapped back to their source position. Only one chunk is
+        materialised at a time, so this can feed embedding as chunks are produced.
+        """
+        for doc_id, document in enumerate(documents):
+            if isinstance(document, str):
+                document = Document(document)
+            for start, end in self.iter_spans(document.text):
+                yield Document(
+                    document.text[start:end],
+                    {**document.metadata, "doc_id": doc_id, "start": start, "end": end},
+                )
+
+
+class RecursiveCharacterTextSplitter(CharacterTextSplitter):
+    """
+    Splits on the coarsest boundary that fits: paragraphs first, then lines,
+    sentences, words and, as a last resort, characters. The resulting pieces are
+    merged greedily into chunks of at most ``chunk_size`` (measured with
+    ``length_function``), and consecutive chunks share up to ``chunk_overlap``
+    of trailing pieces. Chunks are contiguous spans of the original text, so
+    ``iter_spans``/``split_documents`` offsets work exactly as in the base class.
+
+    ``max_chars_per_unit`` bounds how many characters one length unit can cover;
+    longer spans are split without being measured, which keeps an expensive
+    ``length_function`` from being run over whole documents. Pass None to
+    always measure.
+    """
+    DEFAULT_SEPARATORS = ["\n\n", "\n", "。", ". ", "! ", "? ", "; ", " ", ""]
 
-class PDFLoader:
-    def __init__(self, path: str):
-        self.documents = []
-        self.path = path
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: Optional[List[str]] = None,
+        length_function: Callable[[str], int] = len,
+        max_chars_per_unit: Optional[int] = 1,
+    ):
+        super().__init__(chunk_size, chunk_overlap)
+        self.separators = separators or self.DEFAULT_SEPARATORS
+        self.length_function = length_function
+        self.max_chars_per_unit = max_chars_per_unit
+
+    def _fits(self, text: str, start: int, end: int) -> bool:
+        if self.max_chars_per_unit is not None and end - start > self.chunk_size * self.max_chars_per_unit:
+            return False
+        return self.length_function(text[start:end]) <= self.chunk_size
+
+    def _split_span(
+        self, text: str, start: int, end: int, separators: List[str]
+    ) -> List[Tuple[int, int]]:
+        if self._fits(text, start, end):
+            return [(start, end)]
+        for i, separator in enumerate(separators):
+            if separator == "":
+                # No boundary left: cut fixed-width windows that fit the limit
+                step = self.chunk_size
+                while step > 1 and not self._fits(text, start, min(start + step, end)):
+                    step //= 2
+                return [(s, min(s + step, end)) for s in range(start, end, step)]
+            if text.find(separator, start, end) == -1:
+                continue
+            # Cut after each separator so the pieces tile the span exactly
+            pieces, position = [], start
+            while position < end:
+                index = text.find(separator, position, end)
+                cut = end if index == -1 else index + len(separator)
+                pieces.append((position, cut))
+                position = cut
+            spans = []
+            for piece_start, piece_end in pieces:
+                if not self._fits(text, piece_start, piece_end):
+                    spans.extend(self._split_span(text, piece_start, piece_end, separators[i + 1:]))
+                else:
+                    spans.append((piece_start, piece_end))
+            return spans
+        return [(start, end)]
+
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        if not text:
+            return
+        pieces = self._split_span(text, 0, len(text), self.separators)
+        lengths = [self.length_function(text[start:end]) for start, end in pieces]
+
+        current, total = deque(), 0
+        for index, length in enumerate(lengths):
+            if current and total + length > self.chunk_size:
+                yield pieces[current[0]][0], pieces[current[-1]][1]
+                # Keep trailing pieces as overlap, as long as the next piece still fits
+                while current and (total > self.chunk_overlap or total + length > self.chunk_size):
+                    total -= lengths[current.popleft()]
+            current.append(index)
+            total += length
+        if current:
+            yield pieces[current[0]][0], pieces[current[-1]][1]
+
+
+class TokenTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    Recursive splitter whose ``chunk_size`` and ``chunk_overlap`` are measured in
+    model tokens (tiktoken when installed, a character estimate otherwise).
+    Piece token counts are memoised, so repeated words and sentences are only
+    tokenised once. A chunk's size is the sum of its pieces' counts, which can
+    differ from tokenising the joined chunk by about a token per boundary.
+    """
+    def __init__(
+        self,
+        chunk_size: int = 256,
+        chunk_overlap: int = 32,
+        separators: Optional[List[str]] = None,
+    ):
+        # A token rarely covers more than a handful of characters
+        super().__init__(
+            chunk_size, chunk_overlap, separators, cached_count_tokens, max_chars_per_unit=8
+        )
+
+
+def _pdf_page_count(file_path: str) -> int:
+    with open(file_path, 'rb') as f:
+        return len(PdfReader(f).pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extracts pages [start, stop) of one PDF; a module-level function so worker processes can run it."""
+    with open(file_path, 'rb') as f:
+        pdf_reader = PdfReader(f)
+        return [
+            (page_number + 1, pdf_reader.pages[page_number].extract_text() or "")
+            for page_number in range(start, stop)
+        ]
+
+
+@register_loader(".pdf")
+class PDFLoader(BaseLoader):
+    """
+    Loader for PDF files or directories of PDFs using pypdf.
+
+    Besides ``load``, which builds one string per PDF, ``iter_pages`` streams
+    (file_path, page_number, text) tuples one page at a time. With
+    ``parallel=True`` pages are extracted by a ``ProcessPoolExecutor`` in
+    ranges of ``pages_per_task`` pages, spread across all files. Each task
+    re-opens its PDF, so by default every file is cut into about two ranges
+    per worker to keep that overhead small. With ``split_pages=True``,
+    ``lazy_load`` yields one document per non-empty page.
+    Usage:
+        loader = PDFLoader(path_to_pdf_or_directory, parallel=True)
+        for file_path, page_number, text in loader.iter_pages():
+            ...
+    """
+    loader_type = "pdf"
+    uses_worker_pool = True
+
+    def __init__(
+        self,
+        path: str,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+        split_pages: bool = False,
+    ):
+        super().__init__(path)
+        self.parallel = parallel
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.split_pages = split_pages
         print(f"PDFLoader initialized with path: {self.path}")
 
     def load(self):
@@ -79,6 +371,10 @@ class PDFLoader:
         print(f"Is directory: {os.path.isdir(self.path)}")
         print(f"File permissions: {oct(os.stat(self.path).st_mode)[-3:]}")
         
+        if os.path.isdir(self.path):
+            self.load_directory()
+            return
+
         try:
             # Try to open the file first to verify access
             with open(self.path, 'rb') as test_file:
@@ -92,43 +388,66 @@ class PDFLoader:
         except Exception as e:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
-    def load_file(self):
-        with open(self.path, 'rb') as file:
-            # Create PDF reader object
-            pdf_reader = PdfReader(file)
-            
-            # Extract text from each page
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
+    def iter_pages(self, files: Optional[List[str]] = None) -> Iterator[Tuple[str, int, str]]:
+        """Yields (file_path, page_number, text) for every page, in file and page order."""
+        files = self._files() if files is None else files
+        if self.parallel and self.max_workers > 1:
+            yield from self._iter_pages_parallel(files)
+            return
+        for file_path in files:
+            with open(file_path, 'rb') as f:
+                pdf_reader = PdfReader(f)
+                for page_number, page in enumerate(pdf_reader.pages, 1):
+                    yield file_path, page_number, page.extract_text() or ""
+
+    def _iter_pages_parallel(self, files) -> Iterator[Tuple[str, int, str]]:
+        def tasks():
+            for file_path in files:
+                page_count = _pdf_page_count(file_path)
+                step = self.pages_per_task or max(1, -(-page_count // (2 * self.max_workers)))
+                for start in range(0, page_count, step):
+                    yield file_path, start, min(start + step, page_count)
+
+        task_list = list(tasks())
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            results = _bounded_ordered_map(
+                executor, _extract_pdf_pages, task_list, max_in_flight=2 * self.max_workers
+            )
+            for (file_path, _, _), pages in zip(task_list, results):
+                for page_number, text in pages:
+                    yield file_path, page_number, text
+
+    def lazy_load(self, files: Optional[List[str]] = None) -> Iterator[Document]:
+        current_file, page_texts = None, []
+        pages = tracer.traced_iter("load", self.iter_pages(files), loader=self.loader_type)
+        for file_path, page_number, page_text in pages:
+            if self.split_pages:
                 if page_text:
-                    text += page_text + "\n"
-            
-            self.documents.append(text)
-
-    def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PdfReader(f)
-                        
-                        # Extract text from each page
-                        text = ""
-                        for page in pdf_reader.pages:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
-                        
-                        self.documents.append(text)
-
-    def load_documents(self):
-        self.load()
-        return self.documents
-
-
-class MarkdownLoader:
+                    yield Document(
+                        page_text,
+                        {"source": file_path, "loader": self.loader_type, "page": page_number},
+                    )
+                continue
+            # Join once per file instead of growing a string page by page
+            if file_path != current_file:
+                if current_file is not None:
+                    yield self._file_document(current_file, page_texts)
+                current_file, page_texts = file_path, []
+            if page_text:
+                page_texts.append(page_text + "\n")
+        if current_file is not None:
+            yield self._file_document(current_file, page_texts)
+
+    def _file_document(self, file_path: str, page_texts: List[str]) -> Document:
+        return Document("".join(page_texts), {"source": file_path, "loader": self.loader_type})
+
+    def load_file(self, file_path: Optional[str] = None):
+        for document in self.lazy_load([file_path or self.path]):
+            self.documents.append(document.text)
+
+
+@register_loader(".md")
+class MarkdownLoader(TextFileLoader):
     """
     Loader for Markdown (.md) files. Treats markdown as plain text.
     Usage:
@@ -136,86 +455,149 @@ class MarkdownLoader:
         loader.load()
         docs = loader.documents
     """
-    def __init__(self, path: str, encoding: str = "utf-8"):
-        self.documents = []
-        self.path = path
-        self.encoding = encoding
-
-    def load(self):
-        if os.path.isdir(self.path):
-            self.load_directory()
-        elif os.path.isfile(self.path) and self.path.endswith(".md"):
-            self.load_file()
-        else:
-            raise ValueError(
-                "Provided path is neither a valid directory nor a .md file."
-            )
-
-    def load_file(self):
-        with open(self.path, "r", encoding=self.encoding) as f:
-            self.documents.append(f.read())
-
-    def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".md"):
-                    with open(
-                        os.path.join(root, file), "r", encoding=self.encoding
-                    ) as f:
-                        self.documents.append(f.read())
-
-    def load_documents(self):
-        self.load()
-        return self.documents
+    loader_type = "markdown"
 
 
-class ImageLoader:
+class OCRCache:
+    """
+    OCR results keyed by a content hash of the image bytes plus the
+    preprocessing settings, kept in memory and optionally as one text file per
+    entry under ``cache_dir`` so unchanged scans are never OCR'd twice. The
+    memory tier holds the ``max_entries`` most recently used results.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _remember(self, key: str, text: str) -> None:
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+        if text is None and self.cache_dir is not None and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                text = f.read()
+            with self._lock:
+                self._remember(key, text)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+        if self.cache_dir is not None:
+            temp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, self._disk_path(key))
+
+
+def _ocr_image_bytes(data: bytes, grayscale: bool, max_side: Optional[int]) -> str:
+    image = Image.open(io.BytesIO(data))
+    if grayscale:
+        image = image.convert("L")
+    if max_side is not None and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side))
+    return pytesseract.image_to_string(image)
+
+
+@register_loader(".png", ".jpg", ".jpeg")
+class ImageLoader(BaseLoader):
     """
     Loader for image files (.png, .jpg, .jpeg) using OCR (pytesseract).
     Requires: pillow, pytesseract
+
+    Directories are OCR'd concurrently on a thread pool (each pytesseract call
+    runs its own tesseract process), sized to the CPU count by default.
+    ``grayscale`` and ``max_side`` shrink images before OCR, and an ``OCRCache``
+    skips images whose bytes were already processed with the same settings.
     Usage:
         loader = ImageLoader(path_to_image_or_directory)
         loader.load()
         docs = loader.documents
     """
-    def __init__(self, path: str):
-        self.documents = []
-        self.path = path
+    loader_type = "image"
+    uses_worker_pool = True
+    invalid_path_message = (
+        "Provided path is neither a valid directory nor a supported image file (.png, .jpg, .jpeg)."
+    )
 
-    def load(self):
-        if os.path.isdir(self.path):
-            self.load_directory()
-        elif os.path.isfile(self.path) and self._is_image_file(self.path):
-            self.load_file(self.path)
-        else:
-            raise ValueError(
-                "Provided path is neither a valid directory nor a supported image file (.png, .jpg, .jpeg)."
-            )
+    def __init__(
+        self,
+        path: str,
+        max_workers: Optional[int] = None,
+        grayscale: bool = False,
+        max_side: Optional[int] = None,
+        cache: Optional[OCRCache] = None,
+    ):
+        super().__init__(path)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.grayscale = grayscale
+        self.max_side = max_side
+        self.cache = cache
 
     def _is_image_file(self, filename):
-        return filename.lower().endswith((".png", ".jpg", ".jpeg"))
+        return self._matches(filename)
 
-    def load_file(self, file_path):
+    def _cache_key(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{digest}-g{int(self.grayscale)}-m{self.max_side or 0}"
+
+    def _ocr_file(self, file_path: str) -> str:
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            self.documents.append(text)
+            with open(file_path, "rb") as f:
+                data = f.read()
+            key = self._cache_key(data) if self.cache is not None else None
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+            text = _ocr_image_bytes(data, self.grayscale, self.max_side)
+            if key is not None:
+                self.cache.put(key, text)
+            return text
         except Exception as e:
             raise ValueError(f"Error processing image '{file_path}': {e}")
 
-    def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if self._is_image_file(file):
-                    file_path = os.path.join(root, file)
-                    self.load_file(file_path)
-
-    def load_documents(self):
-        self.load()
-        return self.documents
+    def _read_file(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        yield self._ocr_file(file_path), {}
+
+    def lazy_load(self) -> Iterator[Document]:
+        if self.max_workers == 1:
+            yield from super().lazy_load()
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = _bounded_ordered_map(
+                executor,
+                lambda file_path: list(self._documents_for(file_path)),
+                ((file_path,) for file_path in self._files()),
+                max_in_flight=2 * self.max_workers,
+            )
+            for documents in results:
+                yield from documents
 
 
-class DocxLoader:
+@register_loader(".docx")
+class DocxLoader(BaseLoader):
     """
     Loader for Microsoft Word (.docx) files using python-docx.
     Requires: python-docx
@@ -224,38 +606,68 @@ class DocxLoader:
         loader.load()
         docs = loader.documents
     """
-    def __init__(self, path: str):
-        self.documents = []
-        self.path = path
+    loader_type = "docx"
 
-    def load(self):
-        if os.path.isdir(self.path):
-            self.load_directory()
-        elif os.path.isfile(self.path) and self.path.endswith(".docx"):
-            self.load_file(self.path)
-        else:
-            raise ValueError(
-                "Provided path is neither a valid directory nor a .docx file."
-            )
-
-    def load_file(self, file_path):
+    def _read_file(self, file_path: str) -> Iterator[Tuple[str, dict]]:
         try:
             doc = docx.Document(file_path)
             text = "\n".join([para.text for para in doc.paragraphs])
-            self.documents.append(text)
         except Exception as e:
             raise ValueError(f"Error processing docx file '{file_path}': {e}")
+        yield text, {}
 
-    def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".docx"):
-                    file_path = os.path.join(root, file)
-                    self.load_file(file_path)
 
-    def load_documents(self):
-        self.load()
-        return self.documents
+class DirectoryLoader(BaseLoader):
+    """
+    Streams every supported file below a directory through its registered loader.
+
+    The directory is walked once; files are read on a thread pool of
+    ``max_workers`` threads with at most two files per worker in flight, and
+    documents are yielded in walk order. Memory therefore stays bounded no
+    matter how many files the directory holds. The per-file loaders run
+    serially inside those threads (``max_workers=1`` unless ``loader_kwargs``
+    says otherwise), so pools are not nested.
+    Usage:
+        for document in DirectoryLoader("data/", max_workers=8).lazy_load():
+            print(document.metadata["source"], len(document.text))
+    """
+    loader_type = "directory"
+
+    def __init__(
+        self,
+        path: str,
+        max_workers: int = 4,
+        extensions: Optional[Tuple[str, ...]] = None,
+        loader_kwargs: Optional[Dict[str, dict]] = None,
+    ):
+        super().__init__(path)
+        self.max_workers = max_workers
+        self.extensions = tuple(ext.lower() for ext in (extensions or LOADER_REGISTRY))
+        # Extra constructor arguments per loader type, e.g. {"pdf": {"split_pages": True}}
+        self.loader_kwargs = loader_kwargs or {}
+
+    def _load_one(self, file_path: str) -> List[Document]:
+        loader_class = get_loader_class(file_path)
+        kwargs = {"max_workers": 1} if loader_class.uses_worker_pool else {}
+        kwargs.update(self.loader_kwargs.get(loader_class.loader_type, {}))
+        loader = loader_class(file_path, **kwargs)
+        return list(loader.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        if not os.path.isdir(self.path):
+            raise ValueError(f"Provided path is not a directory: '{self.path}'")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = _bounded_ordered_map(
+                executor,
+                self._load_one,
+                ((file_path,) for file_path in self._files()),
+                max_in_flight=2 * self.max_workers,
+            )
+            for documents in results:
+                yield from documents
+
+    def load(self):
+        self.load_directory()
 
 
 if __name__ == "__main__":
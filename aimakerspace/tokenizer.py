@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import List
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character heuristic
+    tiktoken = None
+
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING):
+    """Returns a cached tiktoken encoding, or None when tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        # Unknown encoding or no network to fetch its vocabulary.
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used when tiktoken is unavailable.
+
+    English averages about four characters per token, while CJK and other
+    non-ASCII characters are usually one token or more each, so they are
+    counted individually. The estimate errs on the high side.
+    """
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=65536)
+def _cached_count_short(text: str) -> int:
+    return count_tokens(text)
+
+
+def cached_count_tokens(text: str) -> int:
+    """
+    ``count_tokens`` for the default encoding, memoised for short texts such as
+    the words and sentences a splitter measures over and over. Long texts are
+    counted directly so they never pin memory in the cache.
+    """
+    if len(text) > 512:
+        return count_tokens(text)
+    return _cached_count_short(text)
+
+
+def count_tokens_many(texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
@@ -0,0 +1,211 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request breakdown (stage -> milliseconds) being collected, if any
+_breakdown: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timing_breakdown", default=None)
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "labels", "start")
+
+    def __init__(self, tracer: "Tracer", stage: str, labels: dict):
+        self.tracer = tracer
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.observe(self.stage, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "total", "count")
+
+    def __init__(self, n_buckets: int):
+        self.bucket_counts = [0] * n_buckets
+        self.total = 0.0
+        self.count = 0
+
+
+def _label_key(labels: dict) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: _LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Tracer:
+    """
+    Low-overhead latency and counter collection for the RAG hot path.
+
+    Code under measurement wraps each stage in ``with tracer.span("search",
+    mode="hybrid"):``. When the tracer is enabled, the duration goes into a
+    per-(stage, labels) latency histogram; inside ``with tracer.timings() as
+    breakdown:`` it is also added (in milliseconds) to that request's
+    ``breakdown`` dict, which works across awaits and worker threads since it
+    lives in a context variable. Stages may nest, so a breakdown's entries can
+    overlap. With the tracer disabled and no breakdown requested, ``span``
+    returns a shared no-op context manager and ``count`` returns at once.
+
+    ``render_prometheus`` exposes the histograms, counters and the values of
+    registered collectors (e.g. cache statistics) in the Prometheus text format.
+    Usage:
+        tracer.enabled = True
+        with tracer.span("embed_query"):
+            vector = embedding_model.get_embedding(question)
+        print(tracer.render_prometheus())
+    """
+
+    def __init__(self, enabled: bool = False, namespace: str = "rag", buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[Tuple[str, _LabelKey], _Histogram] = {}
+        self._counters: Dict[Tuple[str, _LabelKey], float] = {}
+        self._collectors: Dict[str, Callable[[], Optional[dict]]] = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, **labels):
+        if not self.enabled and _breakdown.get() is None:
+            return _NOOP_SPAN
+        return _Span(self, stage, labels)
+
+    def observe(self, stage: str, seconds: float, **labels) -> None:
+        """Records a duration measured elsewhere, as a span would."""
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown[stage] = breakdown.get(stage, 0.0) + seconds * 1000
+        if not self.enabled:
+            return
+        key = (stage, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram.bucket_counts[i] += 1
+                    break
+            histogram.total += seconds
+            histogram.count += 1
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """Adds ``value`` to the counter ``name`` (e.g. tokens or cache hits)."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def traced_iter(self, stage: str, iterator: Iterator, **labels) -> Iterator:
+        """
+        Yields from ``iterator``, recording the time spent producing items (not
+        the time the consumer holds them) as one ``stage`` observation.
+        """
+        if not self.enabled and _breakdown.get() is None:
+            yield from iterator
+            return
+        elapsed = 0.0
+        iterator = iter(iterator)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe(stage, elapsed, **labels)
+
+    @contextmanager
+    def timings(self):
+        """Collects a stage -> milliseconds breakdown of everything traced inside the block."""
+        breakdown: Dict[str, float] = {}
+        token = _breakdown.set(breakdown)
+        try:
+            yield breakdown
+        finally:
+            _breakdown.reset(token)
+
+    def add_collector(self, name: str, collect: Callable[[], Optional[dict]]) -> None:
+        """Registers a callable whose numeric values are exported as ``<namespace>_<name>_<key>`` gauges."""
+        self._collectors[name] = collect
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        if histograms:
+            metric = f"{self.namespace}_stage_seconds"
+            lines += [
+                f"# HELP {metric} Latency of each RAG stage.",
+                f"# TYPE {metric} histogram",
+            ]
+            for (stage, labels), histogram in histograms:
+                key = (("stage", stage),) + labels
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{metric}_bucket{_format_labels(key + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(key + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {histogram.total}")
+                lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+
+        last_name = None
+        for (name, labels), value in counters:
+            metric = f"{self.namespace}_{name}"
+            if name != last_name:
+                lines.append(f"# TYPE {metric} counter")
+                last_name = name
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for collector_name, collect in sorted(self._collectors.items()):
+            for key, value in sorted((collect() or {}).items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+                    continue
+                metric = f"{self.namespace}_{collector_name}_{key}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Process-wide tracer used by the library; disabled until an application enables it
+tracer = Tracer()
@@ -1,7 +1,19 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
 import numpy as np
 from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Callable
+from aimakerspace.embedding_backends import EmbeddingBackend
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.ivf_index import IVFIndex
+from aimakerspace.dedup import ChunkDeduplicator
+from aimakerspace.bm25_index import BM25Index
+from aimakerspace.metadata_store import MetadataStore
+from aimakerspace.tracing import tracer
 import asyncio
 
 
@@ -13,51 +25,965 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the indices of the k highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _top_k_indices_2d(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise version of ``_top_k_indices`` for a (queries x corpus) score matrix."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+# One lock per store directory, so saves to the same path never interleave
+_save_locks: Dict[str, threading.Lock] = {}
+_save_locks_guard = threading.Lock()
+
+
+def _save_lock(path: str) -> threading.Lock:
+    with _save_locks_guard:
+        return _save_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Tuple[str, float]]], k: int, rrf_k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked (key, score) lists by reciprocal-rank fusion: each key scores
+    the sum of 1 / (rrf_k + rank) over the lists it appears in. Only ranks are
+    used, so lists with incomparable score scales (cosine, BM25) fuse cleanly.
+    """
+    fused: Dict[str, float] = defaultdict(float)
+    for results in result_lists:
+        for rank, (key, _) in enumerate(results, 1):
+            fused[key] += 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
+    """
+    In-memory store of text chunks and their embeddings.
+
+    Two storage modes are available:
+        - "dict" keeps one numpy array per key in ``self.vectors`` and scores
+          queries one key at a time.
+        - "matrix" keeps every embedding, unit-normalised, as a row of one
+          contiguous float32 matrix with a parallel list of keys. Cosine search
+          is then a single matrix-vector product followed by ``argpartition``.
+
+    Matrix storage can additionally be served by an approximate IVF index
+    (see ``build_index``), which scores only the rows near the query.
+
+    Keys are also kept in a BM25 inverted index, so text searches can run in
+    "vector", "lexical" (no embedding call) or "hybrid" mode, the latter fusing
+    both rankings with reciprocal-rank fusion.
+
+    Per-record metadata (source, page, offsets, loader, ingest time) is stored
+    column-wise in a ``MetadataStore``. Every search accepts a ``filter`` (see
+    ``MetadataStore``) that is turned into a row mask before any similarity is
+    computed, so filtered searches still return k matching results.
+
+    ``delete``/``delete_where`` tombstone records: their rows are masked out of
+    every search until ``compact`` (or ``acompact``, which does the copying in a
+    worker thread) rewrites the storage without them. ``aupsert_documents``
+    replaces whole documents, e.g. a revised upload of the same file.
+
+    ``save`` writes the embeddings as a raw float32 file plus a JSON sidecar;
+    ``load`` memory-maps that file, so loading is near-instant and several
+    processes can share the same page-cache pages.
+    """
+
+    STORAGE_MODES = ("dict", "matrix")
+    SEARCH_MODES = ("vector", "lexical", "hybrid")
+    _INITIAL_CAPACITY = 64
+    # Upper bound on queries scored per matrix-matrix product in search_many,
+    # which keeps the (queries x corpus) score block from growing unbounded.
+    _QUERY_BLOCK_SIZE = 256
+    # Filters keeping at most this fraction of rows are scored exactly rather
+    # than through the IVF index, which could otherwise return fewer than k hits.
+    _FILTERED_EXACT_FRACTION = 0.1
+
+    EMBEDDINGS_FILENAME = "embeddings.f32"
+    SIDECAR_FILENAME = "index.json"
+    GENERATION_PREFIX = "gen-"
+    FORMAT_VERSION = 2
+    # Version 1 kept the embeddings next to the sidecar instead of in a generation directory
+    _READABLE_FORMAT_VERSIONS = (1, 2)
+    # Sidecar re-reads allowed when a concurrent save replaces the store mid-load
+    _LOAD_ATTEMPTS = 3
+
+    def __init__(self, embedding_model: EmbeddingBackend = None, storage: str = "dict"):
+        if storage not in self.STORAGE_MODES:
+            raise ValueError(
+                f"storage must be one of {self.STORAGE_MODES}, got '{storage}'"
+            )
+        self.storage = storage
         self.vectors = defaultdict(np.array)
         self.embedding_model = embedding_model or EmbeddingModel()
+        # Model that produced the stored vectors, when loaded from disk
+        self._stored_model_name: Optional[str] = None
+
+        # Matrix storage: row i of self._matrix belongs to self._keys[i].
+        # Only the first len(self._keys) rows are used; the rest is spare capacity.
+        # Deleted keys keep their row (tombstoned in metadata_store) until compaction.
+        self._keys: List[str] = []
+        self._key_to_row: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self.index: Optional[IVFIndex] = None
+        # Lexical index over the keys; None means it is rebuilt on first use
+        self.lexical_index: Optional[BM25Index] = BM25Index()
+        # Bumped on every change to the contents, so caches can detect stale results
+        self.version = 0
+        # Per-key metadata, e.g. the source and character offsets of a chunk.
+        # Its rows follow key insertion order, like the matrix rows.
+        self.metadata_store = MetadataStore()
+        # Held by writes and by save's snapshot, so a save running in a worker
+        # thread never captures a half-applied insert or delete
+        self._write_lock = threading.RLock()
+
+    def __len__(self) -> int:
+        if self.storage == "matrix":
+            return len(self._key_to_row)
+        return len(self.vectors)
+
+    @property
+    def embedding_model_name(self) -> Optional[str]:
+        """Name of the model the stored vectors came from (recorded by ``save``)."""
+        return self._stored_model_name or getattr(self.embedding_model, "embeddings_model_name", None)
+
+    def insert(self, key: str, vector: np.array, metadata: Optional[dict] = None) -> None:
+        with self._write_lock:
+            self.version += 1
+            self.metadata_store.set(key, metadata)
+            if self.lexical_index is not None:
+                self.lexical_index.add(key)
+            if self.storage == "matrix":
+                self._insert_row(key, vector)
+            else:
+                self.vectors[key] = vector
+
+    def _insert_row(self, key: str, vector: np.array) -> None:
+        row_vector = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        if self._matrix is None:
+            self._matrix = np.empty(
+                (self._INITIAL_CAPACITY, row_vector.shape[0]), dtype=np.float32
+            )
+        elif row_vector.shape[0] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Vector dimension {row_vector.shape[0]} does not match "
+                f"database dimension {self._matrix.shape[1]}"
+            )
+
+        row = self._key_to_row.get(key)
+        if row is None or not self._matrix.flags.writeable:
+            self._ensure_writable_capacity()
+        if row is None:
+            row = len(self._keys)
+            if row == self._matrix.shape[0]:
+                grown = np.empty((row * 2, self._matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+            self._keys.append(key)
+            self._key_to_row[key] = row
+        self._matrix[row] = row_vector
+        if self.index is not None:
+            self.index.add(np.array([row]), row_vector.reshape(1, -1))
+
+    def build_index(
+        self, n_lists: Optional[int] = None, nprobe: int = 8, **index_kwargs
+    ) -> IVFIndex:
+        """
+        Builds an IVF approximate index over the current contents.
+
+        Call it after ``abuild_from_list``; later inserts are added to the index
+        automatically. Rebuild it when the corpus has changed substantially, as
+        the centroids are not retrained on insert.
+
+        :param n_lists: Number of k-means lists (defaults to sqrt of the corpus size)
+        :param nprobe: Default number of lists scanned per query
+        """
+        if self.storage != "matrix":
+            raise ValueError("build_index requires storage='matrix'")
+        rows = np.flatnonzero(self.metadata_store.live_mask())
+        matrix = self._live_matrix()[rows]
+        index = IVFIndex(n_lists=n_lists, nprobe=nprobe, **index_kwargs)
+        index.train(matrix)
+        index.add(rows, matrix)
+        self.index = index
+        return index
+
+    def drop_index(self) -> None:
+        self.index = None
 
-    def insert(self, key: str, vector: np.array) -> None:
-        self.vectors[key] = vector
+    def _ensure_writable_capacity(self) -> None:
+        """
+        Copies a read-only (memory-mapped) matrix into RAM before it is modified.
+
+        A loaded database is backed by a read-only ``np.memmap``; the first write
+        moves it into a regular array with room to grow.
+        """
+        if self._matrix.flags.writeable:
+            return
+        live = len(self._keys)
+        writable = np.empty(
+            (max(live * 2, self._INITIAL_CAPACITY), self._matrix.shape[1]),
+            dtype=np.float32,
+        )
+        writable[:live] = self._matrix[:live]
+        self._matrix = writable
+
+    def _live_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[: len(self._keys)]
+
+    def _row_mask(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Boolean mask over rows (in key insertion order) that are live and match
+        ``filter``, or None when every row qualifies.
+        """
+        if filter:
+            return self.metadata_store.mask(filter)
+        if self.metadata_store.deleted_count:
+            return self.metadata_store.live_mask()
+        return None
 
     def search(
         self,
         query_vector: np.array,
         k: int,
         distance_measure: Callable = cosine_similarity,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        filter: Optional[dict] = None,
     ) -> List[Tuple[str, float]]:
-        scores = [
-            (key, distance_measure(query_vector, vector))
-            for key, vector in self.vectors.items()
-        ]
+        """
+        Returns the k closest keys to ``query_vector`` with their scores.
+
+        When an IVF index has been built, cosine searches go through it unless
+        ``exact`` is set; ``nprobe`` overrides the index's default for this call.
+        With a metadata ``filter`` only matching records are scored.
+        """
+        if self.storage == "matrix":
+            return self._search_matrix(query_vector, k, distance_measure, exact, nprobe, filter)
+
+        mask = self._row_mask(filter)
+        if mask is None:
+            items = self.vectors.items()
+        else:
+            keys = self.metadata_store.keys
+            items = [(keys[row], self.vectors[keys[row]]) for row in np.flatnonzero(mask)]
+        scores = [(key, distance_measure(query_vector, vector)) for key, vector in items]
         return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
 
+    def _search_matrix(
+        self,
+        query_vector: np.array,
+        k: int,
+        distance_measure: Callable,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[str, float]]:
+        matrix = self._live_matrix()
+        if matrix.shape[0] == 0:
+            return []
+        mask = self._row_mask(filter)
+        rows = None
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+
+        if distance_measure is cosine_similarity:
+            # Rows are already unit length, so cosine similarity is a dot product.
+            query = _normalize_rows(
+                np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+            )[0]
+            use_index = self.index is not None and not exact
+            if rows is not None and rows.size <= self._FILTERED_EXACT_FRACTION * matrix.shape[0]:
+                use_index = False
+            if use_index:
+                row_ids, scores = self.index.search(query, matrix, k, nprobe, mask)
+                return [
+                    (self._keys[row], float(score))
+                    for row, score in zip(row_ids.tolist(), scores.tolist())
+                ]
+            scores = (matrix if rows is None else matrix[rows]) @ query
+        else:
+            scores = np.array(
+                [
+                    distance_measure(query_vector, row)
+                    for row in (matrix if rows is None else matrix[rows])
+                ],
+                dtype=np.float64,
+            )
+
+        top = _top_k_indices(scores, k)
+        row_ids = top if rows is None else rows[top]
+        return [(self._keys[row], float(scores[i])) for i, row in zip(top, row_ids)]
+
+    def search_many(
+        self,
+        query_vectors: List[np.array],
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        filter: Optional[dict] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Scores several query vectors against the corpus at once.
+
+        With cosine similarity all queries are scored in one matrix-matrix product
+        (per block of ``_QUERY_BLOCK_SIZE`` queries); other distance measures, and
+        searches served by an IVF index, fall back to calling ``search`` per query.
+
+        :return: One top-k result list per query, in the order of ``query_vectors``.
+        """
+        if len(query_vectors) == 0:
+            return []
+        with tracer.span("search_many"):
+            return self._search_many(query_vectors, k, distance_measure, exact, nprobe, filter)
+
+    def _search_many(
+        self,
+        query_vectors: List[np.array],
+        k: int,
+        distance_measure: Callable,
+        exact: bool,
+        nprobe: Optional[int],
+        filter: Optional[dict],
+    ) -> List[List[Tuple[str, float]]]:
+        if distance_measure is not cosine_similarity or (self.index is not None and not exact):
+            return [
+                self.search(query, k, distance_measure, exact, nprobe, filter)
+                for query in query_vectors
+            ]
+
+        mask = self._row_mask(filter)
+        keys, matrix = self._cosine_corpus(None if mask is None else np.flatnonzero(mask))
+        if matrix.shape[0] == 0:
+            return [[] for _ in query_vectors]
+
+        queries = _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        results = []
+        for start in range(0, queries.shape[0], self._QUERY_BLOCK_SIZE):
+            scores = queries[start : start + self._QUERY_BLOCK_SIZE] @ matrix.T
+            top = _top_k_indices_2d(scores, k)
+            for row_scores, row_top in zip(scores, top):
+                results.append([(keys[i], float(row_scores[i])) for i in row_top])
+        return results
+
+    def _cosine_corpus(self, rows: Optional[np.ndarray] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Returns the keys and a unit-normalised float32 matrix for cosine scoring,
+        restricted to ``rows`` (metadata store rows) when given.
+        """
+        if self.storage == "matrix":
+            if rows is None:
+                return self._keys, self._live_matrix()
+            if self._matrix is None:
+                return [], np.empty((0, 0), dtype=np.float32)
+            return [self._keys[row] for row in rows.tolist()], self._live_matrix()[rows]
+        if rows is None:
+            keys = list(self.vectors.keys())
+        else:
+            keys = [self.metadata_store.keys[row] for row in rows.tolist()]
+        if not keys:
+            return [], np.empty((0, 0), dtype=np.float32)
+        matrix = np.asarray([self.vectors[key] for key in keys], dtype=np.float32)
+        return keys, _normalize_rows(matrix)
+
+    def _lexical(self) -> BM25Index:
+        """Returns the BM25 index, building it from the stored keys if needed (e.g. after ``load``)."""
+        index = self.lexical_index
+        if index is not None:
+            return index
+        # Inserts skip the index while it is None, so build it with writes held
+        # off; a second caller waits here and then finds it built.
+        with self._write_lock:
+            if self.lexical_index is None:
+                index = BM25Index()
+                index.add_many(self._key_to_row if self.storage == "matrix" else list(self.vectors))
+                self.lexical_index = index
+            return self.lexical_index
+
+    async def aload_lexical_index(self) -> None:
+        """Builds the BM25 index in a worker thread if it is missing, so async searches never build it inline."""
+        if self.lexical_index is None:
+            await asyncio.to_thread(self._lexical)
+
+    def search_lexical(
+        self, query_text: str, k: int, filter: Optional[dict] = None
+    ) -> List[Tuple[str, float]]:
+        """BM25 keyword search over the keys; needs no embedding call."""
+        mask = self._row_mask(filter) if filter else None
+        allowed = None
+        if mask is not None:
+            keys = self.metadata_store.keys
+            allowed = {keys[row] for row in np.flatnonzero(mask)}
+        return self._lexical().search(query_text, k, allowed)
+
+    def _hybrid_candidates(self, k: int) -> int:
+        # Rank fusion needs more than k candidates per list to reorder them usefully
+        return max(4 * k, 20)
+
+    def search_hybrid(
+        self,
+        query_text: str,
+        query_vector: np.array,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        rrf_k: int = 60,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[str, float]]:
+        """Fuses vector and BM25 rankings; scores are reciprocal-rank-fusion scores."""
+        candidates = self._hybrid_candidates(k)
+        return reciprocal_rank_fusion(
+            [
+                self.search(query_vector, candidates, distance_measure, filter=filter),
+                self.search_lexical(query_text, candidates, filter),
+            ],
+            k,
+            rrf_k,
+        )
+
+    def _check_search_mode(self, mode: str) -> None:
+        if mode not in self.SEARCH_MODES:
+            raise ValueError(f"mode must be one of {self.SEARCH_MODES}, got '{mode}'")
+
+    def search_query(
+        self,
+        query_text: str,
+        query_vector: Optional[np.array],
+        k: int,
+        mode: str = "vector",
+        distance_measure: Callable = cosine_similarity,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Searches in ``mode`` with an already embedded query, for callers that
+        need the query vector themselves. ``query_vector`` may be None in
+        lexical mode.
+        """
+        self._check_search_mode(mode)
+        with tracer.span("search", mode=mode):
+            if mode == "lexical":
+                return self.search_lexical(query_text, k, filter)
+            if mode == "hybrid":
+                return self.search_hybrid(query_text, query_vector, k, distance_measure, filter=filter)
+            return self.search(query_vector, k, distance_measure, filter=filter)
+
     def search_by_text(
         self,
         query_text: str,
         k: int,
         distance_measure: Callable = cosine_similarity,
         return_as_text: bool = False,
+        mode: str = "vector",
+        filter: Optional[dict] = None,
     ) -> List[Tuple[str, float]]:
-        query_vector = self.embedding_model.get_embedding(query_text)
-        results = self.search(query_vector, k, distance_measure)
+        self._check_search_mode(mode)
+        query_vector = None
+        if mode != "lexical":
+            with tracer.span("embed_query"):
+                query_vector = self.embedding_model.get_embedding(query_text)
+        results = self.search_query(query_text, query_vector, k, mode, distance_measure, filter)
         return [result[0] for result in results] if return_as_text else results
 
+    async def asearch_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+        mode: str = "vector",
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[str, float]]:
+        self._check_search_mode(mode)
+        query_vector = None
+        if mode != "vector":
+            await self.aload_lexical_index()
+        if mode != "lexical":
+            with tracer.span("embed_query"):
+                query_vector = await self.embedding_model.async_get_embedding(query_text)
+        results = self.search_query(query_text, query_vector, k, mode, distance_measure, filter)
+        return [result[0] for result in results] if return_as_text else results
+
+    async def asearch_many_by_text(
+        self,
+        query_texts: List[str],
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+        mode: str = "vector",
+        filter: Optional[dict] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Embeds all queries in a single embeddings request and scores them together.
+        """
+        self._check_search_mode(mode)
+        if len(query_texts) == 0:
+            return []
+        if mode != "vector":
+            await self.aload_lexical_index()
+        if mode == "lexical":
+            results = [self.search_lexical(query, k, filter) for query in query_texts]
+        else:
+            query_vectors = await self.embedding_model.async_get_embeddings(query_texts)
+            if mode == "hybrid":
+                candidates = self._hybrid_candidates(k)
+                vector_results = self.search_many(
+                    query_vectors, candidates, distance_measure, filter=filter
+                )
+                results = [
+                    reciprocal_rank_fusion(
+                        [vector_hits, self.search_lexical(query, candidates, filter)], k
+                    )
+                    for query, vector_hits in zip(query_texts, vector_results)
+                ]
+            else:
+                results = self.search_many(query_vectors, k, distance_measure, filter=filter)
+        if return_as_text:
+            return [[result[0] for result in query_results] for query_results in results]
+        return results
+
+    def get_metadata(self, key: str) -> Optional[dict]:
+        return self.metadata_store.get(key)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        """
+        Removes ``keys`` from every search and returns how many existed.
+
+        Matrix rows (and IVF list entries) of deleted keys are only tombstoned;
+        call ``compact`` to reclaim them.
+        """
+        removed = 0
+        with self._write_lock:
+            for key in keys:
+                if not self.metadata_store.delete(key):
+                    continue
+                removed += 1
+                if self.storage == "matrix":
+                    del self._key_to_row[key]
+                else:
+                    self.vectors.pop(key, None)
+                if self.lexical_index is not None:
+                    self.lexical_index.remove(key)
+            if removed:
+                self.version += 1
+        return removed
+
+    def keys_where(self, filter: dict) -> List[str]:
+        """Live keys whose metadata matches ``filter``."""
+        store = self.metadata_store
+        return [store.keys[row] for row in np.flatnonzero(store.mask(filter)).tolist()]
+
+    def delete_where(self, filter: dict) -> int:
+        """Deletes every record matching ``filter``, e.g. ``{"source": "report.pdf"}``."""
+        if not filter:
+            raise ValueError("delete_where requires a non-empty filter")
+        return self.delete(self.keys_where(filter))
+
+    def set_metadata(self, key: str, metadata: dict) -> bool:
+        """Replaces a stored key's metadata; returns False if the key is unknown."""
+        with self._write_lock:
+            if self.metadata_store.row_of(key) is None:
+                return False
+            self.metadata_store.set(key, metadata)
+            self.version += 1
+            return True
+
+    def release_document(
+        self,
+        name: str,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        document_field: str = "source",
+    ) -> Tuple[Set[str], Dict[str, dict]]:
+        """
+        Prepares deleting or replacing the document stored under
+        ``document_field`` = ``name``. Returns the keys only this document holds,
+        which are the ones to delete, and, for keys stored under ``name`` that
+        the ``deduplicator`` knows other documents also contain, key -> one of
+        those documents' metadata, to be applied with ``hand_over``. The
+        deduplicator forgets the keys to delete, so a new version of the
+        document is not dropped as a duplicate of them.
+        """
+        keys = set(self.keys_where({document_field: name}))
+        shared: Dict[str, dict] = {}
+        if deduplicator is not None:
+            shared = {
+                key: metadata
+                for key, metadata in deduplicator.release(name).items()
+                if key in keys
+            }
+            deduplicator.forget(keys - shared.keys())
+        return keys - shared.keys(), shared
+
+    def hand_over(self, name: str, shared: Dict[str, dict], document_field: str = "source") -> None:
+        """Re-attributes keys from ``release_document`` still stored under ``name`` to their other holders."""
+        for key, metadata in shared.items():
+            current = self.get_metadata(key)
+            if current is not None and current.get(document_field) == name:
+                self.set_metadata(key, metadata)
+
+    @property
+    def dead_fraction(self) -> float:
+        """Share of stored rows that are deleted and waiting for compaction."""
+        total = len(self.metadata_store.keys)
+        return self.metadata_store.deleted_count / total if total else 0.0
+
+    def _prepare_compaction(self) -> Optional[dict]:
+        """
+        Builds compacted copies of the storage without touching ``self``, so it
+        can run in a worker thread while searches continue on the old storage.
+        """
+        store = self.metadata_store
+        if not store.deleted_count:
+            return None
+        rows = np.flatnonzero(store.live_mask())
+        plan = {
+            "version": self.version,
+            "index": self.index,
+            "store": store.compacted(rows),
+            "lexical": None,
+        }
+        keys = plan["store"].keys
+        if self.storage == "matrix" and self._matrix is not None:
+            matrix = np.empty(
+                (max(len(keys), self._INITIAL_CAPACITY), self._matrix.shape[1]), dtype=np.float32
+            )
+            matrix[: len(keys)] = self._matrix[rows]
+            plan["matrix"] = matrix
+            if self.index is not None:
+                old_to_new = np.full(len(store.keys), -1, dtype=np.int64)
+                old_to_new[rows] = np.arange(len(rows))
+                plan["compacted_index"] = self.index.remapped(old_to_new)
+        if self.lexical_index is not None:
+            lexical = BM25Index(k1=self.lexical_index.k1, b=self.lexical_index.b)
+            lexical.add_many(keys)
+            plan["lexical"] = lexical
+        return plan
+
+    def _apply_compaction(self, plan: Optional[dict]) -> int:
+        """
+        Swaps in prepared storage; returns the number of rows reclaimed, or 0 if
+        the database changed since the plan was made.
+        """
+        with self._write_lock:
+            if plan is None or plan["version"] != self.version or plan["index"] is not self.index:
+                return 0
+            reclaimed = self.metadata_store.deleted_count
+            self.metadata_store = plan["store"]
+            if self.storage == "matrix":
+                self._keys = list(plan["store"].keys)
+                self._key_to_row = {key: row for row, key in enumerate(self._keys)}
+                if "matrix" in plan:
+                    self._matrix = plan["matrix"]
+                self.index = plan.get("compacted_index")
+            self.lexical_index = plan["lexical"]
+            return reclaimed
+
+    def compact(self) -> int:
+        """Rewrites the storage without deleted rows; returns how many were reclaimed."""
+        return self._apply_compaction(self._prepare_compaction())
+
+    async def acompact(self, max_attempts: int = 3) -> int:
+        """
+        Like ``compact``, with the copying done in a worker thread. The swap
+        happens back on the event loop and is retried if inserts or deletes
+        landed in the meantime.
+        """
+        for _ in range(max_attempts):
+            plan = await asyncio.to_thread(self._prepare_compaction)
+            if plan is None:
+                return 0
+            reclaimed = self._apply_compaction(plan)
+            if reclaimed:
+                return reclaimed
+        return 0
+
     def retrieve_from_key(self, key: str) -> np.array:
+        if self.storage == "matrix":
+            row = self._key_to_row.get(key)
+            # Matrix rows are stored normalised, so this returns the unit vector.
+            return None if row is None else self._matrix[row].copy()
         return self.vectors.get(key, None)
 
-    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
+    def _snapshot(self) -> Tuple[int, List[str], np.ndarray, Dict[str, list]]:
+        """Copies the live keys, embeddings and metadata columns, consistently with ``version``."""
+        with self._write_lock:
+            mask = self._row_mask(None)
+            keys, matrix = self._cosine_corpus(None if mask is None else np.flatnonzero(mask))
+            keys = list(keys)
+            matrix = np.array(matrix, dtype=np.float32, order="C", copy=True)
+            return self.version, keys, matrix, self.metadata_store.to_columns(keys)
+
+    def save(self, path: str) -> int:
+        """
+        Writes the database to the directory ``path`` and returns the
+        ``version`` that was written.
+
+        The contents are copied first, so inserts and deletes made while the
+        files are written (e.g. when saving in a worker thread) are simply left
+        for the next save. The embeddings (unit-normalised float32 rows,
+        row-major, no header) go to ``embeddings.f32`` in a new ``gen-<id>``
+        directory; ``index.json`` holds that generation id, the file size, keys
+        in row order, shape and the name of the embedding model. The sidecar is
+        written to a temporary name and renamed last, and that single rename
+        switches readers from the previous generation to the new one, so a
+        concurrent ``load`` sees either the old store or the new one, never a
+        mix. The previous generation is then removed; readers that already
+        opened it keep their mapping. Saves to the same path in this process
+        run one at a time.
+        """
+        # Only live records are written, so a saved store is always compact
+        version, keys, matrix, metadata_columns = self._snapshot()
+        sidecar = {
+            "format_version": self.FORMAT_VERSION,
+            "dtype": "float32",
+            "count": len(keys),
+            "dimension": int(matrix.shape[1]) if len(keys) else 0,
+            "embeddings_bytes": matrix.nbytes if len(keys) else 0,
+            "embedding_model": self.embedding_model_name,
+            "keys": keys,
+            # Metadata columns, each aligned with "keys"
+            "metadata_columns": metadata_columns,
+        }
+
+        with _save_lock(path):
+            os.makedirs(path, exist_ok=True)
+            sidecar_path = os.path.join(path, self.SIDECAR_FILENAME)
+            previous = self._read_sidecar(path) if os.path.isfile(sidecar_path) else None
+
+            generation = uuid.uuid4().hex
+            sidecar["generation"] = generation
+            generation_dir = os.path.join(path, self.GENERATION_PREFIX + generation)
+            os.makedirs(generation_dir)
+            with open(os.path.join(generation_dir, self.EMBEDDINGS_FILENAME), "wb") as f:
+                matrix.tofile(f)
+            # Named per generation, so saves from other processes never share it
+            sidecar_tmp = f"{sidecar_path}.{generation}.tmp"
+            with open(sidecar_tmp, "w", encoding="utf-8") as f:
+                json.dump(sidecar, f, ensure_ascii=False)
+            os.replace(sidecar_tmp, sidecar_path)
+
+            if previous is not None:
+                previous_embeddings = self._embeddings_path(path, previous)
+                if previous.get("generation"):
+                    shutil.rmtree(os.path.dirname(previous_embeddings), ignore_errors=True)
+                elif os.path.isfile(previous_embeddings):
+                    os.remove(previous_embeddings)
+        return version
+
+    @classmethod
+    def _read_sidecar(cls, path: str) -> dict:
+        with open(os.path.join(path, cls.SIDECAR_FILENAME), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if sidecar.get("format_version") not in cls._READABLE_FORMAT_VERSIONS:
+            raise ValueError(
+                f"Unsupported vector database format: {sidecar.get('format_version')}"
+            )
+        return sidecar
+
+    @classmethod
+    def _embeddings_path(cls, path: str, sidecar: dict) -> str:
+        generation = sidecar.get("generation")
+        if generation:
+            return os.path.join(path, cls.GENERATION_PREFIX + generation, cls.EMBEDDINGS_FILENAME)
+        return os.path.join(path, cls.EMBEDDINGS_FILENAME)
+
+    @classmethod
+    def _open_embeddings(cls, path: str, sidecar: dict, mmap: bool) -> Optional[np.ndarray]:
+        """
+        Opens the embeddings the sidecar refers to, or returns None if they were
+        replaced by a concurrent save (missing, or not the recorded size).
+        """
+        count, dimension = sidecar["count"], sidecar["dimension"]
+        if count == 0:
+            return None
+        expected_bytes = sidecar.get("embeddings_bytes", count * dimension * 4)
+        try:
+            f = open(cls._embeddings_path(path, sidecar), "rb")
+        except FileNotFoundError:
+            return None
+        # Checked and mapped through the open handle, so a later removal cannot affect it
+        with f:
+            if os.fstat(f.fileno()).st_size != expected_bytes:
+                return None
+            if mmap:
+                return np.memmap(f, dtype=np.float32, mode="r", shape=(count, dimension))
+            return np.fromfile(f, dtype=np.float32).reshape(count, dimension)
+
+    @classmethod
+    def load(
+        cls, path: str, embedding_model: EmbeddingBackend = None, mmap: bool = True
+    ) -> "VectorDatabase":
+        """
+        Loads a database written by ``save`` into matrix storage.
+
+        If a concurrent ``save`` replaces the store between reading the
+        sidecar and opening the embeddings, the sidecar is read again.
+
+        :param path: Directory passed to ``save``
+        :param embedding_model: Model used for text queries; a ValueError is raised
+            if its name differs from the model recorded in the saved store
+        :param mmap: Memory-map the embeddings read-only instead of reading them into RAM
+        """
+        if not os.path.isfile(os.path.join(path, cls.SIDECAR_FILENAME)):
+            raise ValueError(f"No saved vector database found at '{path}'")
+        for _ in range(cls._LOAD_ATTEMPTS):
+            sidecar = cls._read_sidecar(path)
+            matrix = cls._open_embeddings(path, sidecar, mmap)
+            if matrix is not None or sidecar["count"] == 0:
+                break
+        else:
+            raise ValueError(
+                f"Embeddings at '{path}' are missing or do not match the sidecar"
+            )
+
+        db = cls(embedding_model=embedding_model, storage="matrix")
+        stored_model_name = sidecar.get("embedding_model")
+        if stored_model_name and db.embedding_model_name and stored_model_name != db.embedding_model_name:
+            raise ValueError(
+                f"Vector database at '{path}' was embedded with '{stored_model_name}', "
+                f"not '{db.embedding_model_name}'; rebuild it with the configured embedding model"
+            )
+        db._stored_model_name = stored_model_name
+        # Rebuilt from the keys on the first lexical search, keeping load near-instant
+        db.lexical_index = None
+        db._keys = list(sidecar["keys"])
+        db._key_to_row = {key: row for row, key in enumerate(db._keys)}
+        db.metadata_store = MetadataStore.from_columns(
+            db._keys, sidecar.get("metadata_columns") or {}
+        )
+        # Stores saved before metadata became column-wise hold one dict per key
+        for key, metadata in zip(db._keys, sidecar.get("metadata") or []):
+            db.metadata_store.set(key, metadata)
+        db._matrix = matrix
+        return db
+
+    async def abuild_from_list(
+        self,
+        list_of_text: List[str],
+        metadatas: Optional[List[dict]] = None,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+    ) -> "VectorDatabase":
+        """
+        Embeds and inserts ``list_of_text``. With a ``deduplicator``, chunks it
+        has already seen (exactly or, if enabled, nearly) are dropped before
+        embedding and counted in its report.
+        """
         if len(list_of_text) > 0:
             print("first item type:", type(list_of_text[0]))
-        list_of_text = [chunk for chunk in list_of_text if isinstance(chunk, str) and chunk.strip()]
-        if not list_of_text:
+        if metadatas is None:
+            metadatas = [None] * len(list_of_text)
+        pairs = [
+            (chunk, metadata)
+            for chunk, metadata in zip(list_of_text, metadatas)
+            if isinstance(chunk, str) and chunk.strip()
+        ]
+        if not pairs:
             raise ValueError("No valid text chunks to embed.")
-        embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
-        for text, embedding in zip(list_of_text, embeddings):
-            self.insert(text, np.array(embedding))
+        if deduplicator is not None:
+            keep, _ = deduplicator.filter(
+                [chunk for chunk, _ in pairs], [metadata for _, metadata in pairs]
+            )
+            pairs = [pairs[i] for i in keep]
+            if not pairs:
+                return self
+        list_of_text = [chunk for chunk, _ in pairs]
+        embeddings = await self.embedding_model.abatch_get_embeddings(list_of_text)
+        ingested_at = time.time()
+        for (text, metadata), embedding in zip(pairs, embeddings):
+            self.insert(text, np.array(embedding), {"ingested_at": ingested_at, **(metadata or {})})
         return self
 
+    async def abuild_from_documents(
+        self,
+        documents: Iterable,
+        batch_size: int = 256,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+    ) -> "VectorDatabase":
+        """
+        Embeds and inserts a (possibly lazy) stream of chunk documents, such as
+        the output of ``CharacterTextSplitter.split_documents``, ``batch_size``
+        chunks at a time, keeping each chunk's metadata.
+        """
+        texts, metadatas = [], []
+        for document in documents:
+            if not document.text.strip():
+                continue
+            texts.append(document.text)
+            metadatas.append(document.metadata)
+            if len(texts) >= batch_size:
+                await self.abuild_from_list(texts, metadatas, deduplicator)
+                texts, metadatas = [], []
+        if texts:
+            await self.abuild_from_list(texts, metadatas, deduplicator)
+        return self
+
+    async def aupsert_documents(
+        self,
+        documents: Iterable,
+        batch_size: int = 256,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        document_field: str = "source",
+    ) -> int:
+        """
+        Inserts chunk documents like ``abuild_from_documents``, replacing what
+        is stored for the same documents: chunks previously stored under a
+        ``document_field`` value that no longer appear in the new version are
+        deleted (see ``release_document``: chunks other documents also contain
+        are kept). The ``deduplicator`` forgets the previous version's chunks
+        first, so unchanged and slightly edited chunks are stored again rather
+        than dropped as duplicates of what is being replaced. Returns the
+        number of chunks deleted.
+        """
+        old_keys, new_keys, seen = set(), set(), set()
+        shared: Dict[str, Dict[str, dict]] = {}
+
+        def track(documents):
+            for document in documents:
+                name = document.metadata.get(document_field)
+                if name is not None and name not in seen:
+                    # Looked up before any chunk of this document is inserted
+                    seen.add(name)
+                    previous, shared[name] = self.release_document(name, deduplicator, document_field)
+                    old_keys.update(previous)
+                new_keys.add(document.text)
+                yield document
+
+        await self.abuild_from_documents(track(documents), batch_size, deduplicator)
+        deleted = self.delete(old_keys - new_keys)
+        for name, keys in shared.items():
+            self.hand_over(name, keys, document_field)
+        return deleted
+
 
 if __name__ == "__main__":
     list_of_text = [
@@ -4,19 +4,33 @@
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import asyncio
+import json
 from typing import Optional
 import os
 import shutil
+import tempfile
 
-from aimakerspace.text_utils import PDFLoader, DocxLoader, TextFileLoader, MarkdownLoader, CharacterTextSplitter
+from aimakerspace.text_utils import PDFLoader, CharacterTextSplitter, LOADER_REGISTRY, get_loader_class
 from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.embedding_backends import HashedTfidfEmbedding, create_embedding_backend
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
 from aimakerspace.openai_utils.chatmodel import ChatOpenAI
 from aimakerspace.rag_pipeline import RetrievalAugmentedQAPipeline
+from aimakerspace.ingestion import IngestionQueue
+from aimakerspace.dedup import ChunkDeduplicator
+from aimakerspace.answer_cache import AnswerCache
+from aimakerspace.context_packer import ContextPacker
+from aimakerspace.collection_manager import CollectionManager
+from aimakerspace.tracing import tracer
 
 app = FastAPI()
 
+# Per-stage latency histograms and token counters, exported on /metrics
+tracer.enabled = os.getenv("TRACING", "1").lower() in ("1", "true", "yes")
+
 # --- Add CORS middleware for cross-origin requests (frontend-backend integration) ---
 app.add_middleware(
     CORSMiddleware,
@@ -30,88 +44,414 @@ app.add_middleware(
 print("Loading and ingesting PDF for RAG pipeline...")
 pdf_path = "tests/tp_mayor_election.pdf"  # Change to your actual PDF path
 
-# 1. Load and split PDF
-documents = PDFLoader(pdf_path).load_documents()
-splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-chunks = splitter.split_texts(documents)
+# Saved index location; reused on later starts so the PDF is not re-embedded
+vector_db_path = os.getenv("VECTOR_DB_PATH", "vector_store/tp_mayor_election")
+
+# Embedding backend: "openai" (API) or "hashed-tfidf" (local, CPU-only, no network call)
+embedding_backend = os.getenv("EMBEDDING_BACKEND", "openai")
+if embedding_backend == "openai":
+    # Embedding cache: repeated questions and re-uploaded chunks are not re-embedded
+    embedding_cache = EmbeddingCache(
+        max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "50000")),
+        db_path=os.getenv("EMBEDDING_CACHE_PATH", "vector_store/embedding_cache.sqlite3"),
+    )
+    embedding_model = create_embedding_backend("openai", cache=embedding_cache)
+else:
+    embedding_model = create_embedding_backend(
+        embedding_backend,
+        dimension=int(os.getenv("LOCAL_EMBEDDING_DIM", "512")),
+        idf_path=os.getenv("LOCAL_EMBEDDING_IDF_PATH", "vector_store/hashed_tfidf_idf.npy"),
+    )
 
-# 2. Build vector database (async)
-vector_db = VectorDatabase()
-vector_db = asyncio.run(vector_db.abuild_from_list(chunks))
+# Duplicate chunks (repeated headers, footers, boilerplate pages) are dropped before embedding
+deduplicator = ChunkDeduplicator(
+    near_duplicates=os.getenv("DEDUP_NEAR_DUPLICATES", "1").lower() in ("1", "true", "yes"),
+    threshold=float(os.getenv("DEDUP_THRESHOLD", "0.85")),
+)
+
+vector_db = None
+if os.path.isfile(os.path.join(vector_db_path, VectorDatabase.SIDECAR_FILENAME)):
+    try:
+        # Memory-mapped load: near-instant, and workers share the same page cache
+        vector_db = VectorDatabase.load(vector_db_path, embedding_model=embedding_model)
+    except ValueError as e:
+        # Saved with another embedding model: its vectors are useless for our queries
+        print(f"{e}; re-embedding the PDF")
+if vector_db is None:
+    # 1. Load and split PDF (chunks keep their source and character offsets)
+    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = splitter.split_documents(PDFLoader(pdf_path).lazy_load())
+    if isinstance(embedding_model, HashedTfidfEmbedding) and embedding_model.idf is None:
+        # The IDF weights are learnt once from the initial corpus and saved with the store
+        chunks = list(chunks)
+        embedding_model.fit(chunk.text for chunk in chunks)
+
+    # 2. Build vector database (async) and save it for the next start
+    vector_db = VectorDatabase(embedding_model=embedding_model, storage="matrix")
+    vector_db = asyncio.run(vector_db.abuild_from_documents(chunks, deduplicator=deduplicator))
+    vector_db.save(vector_db_path)
 
 # 3. Initialize LLM and RAG pipeline
 llm = ChatOpenAI()
+# Repeated and paraphrased questions are answered from cache until the index changes
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+)
+# Overlapping chunks are merged, weak ones dropped and the rest fit to a token budget
+context_packer = ContextPacker(
+    max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "3000")),
+    min_relative_score=float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0")) or None,
+    extract_sentences=os.getenv("CONTEXT_EXTRACT_SENTENCES", "0").lower() in ("1", "true", "yes"),
+)
 rag_pipeline = RetrievalAugmentedQAPipeline(
     vector_db_retriever=vector_db,
     llm=llm,
     response_style="detailed",
-    include_scores=True
+    include_scores=True,
+    # "hybrid" fuses BM25 keyword matches with vector similarity
+    search_mode=os.getenv("SEARCH_MODE", "hybrid"),
+    answer_cache=answer_cache,
+    context_packer=context_packer
 )
 
 # --- Request/Response Models ---
 class RAGQueryRequest(BaseModel):
     question: str
     k: int = 3
+    mode: Optional[str] = None  # "vector", "lexical" or "hybrid"; defaults to SEARCH_MODE
+    filter: Optional[dict] = None  # metadata filter, e.g. {"source": "report.pdf"}
+    timings: bool = False  # include a per-stage latency breakdown (ms) in the response
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 5
+    mode: str = "lexical"
+    filter: Optional[dict] = None
 
 class RAGQueryResponse(BaseModel):
     answer: str
     context: Optional[list] = None
+    timings: Optional[dict] = None
     
 
 # --- Endpoint for user queries ---
 @app.post("/rag_answer", response_model=RAGQueryResponse)
-def rag_answer(request: RAGQueryRequest):
+async def rag_answer(request: RAGQueryRequest):
     try:
-        result = rag_pipeline.run_pipeline(request.question, k=request.k)
+        result = await rag_pipeline.arun_pipeline(
+            request.question, k=request.k, mode=request.mode, filter=request.filter,
+            timings=request.timings
+        )
         return RAGQueryResponse(
             answer=result["response"],
-            context=result["context"]
+            context=result["context"],
+            timings=result.get("timings")
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Streaming endpoint (Server-Sent Events) ---
+# Emits one "context" event with the retrieved sources, then "token" events as the
+# answer is generated, then a final "done" event.
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/rag_answer_stream")
+async def rag_answer_stream(request: RAGQueryRequest):
+    try:
+        result = await rag_pipeline.astream_pipeline(
+            request.question, k=request.k, mode=request.mode, filter=request.filter,
+            timings=request.timings
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        yield sse_event("context", result["context"])
+        try:
+            async for token in result["response"]:
+                yield sse_event("token", token)
+        except Exception as e:
+            yield sse_event("error", str(e))
+            return
+        yield sse_event("done", {"timings": result["timings"]} if "timings" in result else {})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# --- Retrieval only (no LLM call); the default lexical mode needs no embedding call either ---
+@app.post("/search")
+async def search(request: SearchRequest):
+    return await search_results(vector_db, request)
+
+async def search_results(db: VectorDatabase, request: SearchRequest):
+    if request.mode not in VectorDatabase.SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {VectorDatabase.SEARCH_MODES}")
+    try:
+        results = await db.asearch_by_text(
+            request.query, k=request.k, mode=request.mode, filter=request.filter
+        )
+    except ValueError as e:  # unknown filter operator
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "results": [
+            {"text": key, "score": score, "metadata": db.get_metadata(key)}
+            for key, score in results
+        ]
+    }
+
 # --- New endpoint for chat+file upload ---
 def get_loader_for_file(filename: str, path: str):
-    ext = filename.lower().split('.')[-1]
-    if ext == "pdf":
-        return PDFLoader(path)
-    elif ext == "docx":
-        return DocxLoader(path)
-    elif ext == "txt":
-        return TextFileLoader(path)
-    elif ext == "md":
-        return MarkdownLoader(path)
-    else:
-        raise ValueError("Unsupported file type")
+    # Dispatch on the original filename's extension through the loader registry
+    return get_loader_class(filename)(path)
+
+SUPPORTED_UPLOAD_EXTENSIONS = {ext.lstrip(".") for ext in LOADER_REGISTRY}
+
+# Background ingestion: uploads are parsed, split and embedded by queue workers and
+# appended to the live vector_db batch by batch, while queries keep being served.
+# Re-uploading a file with the same name replaces the previous version's chunks.
+compact_threshold = float(os.getenv("COMPACT_THRESHOLD", "0.25"))
+ingestion_queue = IngestionQueue(
+    vector_db,
+    loader_factory=get_loader_for_file,
+    splitter=CharacterTextSplitter(chunk_size=1000, chunk_overlap=200),
+    num_workers=int(os.getenv("INGESTION_WORKERS", "2")),
+    deduplicator=deduplicator,
+    compact_threshold=compact_threshold,
+)
+
+# --- Collections: isolated per-user/session indexes, loaded on demand and evicted to disk ---
+collections = CollectionManager(
+    os.getenv("COLLECTIONS_PATH", "vector_store/collections"),
+    embedding_model,
+    max_loaded=int(os.getenv("MAX_LOADED_COLLECTIONS", "16")),
+)
+collection_idle_seconds = float(os.getenv("COLLECTION_IDLE_SECONDS", "900"))
+background_tasks = set()
+
+def spawn(coroutine):
+    # Keep a reference so the task is not garbage-collected before it finishes
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def evict_idle_collections():
+    while True:
+        await asyncio.sleep(60)
+        await asyncio.to_thread(collections.evict_idle, collection_idle_seconds)
+
+def write_evicted_collections():
+    # Collections pushed over MAX_LOADED_COLLECTIONS are saved off the event loop
+    if collections.unwritten:
+        spawn(asyncio.to_thread(collections.write_evicted))
+
+def get_collection(name: str, create: bool = False) -> VectorDatabase:
+    try:
+        return collections.get(name, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown collection '{name}'")
+    finally:
+        write_evicted_collections()
+
+def collection_pipeline(name: str) -> RetrievalAugmentedQAPipeline:
+    # No answer cache here: the shared one must never serve one tenant's answer to another
+    return RetrievalAugmentedQAPipeline(
+        vector_db_retriever=get_collection(name),
+        llm=llm,
+        response_style="detailed",
+        include_scores=True,
+        search_mode=rag_pipeline.search_mode,
+        context_packer=context_packer
+    )
+
+@app.on_event("startup")
+async def start_ingestion_queue():
+    await ingestion_queue.start()
+    spawn(evict_idle_collections())
+
+@app.on_event("shutdown")
+async def stop_ingestion_queue():
+    await ingestion_queue.stop()
+    collections.save_all()
+
+async def enqueue_upload(file: UploadFile, collection: Optional[str] = None):
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Uploaded file must have a filename.")
+    ext = file.filename.lower().split('.')[-1]
+    if ext not in SUPPORTED_UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    # Each upload gets its own temp file, so concurrent uploads never collide
+    def spool_to_disk():
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+            return buffer.name
+
+    if collection is None:
+        temp_path = await asyncio.to_thread(spool_to_disk)
+        return ingestion_queue.submit(temp_path, file.filename)
+
+    # Pinned so the collection is not evicted while the job writes to it
+    try:
+        target = collections.pin(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        write_evicted_collections()
+    try:
+        temp_path = await asyncio.to_thread(spool_to_disk)
+    except Exception:
+        collections.unpin(collection)
+        raise
+    # A per-upload deduplicator: the shared one would drop chunks another tenant already has
+    job = ingestion_queue.submit(
+        temp_path,
+        file.filename,
+        vector_db=target,
+        deduplicator=ChunkDeduplicator(
+            near_duplicates=deduplicator.near_duplicates, threshold=deduplicator.threshold
+        ),
+        collection=collection,
+    )
+
+    async def unpin_when_done():
+        await job.wait()
+        collections.unpin(collection)
+        await asyncio.to_thread(collections.save, collection)
+
+    spawn(unpin_when_done())
+    return job
+
+@app.post("/upload")
+async def upload(file: UploadFile = File(...)):
+    job = await enqueue_upload(file)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_dict()
 
 @app.post("/upload_and_ask")
 async def upload_and_ask(
     message: str = Form(...),
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    wait: bool = Form(True),
+    collection: Optional[str] = Form(None)
 ):
-    # 1. If file is present, save and ingest it
+    # 1. If file is present, queue it for ingestion. By default the answer waits for
+    # it, so it can use the attached file; awaiting the job does not block other requests.
+    job = None
     if file:
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="Uploaded file must have a filename.")
-        ext = file.filename.split('.')[-1]
-        temp_path = f"temp_upload.{ext}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        try:
-            loader = get_loader_for_file(file.filename, temp_path)
-            documents = loader.load_documents()
-            splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = splitter.split_texts(documents)
-            # Ingest into the global vector_db (async)
-            await asyncio.get_event_loop().run_in_executor(
-                None, lambda: asyncio.run(vector_db.abuild_from_list(chunks))
-            )
-        finally:
-            os.remove(temp_path)
-
-    # 2. Run the RAG pipeline with the user's question
-    result = rag_pipeline.run_pipeline(message, k=3)
-    return {"answer": result["response"], "context": result.get("context", [])}
+        job = await enqueue_upload(file, collection)
+        if wait:
+            await job.wait()
+
+    # 2. Run the RAG pipeline with the user's question against the current index
+    pipeline = collection_pipeline(collection) if collection else rag_pipeline
+    result = await pipeline.arun_pipeline(message, k=3)
+    return {
+        "answer": result["response"],
+        "context": result.get("context", []),
+        "job": job.to_dict() if job else None
+    }
+
+async def delete_document(
+    db: VectorDatabase, source: str, deduplicator: Optional[ChunkDeduplicator] = None
+) -> dict:
+    # Chunks other files also contain are kept and re-attributed; the rest are
+    # forgotten by the deduplicator, so re-uploading the file stores them again
+    keys, shared = db.release_document(source, deduplicator)
+    deleted = db.delete(keys)
+    db.hand_over(source, shared)
+    if not deleted and not shared:
+        raise HTTPException(status_code=404, detail=f"No chunks stored for '{source}'")
+    reclaimed = 0
+    if db.dead_fraction > compact_threshold:
+        reclaimed = await db.acompact()
+    return {"source": source, "chunks_deleted": deleted, "rows_reclaimed": reclaimed}
+
+@app.delete("/documents/{source}")
+async def delete_document_from_index(source: str):
+    return await delete_document(vector_db, source, deduplicator)
+
+@app.get("/collections")
+async def list_collections():
+    return {"collections": collections.names(), **collections.stats()}
+
+@app.post("/collections/{name}/upload")
+async def collection_upload(name: str, file: UploadFile = File(...)):
+    job = await enqueue_upload(file, name)
+    return job.to_dict()
+
+@app.post("/collections/{name}/rag_answer", response_model=RAGQueryResponse)
+async def collection_rag_answer(name: str, request: RAGQueryRequest):
+    pipeline = collection_pipeline(name)
+    try:
+        result = await pipeline.arun_pipeline(
+            request.question, k=request.k, mode=request.mode, filter=request.filter,
+            timings=request.timings
+        )
+        return RAGQueryResponse(
+            answer=result["response"], context=result["context"], timings=result.get("timings")
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/collections/{name}/search")
+async def collection_search(name: str, request: SearchRequest):
+    return await search_results(get_collection(name), request)
+
+@app.delete("/collections/{name}/documents/{source}")
+async def delete_collection_document(name: str, source: str):
+    result = await delete_document(get_collection(name), source)
+    await asyncio.to_thread(collections.save, name)
+    return result
+
+@app.delete("/collections/{name}")
+async def delete_collection(name: str):
+    try:
+        deleted = collections.delete(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=409, detail=f"Collection '{name}' is missing or still ingesting")
+    return {"deleted": name}
+
+# Embedding cache hit/miss counters
+@app.get("/api/embedding_cache")
+async def embedding_cache_stats():
+    return embedding_model.cache_stats()
+
+# Answer cache hit/miss counters
+@app.get("/api/answer_cache")
+async def answer_cache_stats():
+    return answer_cache.stats()
+
+# Chunks and tokens saved by deduplication since startup
+@app.get("/api/dedup")
+async def dedup_stats():
+    return deduplicator.report.to_dict()
+
+# Prompt tokens saved by context packing since startup
+@app.get("/api/context_packing")
+async def context_packing_stats():
+    return context_packer.stats()
+
+# Prometheus scrape endpoint: stage latencies, token counts and cache statistics
+tracer.add_collector("embedding_cache", embedding_model.cache_stats)
+tracer.add_collector("answer_cache", answer_cache.stats)
+tracer.add_collector("context_packing", context_packer.stats)
+tracer.add_collector("dedup", lambda: deduplicator.report.to_dict())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return tracer.render_prometheus()
 
 # Define a health check endpoint to verify API status
 @app.get("/api/health")
@@ -0,0 +1,74 @@
+"""
+Recall/latency benchmark for the IVF index against exact VectorDatabase search.
+
+Run from the project root:
+    python -m benchmarks.ann_benchmark --n 100000 --dim 256 --nprobe 1 4 16 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+class _NoEmbeddingModel:
+    embeddings_model_name = "none"
+
+
+def clustered_vectors(n: int, dim: int, n_clusters: int, seed: int) -> np.ndarray:
+    """Gaussian blobs on the unit sphere, a rough stand-in for real embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)]
+    vectors += 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed_search(db: VectorDatabase, queries: np.ndarray, k: int, **search_kwargs):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = db.search(query, k=k, **search_kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({key for key, _ in hits})
+    return results, np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=50_000, help="corpus size")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    corpus = clustered_vectors(args.n, args.dim, n_clusters=max(8, args.n // 500), seed=0)
+    queries = clustered_vectors(args.queries, args.dim, n_clusters=max(8, args.n // 500), seed=1)
+
+    db = VectorDatabase(embedding_model=_NoEmbeddingModel(), storage="matrix")
+    for i, vector in enumerate(corpus):
+        db.insert(str(i), vector)
+
+    start = time.perf_counter()
+    index = db.build_index(n_lists=args.n_lists)
+    build_seconds = time.perf_counter() - start
+    print(f"corpus={args.n} dim={args.dim} n_lists={index.n_lists} build={build_seconds:.2f}s")
+
+    exact, latencies = timed_search(db, queries, args.k, exact=True)
+    print(f"{'mode':>10} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'exact':>10} {1.0:>10.3f} {np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f}")
+
+    for nprobe in args.nprobe:
+        approx, latencies = timed_search(db, queries, args.k, nprobe=nprobe)
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)])
+        print(
+            f"{'nprobe=' + str(nprobe):>10} {recall:>10.3f} "
+            f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
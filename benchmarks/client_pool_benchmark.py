@@ -0,0 +1,94 @@
+"""
+Per-request latency of a new OpenAI client per call versus the shared pooled client.
+
+A local stub HTTP server stands in for the chat completions endpoint, so no API
+key or network access is needed. Against the real API the gap is larger, as
+every new client also pays DNS and TLS setup.
+Run from the project root:
+    python -m benchmarks.client_pool_benchmark --requests 300
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from openai import OpenAI
+
+from aimakerspace.openai_utils.clients import ClientConfig, get_openai_client
+
+_COMPLETION = json.dumps(
+    {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+).encode("utf-8")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive between requests
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_COMPLETION)))
+        self.end_headers()
+        self.wfile.write(_COMPLETION)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(make_client, n_requests: int) -> np.ndarray:
+    messages = [{"role": "user", "content": "hi"}]
+    latencies = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        make_client().chat.completions.create(model="stub", messages=messages)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    config = ClientConfig(base_url=base_url, api_key="sk-stub", max_retries=0)
+
+    per_call = measure(
+        lambda: OpenAI(base_url=base_url, api_key="sk-stub", max_retries=0), args.requests
+    )
+    pooled = measure(lambda: get_openai_client(config), args.requests)
+    server.shutdown()
+
+    print(f"{'client':>10} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, latencies in (("per-call", per_call), ("pooled", pooled)):
+        print(
+            f"{name:>10} {np.percentile(latencies, 50):>8.3f} "
+            f"{np.percentile(latencies, 99):>8.3f} {latencies.mean():>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
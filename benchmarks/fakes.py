@@ -0,0 +1,103 @@
+"""
+Local stand-ins for EmbeddingModel and ChatOpenAI, so ingestion and query
+performance can be measured without an API key or network access.
+"""
+import asyncio
+import re
+import time
+import zlib
+from typing import List
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+class HashEmbeddingModel:
+    """
+    Deterministic embeddings from hashed words: each word adds +-1 to a
+    dimension picked by its CRC32, and the sum is unit-normalised. Texts
+    sharing words get similar vectors, so retrieval behaves plausibly.
+
+    ``latency`` seconds are slept per request (once per batch in the batch
+    methods) to imitate a remote embedding service.
+    """
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.embeddings_model_name = f"hash-{dimension}"
+        self.requests = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = zlib.crc32(word.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def get_embedding(self, text: str) -> List[float]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in list_of_text]
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in list_of_text]
+
+    async def abatch_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        return await self.async_get_embeddings(list_of_text)
+
+
+class CannedChatModel:
+    """
+    Answers every prompt with ``reply``, after ``latency`` seconds (time to
+    first token); streams it word by word with ``token_delay`` seconds between
+    tokens.
+    """
+
+    def __init__(self, reply: str = "This is a canned answer.", latency: float = 0.0,
+                 token_delay: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.model_name = "canned"
+
+    def _total_delay(self) -> float:
+        return self.latency + self.token_delay * (len(self.reply.split(" ")) - 1)
+
+    def run(self, messages, text_only: bool = True, **kwargs):
+        if self._total_delay():
+            time.sleep(self._total_delay())
+        return self.reply
+
+    async def arun(self, messages, text_only: bool = True, **kwargs):
+        if self._total_delay():
+            await asyncio.sleep(self._total_delay())
+        return self.reply
+
+    async def astream(self, messages, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for i, word in enumerate(self.reply.split(" ")):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
@@ -0,0 +1,72 @@
+"""
+Rendering cost of the RAG prompts: the original regex + str.format
+implementation against the compiled templates in openai_utils.prompts.
+
+Run from the project root:
+    python -m benchmarks.prompt_benchmark --iterations 20000 --context-chars 4000
+"""
+import argparse
+import re
+import time
+
+from aimakerspace.openai_utils.prompts import SystemRolePrompt, UserRolePrompt
+from aimakerspace.rag_pipeline import RAG_SYSTEM_TEMPLATE, RAG_USER_TEMPLATE
+
+_PLACEHOLDER = re.compile(r"\{([^}]+)\}")
+
+
+def legacy_format(template: str, **kwargs) -> str:
+    """BasePrompt.format_prompt before templates were compiled."""
+    matches = _PLACEHOLDER.findall(template)
+    return template.format(**{match: kwargs.get(match, "") for match in matches})
+
+
+def per_second(function, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--context-chars", type=int, default=4000)
+    args = parser.parse_args()
+
+    system_values = {"response_style": "detailed", "response_length": "comprehensive"}
+    user_values = {
+        "context": "[Source 1]: " + "lorem ipsum " * (args.context_chars // 12),
+        "context_count": 3,
+        "similarity_scores": "Relevance scores: Source 1: 0.912, Source 2: 0.874, Source 3: 0.801",
+        "user_query": "Who won the mayor election?",
+    }
+    system_prompt = SystemRolePrompt(RAG_SYSTEM_TEMPLATE)
+    cached_system_prompt = SystemRolePrompt(RAG_SYSTEM_TEMPLATE, cache_size=16)
+    user_prompt = UserRolePrompt(RAG_USER_TEMPLATE)
+
+    assert system_prompt.format_prompt(**system_values) == legacy_format(RAG_SYSTEM_TEMPLATE, **system_values)
+    assert user_prompt.format_prompt(**user_values) == legacy_format(RAG_USER_TEMPLATE, **user_values)
+
+    cases = {
+        "system": (
+            lambda: legacy_format(RAG_SYSTEM_TEMPLATE, **system_values),
+            lambda: system_prompt.format_prompt(**system_values),
+        ),
+        "system (cached)": (
+            lambda: legacy_format(RAG_SYSTEM_TEMPLATE, **system_values),
+            lambda: cached_system_prompt.format_prompt(**system_values),
+        ),
+        "user": (
+            lambda: legacy_format(RAG_USER_TEMPLATE, **user_values),
+            lambda: user_prompt.format_prompt(**user_values),
+        ),
+    }
+    for name, (legacy, compiled) in cases.items():
+        before = per_second(legacy, args.iterations)
+        after = per_second(compiled, args.iterations)
+        print(f"{name:>16}: legacy {before:10,.0f}/s  compiled {after:10,.0f}/s  x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput and chunk-size benchmark for the text splitters.
+
+Run from the project root:
+    python -m benchmarks.splitter_benchmark --mb 4 --chunk-size 1000 --token-chunk-size 256
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from aimakerspace.text_utils import (
+    CharacterTextSplitter,
+    RecursiveCharacterTextSplitter,
+    TokenTextSplitter,
+)
+from aimakerspace.tokenizer import count_tokens_many
+
+
+def synthetic_corpus(size_bytes: int, seed: int) -> str:
+    """Paragraphs of short sentences drawn from a small vocabulary."""
+    rng = random.Random(seed)
+    words = [
+        "city", "council", "mayor", "budget", "vote", "election", "district",
+        "housing", "transit", "school", "park", "tax", "plan", "public", "safety",
+    ]
+    paragraphs, size = [], 0
+    while size < size_bytes:
+        sentences = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(6, 20))).capitalize() + "."
+            for _ in range(rng.randint(2, 8))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=2.0, help="corpus size in megabytes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="characters")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="characters")
+    parser.add_argument("--token-chunk-size", type=int, default=256)
+    parser.add_argument("--token-chunk-overlap", type=int, default=32)
+    args = parser.parse_args()
+
+    text = synthetic_corpus(int(args.mb * 1024 * 1024), seed=0)
+    splitters = {
+        "character": CharacterTextSplitter(args.chunk_size, args.chunk_overlap),
+        "recursive": RecursiveCharacterTextSplitter(args.chunk_size, args.chunk_overlap),
+        "token": TokenTextSplitter(args.token_chunk_size, args.token_chunk_overlap),
+    }
+
+    print(f"corpus={len(text) / 1e6:.1f}MB")
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        chunks = splitter.split(text)
+        seconds = time.perf_counter() - start
+        tokens = np.asarray(count_tokens_many(chunks))
+        p50, p95 = np.percentile(tokens, [50, 95])
+        print(
+            f"{name:>10}: {len(text) / 1e6 / seconds:7.1f} MB/s  chunks={len(chunks):6d}  "
+            f"tokens min={tokens.min()} p50={p50:.0f} p95={p95:.0f} max={tokens.max()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Offline benchmark suite: loaders, splitters, index build, search and the RAG pipeline.
+
+Embeddings and chat completions come from the local stand-ins in
+benchmarks/fakes.py, so no API key or network access is needed. Results are
+written as JSON and can be compared with an earlier run, e.g. of another commit.
+Run from the project root:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --scenarios search --sizes 10000 100000 1000000 --output bench.json
+    python -m benchmarks.suite --quick --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from aimakerspace.context_packer import ContextPacker
+from aimakerspace.rag_pipeline import RetrievalAugmentedQAPipeline
+from aimakerspace.text_utils import (
+    CharacterTextSplitter,
+    RecursiveCharacterTextSplitter,
+    TokenTextSplitter,
+    get_loader_class,
+)
+from aimakerspace.vectordatabase import VectorDatabase
+from benchmarks.ann_benchmark import clustered_vectors
+from benchmarks.fakes import CannedChatModel, HashEmbeddingModel
+from benchmarks.splitter_benchmark import synthetic_corpus
+
+FORMAT_VERSION = 1
+SCENARIOS = ("loaders", "splitters", "index", "search", "pipeline")
+_SAMPLE_FILES = ("tests/tp_mayor_election.pdf", "tests/sample_test.docx")
+
+
+def result(scenario: str, name: str, params: dict, **metrics) -> dict:
+    return {"scenario": scenario, "name": name, "params": params, "metrics": metrics}
+
+
+def latency_metrics(latencies_ms: List[float]) -> dict:
+    latencies = np.asarray(latencies_ms)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(latencies.mean()),
+        "qps": float(1000 / latencies.mean()) if latencies.mean() > 0 else float("inf"),
+    }
+
+
+def timed_calls(function: Callable, arguments: list) -> List[float]:
+    latencies = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def bench_loaders(args) -> List[dict]:
+    """Loader throughput over synthetic text/markdown files and the sample PDF/DOCX files."""
+    results = []
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        text = synthetic_corpus(int(args.loader_mb * 1024 * 1024), seed=0)
+        files = []
+        for ext in (".txt", ".md"):
+            path = os.path.join(workdir, f"corpus{ext}")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            files.append(path)
+        files += [path for path in _SAMPLE_FILES if os.path.exists(path)]
+
+        for path in files:
+            loader_class = get_loader_class(path)
+            size = os.path.getsize(path)
+            repeats = max(1, int(args.loader_mb * 1024 * 1024 // size)) if size < 1024 * 1024 else 1
+            start = time.perf_counter()
+            characters = 0
+            for _ in range(repeats):
+                for document in loader_class(path).lazy_load():
+                    characters += len(document.text)
+            seconds = time.perf_counter() - start
+            results.append(result(
+                "loaders", loader_class.loader_type, {"file": os.path.basename(path), "repeats": repeats},
+                mb_per_s=size * repeats / 1e6 / seconds,
+                chars_per_s=characters / seconds,
+                seconds=seconds,
+            ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_splitters(args) -> List[dict]:
+    text = synthetic_corpus(int(args.splitter_mb * 1024 * 1024), seed=0)
+    splitters = {
+        "character": CharacterTextSplitter(1000, 200),
+        "recursive": RecursiveCharacterTextSplitter(1000, 200),
+        "token": TokenTextSplitter(256, 32),
+    }
+    results = []
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        chunks = splitter.split(text)
+        seconds = time.perf_counter() - start
+        results.append(result(
+            "splitters", name, {"mb": args.splitter_mb},
+            mb_per_s=len(text) / 1e6 / seconds, chunks=len(chunks), seconds=seconds,
+        ))
+    return results
+
+
+def vector_database(n: int, dim: int) -> Tuple[VectorDatabase, float]:
+    """A matrix-storage database of ``n`` clustered vectors and its insert time in seconds."""
+    corpus = clustered_vectors(n, dim, n_clusters=max(8, n // 500), seed=0)
+    db = VectorDatabase(embedding_model=HashEmbeddingModel(dim), storage="matrix")
+    start = time.perf_counter()
+    for i, vector in enumerate(corpus):
+        db.insert(str(i), vector)
+    return db, time.perf_counter() - start
+
+
+def bench_index_and_search(args, include_index: bool, include_search: bool) -> List[dict]:
+    results = []
+    for n in args.sizes:
+        params = {"n": n, "dim": args.dim}
+        db, insert_seconds = vector_database(n, args.dim)
+        start = time.perf_counter()
+        index = db.build_index()
+        build_seconds = time.perf_counter() - start
+        if include_index:
+            results.append(result(
+                "index", "insert", params, seconds=insert_seconds, vectors_per_s=n / insert_seconds
+            ))
+            results.append(result(
+                "index", "ivf_build", {**params, "n_lists": index.n_lists}, seconds=build_seconds
+            ))
+        if not include_search:
+            continue
+
+        queries = list(clustered_vectors(args.queries, args.dim, n_clusters=max(8, n // 500), seed=1))
+        k = args.k
+        exact = timed_calls(lambda query: db.search(query, k=k, exact=True), queries)
+        results.append(result("search", "exact", {**params, "k": k}, **latency_metrics(exact)))
+        for nprobe in (1, 8, 32):
+            approx = timed_calls(lambda query: db.search(query, k=k, nprobe=nprobe), queries)
+            results.append(result(
+                "search", "ivf", {**params, "k": k, "nprobe": nprobe}, **latency_metrics(approx)
+            ))
+        start = time.perf_counter()
+        db.search_many(queries, k=k, exact=True)
+        seconds = time.perf_counter() - start
+        results.append(result(
+            "search", "exact_batch", {**params, "k": k, "queries": len(queries)},
+            qps=len(queries) / seconds, seconds=seconds,
+        ))
+    return results
+
+
+def bench_pipeline(args) -> List[dict]:
+    """End-to-end RAG latency per search mode, with a fake LLM of fixed latency."""
+    text = synthetic_corpus(int(args.pipeline_mb * 1024 * 1024), seed=2)
+    chunks = CharacterTextSplitter(1000, 200).split(text)
+    embedding_model = HashEmbeddingModel(args.dim)
+    db = VectorDatabase(embedding_model=embedding_model, storage="matrix")
+    start = time.perf_counter()
+    asyncio.run(db.abuild_from_list(chunks, [{"source": "corpus.txt"} for _ in chunks]))
+    ingest_seconds = time.perf_counter() - start
+    results = [result(
+        "pipeline", "ingest", {"chunks": len(chunks), "dim": args.dim},
+        seconds=ingest_seconds, chunks_per_s=len(chunks) / ingest_seconds,
+    )]
+
+    llm = CannedChatModel(latency=args.llm_latency, token_delay=args.llm_latency / 10)
+    pipeline = RetrievalAugmentedQAPipeline(
+        llm=llm, vector_db_retriever=db, include_scores=True, context_packer=ContextPacker()
+    )
+    questions = [" ".join(chunk.split()[:8]) for chunk in chunks[:: max(1, len(chunks) // args.queries)]]
+    params = {"chunks": len(chunks), "k": 4, "llm_latency_ms": args.llm_latency * 1000}
+
+    async def run_queries(mode: str):
+        latencies, stages = [], {}
+        for question in questions:
+            start = time.perf_counter()
+            answer = await pipeline.arun_pipeline(question, k=4, mode=mode, timings=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+            for stage, ms in answer["timings"].items():
+                stages.setdefault(stage, []).append(ms)
+        return latencies, stages
+
+    async def time_to_first_token():
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            answer = await pipeline.astream_pipeline(question, k=4)
+            async for _ in answer["response"]:
+                latencies.append((time.perf_counter() - start) * 1000)
+                break
+            async for _ in answer["response"]:
+                pass
+        return latencies
+
+    for mode in VectorDatabase.SEARCH_MODES:
+        latencies, stages = asyncio.run(run_queries(mode))
+        stage_means = {f"{stage}_mean_ms": float(np.mean(ms)) for stage, ms in sorted(stages.items())}
+        results.append(result(
+            "pipeline", f"answer_{mode}", {**params, "mode": mode},
+            **latency_metrics(latencies), **stage_means,
+        ))
+    first_token = asyncio.run(time_to_first_token())
+    results.append(result(
+        "pipeline", "first_token", {**params, "mode": pipeline.search_mode},
+        **latency_metrics(first_token),
+    ))
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def run_suite(args) -> dict:
+    results = []
+    scenarios = set(args.scenarios)
+    if "loaders" in scenarios:
+        results += bench_loaders(args)
+    if "splitters" in scenarios:
+        results += bench_splitters(args)
+    if scenarios & {"index", "search"}:
+        results += bench_index_and_search(args, "index" in scenarios, "search" in scenarios)
+    if "pipeline" in scenarios:
+        results += bench_pipeline(args)
+    return {"format_version": FORMAT_VERSION, "environment": environment(), "results": results}
+
+
+def _result_key(entry: dict) -> str:
+    return f"{entry['scenario']}/{entry['name']} {json.dumps(entry['params'], sort_keys=True)}"
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """One line per result present in both runs, with each metric's current/baseline ratio."""
+    previous: Dict[str, dict] = {_result_key(entry): entry for entry in baseline["results"]}
+    lines = []
+    for entry in current["results"]:
+        before = previous.get(_result_key(entry))
+        if before is None:
+            continue
+        ratios = [
+            f"{metric}={value / before['metrics'][metric]:.2f}x"
+            for metric, value in entry["metrics"].items()
+            if isinstance(before["metrics"].get(metric), (int, float)) and before["metrics"][metric]
+        ]
+        lines.append(f"{_result_key(entry)}: {' '.join(ratios)}")
+    return lines
+
+
+def print_results(report: dict) -> None:
+    for entry in report["results"]:
+        metrics = " ".join(
+            f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in entry["metrics"].items()
+        )
+        print(f"{entry['scenario']:>9} {entry['name']:<14} {json.dumps(entry['params'])}  {metrics}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="corpus sizes for the index and search scenarios")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--loader-mb", type=float, default=4.0)
+    parser.add_argument("--splitter-mb", type=float, default=4.0)
+    parser.add_argument("--pipeline-mb", type=float, default=2.0)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds to first token")
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="a previous JSON report to compare against")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes = [min(args.sizes)]
+        args.queries = min(args.queries, 20)
+        args.loader_mb = args.splitter_mb = args.pipeline_mb = 0.2
+        args.llm_latency = 0.0
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_suite(args)
+    print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {baseline['environment'].get('commit')} (ratio current/baseline)")
+        for line in compare(baseline, report):
+            print(line)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Offline stand-ins for EmbeddingModel and ChatOpenAI used across the tests."""
+import hashlib
+
+import numpy as np
+
+from benchmarks.fakes import CannedChatModel, HashEmbeddingModel
+
+
+class FakeEmbeddingModel(HashEmbeddingModel):
+    """
+    HashEmbeddingModel with unrelated random vectors per text, seeded by the
+    text's hash, and a count of embedded texts in ``calls``.
+    """
+
+    def __init__(self, dimension: int = 16):
+        super().__init__(dimension)
+        self.embeddings_model_name = "fake-embedding"
+        self.calls = 0
+
+    def _embed(self, text):
+        self.calls += 1
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dimension).tolist()
+
+
+class FakeChatModel(CannedChatModel):
+    """CannedChatModel that records the prompts it was sent."""
+
+    def __init__(self, reply: str = "canned answer"):
+        super().__init__(reply)
+        self.calls = []
+
+    def run(self, messages, text_only: bool = True, **kwargs):
+        self.calls.append(messages)
+        return super().run(messages, text_only, **kwargs)
+
+    async def arun(self, messages, text_only: bool = True, **kwargs):
+        return self.run(messages, text_only, **kwargs)
+
+    async def astream(self, messages, **kwargs):
+        self.calls.append(messages)
+        async for token in super().astream(messages, **kwargs):
+            yield token
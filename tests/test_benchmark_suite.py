@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import numpy as np
+
+from benchmarks.fakes import CannedChatModel, HashEmbeddingModel
+from benchmarks.suite import compare, main
+
+
+def test_hash_embeddings_are_deterministic_and_word_based():
+    model = HashEmbeddingModel(dimension=64)
+    first, again = model.get_embedding("mayor election"), HashEmbeddingModel(64).get_embedding("mayor election")
+    related, unrelated = model.get_embeddings(["the mayor election results", "polling station hours"])
+
+    assert first == again and len(first) == 64
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert np.dot(first, related) > np.dot(first, unrelated)
+
+
+def test_canned_chat_model_streams_its_reply():
+    async def collect():
+        return [token async for token in CannedChatModel("one two three").astream([])]
+
+    assert "".join(asyncio.run(collect())) == "one two three"
+
+
+def test_suite_writes_a_comparable_json_report(tmp_path):
+    output = tmp_path / "bench.json"
+    argv = ["--quick", "--scenarios", "splitters", "search", "pipeline", "--sizes", "500",
+            "--queries", "5", "--output", str(output)]
+
+    report = main(argv)
+
+    saved = json.loads(output.read_text())
+    assert saved["results"] == report["results"]
+    names = {(entry["scenario"], entry["name"]) for entry in saved["results"]}
+    assert {("splitters", "token"), ("search", "exact"), ("search", "ivf"), ("pipeline", "answer_hybrid")} <= names
+    lines = compare(saved, report)
+    assert len(lines) == len(report["results"]) and "qps=1.00x" in lines[-1]
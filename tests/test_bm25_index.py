@@ -0,0 +1,56 @@
+from aimakerspace.bm25_index import BM25Index, tokenize
+
+
+def test_tokenize_lowercases_and_splits_cjk():
+    assert tokenize("Mayor SMITH, 2024!") == ["mayor", "smith", "2024"]
+    assert tokenize("市长选举 vote") == ["市", "长", "选", "举", "vote"]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index()
+    for text in [
+        "the mayor won the election",
+        "city budget plan",
+        "mayor smith presented the budget",
+        "unrelated text about gardens",
+    ]:
+        index.add(text)
+
+    results = index.search("mayor budget", k=3)
+
+    assert [key for key, _ in results] == [
+        "mayor smith presented the budget",
+        "city budget plan",
+        "the mayor won the election",
+    ]
+    assert all(score > 0 for _, score in results)
+    assert index.search("nothing matches", k=3) == []
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = BM25Index()
+    index.add_many([f"election notice number {i}" for i in range(20)] + ["election of zebulon"])
+    assert index.search("election zebulon", k=1)[0][0] == "election of zebulon"
+
+
+def test_add_is_idempotent_and_updates_postings():
+    index = BM25Index()
+    index.add("alpha beta")
+    index.search("alpha", k=1)
+    index.add("alpha beta")
+    index.add("alpha gamma")
+
+    assert len(index) == 2
+    assert {key for key, _ in index.search("alpha", k=5)} == {"alpha beta", "alpha gamma"}
+
+
+def test_removed_documents_are_not_returned():
+    index = BM25Index()
+    index.add_many(["alpha beta", "alpha gamma", "delta"])
+
+    assert index.remove("alpha beta") and not index.remove("alpha beta")
+
+    assert len(index) == 2 and "alpha beta" not in index
+    assert [key for key, _ in index.search("alpha beta", k=5)] == ["alpha gamma"]
+    index.add("alpha beta")
+    assert len(index.search("beta", k=5)) == 1
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from aimakerspace.collection_manager import CollectionManager
+from tests.fakes import FakeEmbeddingModel
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return CollectionManager(str(tmp_path), FakeEmbeddingModel(), max_loaded=2)
+
+
+def test_collections_are_isolated(manager):
+    asyncio.run(manager.get("alice", create=True).abuild_from_list(["alice's secret plan"]))
+    asyncio.run(manager.get("bob", create=True).abuild_from_list(["bob's budget notes"]))
+
+    alice = manager.get("alice").search_by_text("plan", k=5, return_as_text=True)
+    assert alice == ["alice's secret plan"]
+    assert len(manager.get("bob")) == 1
+
+
+def test_missing_and_invalid_names(manager):
+    with pytest.raises(KeyError):
+        manager.get("nobody")
+    with pytest.raises(ValueError):
+        manager.get("../etc", create=True)
+    assert not manager.exists("nobody")
+
+
+def test_lru_eviction_saves_and_reloads(manager):
+    for name in ("a", "b", "c"):
+        manager.get(name, create=True).insert(f"text {name}", np.ones(4))
+
+    assert list(manager.stats()["loaded"]) == ["b", "c"]
+    assert manager.names() == ["a", "b", "c"]
+    # get() leaves the save of the evicted collection to write_evicted
+    assert manager.stats()["unwritten"] == 1
+    assert manager.write_evicted() == ["a"]
+
+    reloaded = manager.get("a")
+    assert reloaded.search_lexical("text", k=1)[0][0] == "text a"
+    assert manager.stats()["loads"] == 1
+
+
+def test_pinned_collections_are_not_evicted(manager):
+    manager.pin("busy").insert("in progress", np.ones(4))
+    manager.get("x", create=True)
+    manager.get("y", create=True)
+
+    # "x" is evicted for capacity instead of the pinned, less recently used "busy"
+    assert list(manager.stats()["loaded"]) == ["busy", "y"]
+    assert manager.evict_idle(0) == ["y"]
+    assert not manager.delete("busy")
+
+    manager.unpin("busy")
+    assert manager.evict_idle(0) == ["busy"]
+    assert manager.delete("busy")
+    assert not manager.exists("busy")
+
+
+def test_unwritten_eviction_is_handed_back_without_reloading(manager):
+    for name in ("a", "b", "c"):
+        manager.get(name, create=True).insert(f"text {name}", np.ones(4))
+
+    db = manager.get("a")
+    db.insert("written after eviction", np.ones(4))
+
+    assert manager.stats()["loads"] == 0
+    assert manager.write_evicted() == ["b"]
+    assert len(manager.get("a")) == 2
+
+
+def test_requests_are_not_blocked_while_evictions_save(manager):
+    manager.get("slow", create=True).insert("text", np.ones(4))
+    manager.get("fast", create=True)
+    slow_db = manager.get("slow")
+    saving, release = threading.Event(), threading.Event()
+    original_save = slow_db.save
+
+    def blocking_save(path):
+        saving.set()
+        release.wait(5)
+        original_save(path)
+
+    slow_db.save = blocking_save
+    manager._loaded["slow"].last_used -= 3600
+    eviction = threading.Thread(target=manager.evict_idle, args=(60,))
+    eviction.start()
+    assert saving.wait(5)
+
+    # The lock is free while "slow" is written: other requests proceed, and
+    # "slow" itself is served from memory
+    assert manager.get("fast") is not None
+    assert manager.get("slow") is slow_db
+    release.set()
+    eviction.join(5)
+    assert manager.names() == ["fast", "slow"]
+
+
+def test_inserts_during_a_save_are_kept_for_the_next_one(manager, tmp_path):
+    db = manager.get("busy", create=True)
+    db.insert("before save", np.ones(4))
+    snapshot_taken, inserted = threading.Event(), threading.Event()
+    snapshot = db._snapshot
+
+    def snapshot_and_wait():
+        taken = snapshot()
+        snapshot_taken.set()
+        inserted.wait(5)
+        return taken
+
+    db._snapshot = snapshot_and_wait
+    saver = threading.Thread(target=manager.save, args=("busy",))
+    saver.start()
+    assert snapshot_taken.wait(5)
+    db.insert("during save", np.ones(4))
+    inserted.set()
+    saver.join(5)
+
+    on_disk = CollectionManager(str(tmp_path), FakeEmbeddingModel()).get("busy")
+    assert len(on_disk) == 1
+    # Still marked as changed, so the next save writes the insert
+    db._snapshot = snapshot
+    manager.save("busy")
+    on_disk = CollectionManager(str(tmp_path), FakeEmbeddingModel()).get("busy")
+    assert sorted(on_disk._key_to_row) == ["before save", "during save"]
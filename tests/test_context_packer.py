@@ -0,0 +1,90 @@
+from aimakerspace.context_packer import ContextPacker, split_sentences
+from aimakerspace.text_utils import CharacterTextSplitter, Document
+
+TEXT = (
+    "The mayor is elected every four years. Candidates register in March. "
+    "Polling stations open at 8am. Results are announced the next morning."
+)
+
+
+def chunks_with_metadata(chunk_size=60, chunk_overlap=20):
+    splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = list(splitter.split_documents([Document(TEXT, {"source": "guide.txt"})]))
+    metadata = {chunk.text: chunk.metadata for chunk in chunks}
+    return [chunk.text for chunk in chunks], metadata.get
+
+
+def test_overlapping_chunks_of_a_document_are_merged():
+    texts, get_metadata = chunks_with_metadata()
+    contexts = [(text, 0.9 - i * 0.1) for i, text in enumerate(texts)]
+
+    packed = ContextPacker(max_tokens=None).pack("mayor", contexts, get_metadata)
+
+    assert packed.contexts == [(TEXT, 0.9)]
+    assert packed.chunks_merged == len(texts) - 1
+    assert packed.tokens_saved > 0
+
+
+def test_chunks_without_offsets_and_gaps_are_not_merged():
+    texts, get_metadata = chunks_with_metadata(chunk_size=30, chunk_overlap=10)
+    contexts = [(texts[0], 0.5), (texts[3], 0.8), ("unrelated note", 0.7)]
+
+    packed = ContextPacker(max_tokens=None).pack("mayor", contexts, get_metadata)
+
+    assert [text for text, _ in packed.contexts] == [texts[3], "unrelated note", texts[0]]
+    assert packed.chunks_merged == 0
+
+
+def test_chunks_without_a_source_are_not_merged():
+    first, second = "alpha beta gamma", "gamma delta epsilon"
+    metadata = {
+        first: {"start": 0, "end": len(first)},
+        second: {"start": 11, "end": 11 + len(second)},
+    }
+    contexts = [(first, 0.9), (second, 0.8)]
+
+    packed = ContextPacker(max_tokens=None).pack("alpha", contexts, metadata.get)
+
+    assert packed.contexts == contexts
+    assert packed.chunks_merged == 0
+
+
+def test_weak_chunks_are_dropped():
+    contexts = [("strong match", 0.9), ("fair match", 0.5), ("weak match", 0.2)]
+
+    relative = ContextPacker(min_relative_score=0.5).pack("match", contexts)
+    absolute = ContextPacker(min_score=0.6).pack("match", contexts)
+
+    assert [text for text, _ in relative.contexts] == ["strong match", "fair match"]
+    assert [text for text, _ in absolute.contexts] == ["strong match"]
+    assert absolute.chunks_dropped == 2
+
+
+def test_sentence_extraction_keeps_sentences_sharing_query_words():
+    packer = ContextPacker(extract_sentences=True)
+
+    packed = packer.pack("When do polling stations open?", [(TEXT, 1.0), ("No overlap here.", 0.5)])
+
+    assert packed.contexts == [("Polling stations open at 8am.", 1.0), ("No overlap here.", 0.5)]
+
+
+def test_budget_trims_to_whole_sentences():
+    contexts = [(TEXT, 1.0), ("Another passage that no longer fits.", 0.9)]
+
+    packed = ContextPacker(max_tokens=20).pack("mayor", contexts)
+
+    assert len(packed.contexts) == 1
+    assert packed.contexts[0][0] in {
+        " ".join(split_sentences(TEXT)[:n]) for n in range(1, 4)
+    }
+    assert packed.tokens_out <= 20
+    assert packed.chunks_dropped == 1
+
+
+def test_stats_accumulate_across_queries():
+    packer = ContextPacker(min_score=0.5)
+    packer.pack("q", [("kept", 0.9), ("dropped passage", 0.1)])
+    packer.pack("q", [("kept", 0.9)])
+
+    stats = packer.stats()
+    assert stats["queries"] == 2 and stats["tokens_saved"] > 0
@@ -0,0 +1,71 @@
+import asyncio
+
+from aimakerspace.dedup import ChunkDeduplicator
+from aimakerspace.vectordatabase import VectorDatabase
+from tests.fakes import FakeEmbeddingModel
+
+BOILERPLATE = (
+    "City of Springfield official election bulletin. For questions contact the "
+    "elections office at city hall, room 101, weekdays between nine and five. Page {}"
+)
+
+
+def test_exact_duplicates_are_dropped_across_calls():
+    deduplicator = ChunkDeduplicator()
+
+    keep, report = deduplicator.filter(["a b c", "d e f", "a  b c\n"])
+    assert keep == [0, 1]
+    assert report.exact_duplicates == 1
+
+    keep, _ = deduplicator.filter(["d e f", "g h i"])
+    assert keep == [1]
+    assert deduplicator.report.chunks_in == 5
+    assert deduplicator.report.chunks_saved == 2
+    assert deduplicator.report.tokens_saved > 0
+
+
+def test_near_duplicates_are_dropped_only_when_enabled():
+    pages = [BOILERPLATE.format(page) for page in range(1, 6)]
+    distinct = "The mayor proposed a new transit budget focused on bus frequency downtown."
+
+    exact_only = ChunkDeduplicator()
+    assert exact_only.filter(pages + [distinct])[0] == list(range(6))
+
+    near = ChunkDeduplicator(near_duplicates=True)
+    keep, report = near.filter(pages + [distinct])
+    assert keep == [0, 5]
+    assert report.near_duplicates == 4
+    assert report.to_dict()["chunks_kept"] == 2
+
+
+def test_forgotten_chunks_and_their_near_duplicates_are_kept_again():
+    pages = [BOILERPLATE.format(page) for page in range(1, 4)]
+    deduplicator = ChunkDeduplicator(near_duplicates=True)
+    deduplicator.filter(pages[:1])
+
+    assert deduplicator.forget(pages[:1] + ["never seen"]) == 1
+    assert deduplicator.filter(pages)[0] == [0]
+    assert deduplicator.report.near_duplicates == 2
+
+
+def test_release_keeps_chunks_other_owners_hold():
+    deduplicator = ChunkDeduplicator()
+    deduplicator.filter(["shared", "only a"], [{"source": "a"}, {"source": "a"}])
+    deduplicator.filter(["shared"], [{"source": "b", "page": 2}])
+
+    assert deduplicator.release("a") == {"shared": {"source": "b", "page": 2}}
+    # "only a" lost its last owner and is forgotten; "shared" is still seen
+    assert deduplicator.filter(["only a", "shared"])[0] == [0]
+
+
+def test_abuild_skips_embedding_duplicates():
+    model = FakeEmbeddingModel()
+    db = VectorDatabase(embedding_model=model, storage="matrix")
+    deduplicator = ChunkDeduplicator(near_duplicates=True)
+    chunks = [BOILERPLATE.format(1), "unique chunk one", BOILERPLATE.format(2), "unique chunk one"]
+
+    asyncio.run(db.abuild_from_list(chunks, deduplicator=deduplicator))
+    asyncio.run(db.abuild_from_list(chunks[:2], deduplicator=deduplicator))
+
+    assert len(db) == 2
+    assert model.calls == 2
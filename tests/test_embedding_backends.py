@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from aimakerspace.embedding_backends import (
+    EmbeddingBackend,
+    HashedTfidfEmbedding,
+    create_embedding_backend,
+)
+from aimakerspace.vectordatabase import VectorDatabase
+
+CORPUS = [
+    "The mayor announced a new budget for the city parks.",
+    "Voters elect the mayor every four years.",
+    "My sister adopted a kitten yesterday.",
+    "Kittens sleep most of the day.",
+]
+
+
+def test_vectors_are_unit_length_and_deterministic():
+    model = HashedTfidfEmbedding(dimension=64)
+
+    vectors = model.get_embeddings(CORPUS)
+
+    assert len(vectors) == len(CORPUS)
+    assert all(vector.shape == (64,) for vector in vectors)
+    assert np.allclose([np.linalg.norm(vector) for vector in vectors], 1.0)
+    assert np.array_equal(model.get_embedding(CORPUS[0]), vectors[0])
+    assert not np.any(model.get_embedding("!!!"))
+
+
+def test_shared_words_score_higher():
+    model = HashedTfidfEmbedding(dimension=256).fit(CORPUS)
+    query = model.get_embedding("when is the mayor elected by voters")
+
+    scores = [float(np.dot(query, vector)) for vector in model.get_embeddings(CORPUS)]
+
+    assert int(np.argmax(scores)) == 1
+
+
+def test_thread_pool_batches_match_inline_embedding():
+    model = HashedTfidfEmbedding(dimension=32, batch_size=3, max_workers=2)
+    texts = [f"{text} {i}" for i, text in enumerate(CORPUS * 4)]
+
+    expected = [model.get_embedding(text) for text in texts]
+
+    assert np.allclose(model.get_embeddings(texts), expected)
+    assert np.allclose(asyncio.run(model.abatch_get_embeddings(texts)), expected)
+
+
+def test_fitted_idf_is_saved_and_named(tmp_path):
+    idf_path = str(tmp_path / "idf.npy")
+    unfitted_name = HashedTfidfEmbedding(dimension=64).embeddings_model_name
+
+    model = HashedTfidfEmbedding(dimension=64, idf_path=idf_path).fit(CORPUS)
+    reloaded = HashedTfidfEmbedding(dimension=64, idf_path=idf_path)
+
+    assert model.embeddings_model_name != unfitted_name
+    assert reloaded.embeddings_model_name == model.embeddings_model_name
+    assert np.array_equal(reloaded.get_embedding(CORPUS[0]), model.get_embedding(CORPUS[0]))
+
+
+def test_vector_database_round_trip_with_local_backend(tmp_path):
+    model = HashedTfidfEmbedding(dimension=128).fit(CORPUS)
+    db = asyncio.run(VectorDatabase(model, storage="matrix").abuild_from_list(CORPUS))
+    db.save(str(tmp_path))
+
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=model)
+
+    assert loaded.search_by_text("adopted kitten", k=1, return_as_text=True) == [CORPUS[2]]
+    with pytest.raises(ValueError):
+        VectorDatabase.load(str(tmp_path), embedding_model=HashedTfidfEmbedding(dimension=128))
+
+
+def test_base_backend_derives_single_and_async_calls():
+    class TextLengths(EmbeddingBackend):
+        embeddings_model_name = "lengths"
+
+        def get_embeddings(self, list_of_text):
+            return [[float(len(text))] for text in list_of_text]
+
+    backend = TextLengths()
+
+    assert backend.get_embedding("abc") == [3.0]
+    assert asyncio.run(backend.async_get_embedding("ab")) == [2.0]
+    assert asyncio.run(backend.abatch_get_embeddings(["a", "abcd"])) == [[1.0], [4.0]]
+    assert backend.cache_stats() is None
+
+
+def test_create_embedding_backend():
+    model = create_embedding_backend("hashed-tfidf", dimension=32)
+
+    assert isinstance(model, HashedTfidfEmbedding)
+    assert model.dimension == 32
+    with pytest.raises(ValueError):
+        create_embedding_backend("word2vec")
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from aimakerspace.openai_utils.embedding import EmbeddingModel, batch_texts_by_tokens
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+
+
+class SlowEmbeddings:
+    """Fake async ``client.embeddings`` that tracks concurrency and can rate-limit."""
+
+    def __init__(self, rate_limit_first: int = 0):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.rate_limit_first = rate_limit_first
+
+    async def create(self, input, model):
+        self.calls += 1
+        if self.calls <= self.rate_limit_first:
+            request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+            raise openai.RateLimitError(
+                "rate limited", response=httpx.Response(429, request=request), body=None
+            )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(text.split("-")[1])]) for text in input]
+        )
+
+
+@pytest.fixture
+def make_model(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def factory(embeddings, **kwargs):
+        model = EmbeddingModel(retry_base_delay=0.001, **kwargs)
+        model.async_client = SimpleNamespace(embeddings=embeddings)
+        return model
+
+    return factory
+
+
+def test_batches_respect_size_and_token_limits(monkeypatch):
+    monkeypatch.setattr(
+        "aimakerspace.openai_utils.embedding.count_tokens_many",
+        lambda texts: [len(text) // 4 for text in texts],
+    )
+    texts = ["a" * 40] * 10  # 10 tokens each
+    batches = batch_texts_by_tokens(texts, max_batch_size=4, max_batch_tokens=25)
+    assert [len(batch) for batch in batches] == [2, 2, 2, 2, 2]
+    assert batch_texts_by_tokens(texts, max_batch_size=3, max_batch_tokens=10_000) == [
+        texts[0:3], texts[3:6], texts[6:9], texts[9:10]
+    ]
+    assert batch_texts_by_tokens(["a" * 400], max_batch_size=4, max_batch_tokens=5) == [["a" * 400]]
+
+
+def test_bulk_embedding_is_concurrent_bounded_and_ordered(make_model):
+    embeddings = SlowEmbeddings()
+    model = make_model(embeddings, max_batch_size=3, max_concurrency=2)
+    texts = [f"chunk-{i}" for i in range(20)]
+
+    vectors = asyncio.run(model.abatch_get_embeddings(texts))
+
+    assert vectors == [[float(i)] for i in range(20)]
+    assert embeddings.calls == 7
+    assert embeddings.max_in_flight == 2
+
+
+def test_bulk_embedding_retries_rate_limits(make_model):
+    embeddings = SlowEmbeddings(rate_limit_first=2)
+    model = make_model(embeddings, max_batch_size=100)
+    assert asyncio.run(model.abatch_get_embeddings(["x-1", "x-2"])) == [[1.0], [2.0]]
+    assert embeddings.calls == 3
+
+    exhausted = make_model(SlowEmbeddings(rate_limit_first=10), max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(exhausted.abatch_get_embeddings(["x-1"]))
+
+
+def test_bulk_embedding_turns_off_sdk_retries(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    model = EmbeddingModel()
+
+    async def clients():
+        return model.async_client, model._bulk_async_client
+
+    shared, bulk = asyncio.run(clients())
+
+    assert shared.max_retries == model.client_config.max_retries
+    assert bulk.max_retries == 0
+
+
+def test_bulk_embedding_only_sends_cache_misses(make_model):
+    embeddings = SlowEmbeddings()
+    model = make_model(embeddings, cache=EmbeddingCache(), max_batch_size=2)
+    asyncio.run(model.abatch_get_embeddings(["c-1", "c-2"]))
+    vectors = asyncio.run(model.abatch_get_embeddings(["c-1", "c-3", "c-2", "c-3"]))
+
+    assert vectors == [[1.0], [3.0], [2.0], [3.0]]
+    assert embeddings.calls == 2
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+
+
+class RecordingEmbeddings:
+    """Fake ``client.embeddings`` that records every input it is asked to embed."""
+
+    def __init__(self):
+        self.requests = []
+
+    def _respond(self, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.requests.append(texts)
+        data = [SimpleNamespace(embedding=[float(len(text)), 1.0, 0.5]) for text in texts]
+        return SimpleNamespace(data=data)
+
+    def create(self, input, model):
+        return self._respond(input)
+
+
+class AsyncRecordingEmbeddings(RecordingEmbeddings):
+    async def create(self, input, model):
+        return self._respond(input)
+
+
+@pytest.fixture
+def model_factory(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def factory(cache):
+        model = EmbeddingModel(cache=cache)
+        model.client = SimpleNamespace(embeddings=RecordingEmbeddings())
+        model.async_client = SimpleNamespace(embeddings=AsyncRecordingEmbeddings())
+        return model
+
+    return factory
+
+
+def test_lru_eviction_and_stats():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", "a") == [1.0]
+    cache.put("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+    assert cache.get("other-model", "a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["memory_entries"]) == (2, 2, 2)
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    db_path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    first = EmbeddingCache(db_path=db_path)
+    first.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    first.close()
+
+    second = EmbeddingCache(db_path=db_path)
+    assert second.get_many("m", ["b", "x", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert second.stats()["disk_hits"] == 2
+
+
+def test_disk_tier_uses_wal_and_is_read_off_the_event_loop(tmp_path, model_factory):
+    cache = EmbeddingCache(db_path=str(tmp_path / "embeddings.sqlite3"))
+    assert cache._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    disk_threads = []
+    read_disk = cache._read_disk
+
+    def recording_read_disk(keys):
+        disk_threads.append(threading.get_ident())
+        return read_disk(keys)
+
+    cache._read_disk = recording_read_disk
+    model = model_factory(cache)
+
+    async def main():
+        await model.async_get_embeddings(["one", "two"])
+        await model.async_get_embedding("three")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+
+    assert len(disk_threads) == 2 and loop_thread not in disk_threads
+    assert cache.get_many(model.embeddings_model_name, ["one", "three"])[1] == [5.0, 1.0, 0.5]
+
+
+def test_embedding_model_only_requests_misses(model_factory):
+    cache = EmbeddingCache()
+    model = model_factory(cache)
+
+    first = asyncio.run(model.async_get_embeddings(["one", "two", "one"]))
+    second = asyncio.run(model.async_get_embeddings(["two", "three", "one"]))
+
+    assert model.async_client.embeddings.requests == [["one", "two"], ["three"]]
+    assert first[0] == first[2] == second[2]
+    assert second[1] == [5.0, 1.0, 0.5]
+
+    model.get_embeddings(["one", "three"])
+    model.get_embedding("two")
+    assert model.client.embeddings.requests == []
+    assert model.cache_stats()["hits"] == 5
+
+
+def test_embedding_model_without_cache(model_factory):
+    model = model_factory(None)
+    model.get_embedding("hello")
+    model.get_embedding("hello")
+    assert model.client.embeddings.requests == [["hello"], ["hello"]]
+    assert model.cache_stats() is None
@@ -0,0 +1,228 @@
+import asyncio
+import os
+
+from aimakerspace.dedup import ChunkDeduplicator
+from aimakerspace.ingestion import IngestionQueue
+from aimakerspace.text_utils import CharacterTextSplitter, TextFileLoader
+from aimakerspace.vectordatabase import VectorDatabase
+from tests.fakes import FakeEmbeddingModel
+
+
+def text_loader(filename, path):
+    if not filename.endswith(".txt"):
+        raise ValueError("Unsupported file type")
+    return TextFileLoader(path)
+
+
+def run_jobs(tmp_path, files):
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    queue = IngestionQueue(
+        db,
+        loader_factory=text_loader,
+        splitter=CharacterTextSplitter(chunk_size=50, chunk_overlap=10),
+        embed_batch_size=3,
+    )
+
+    async def main():
+        await queue.start()
+        jobs = []
+        for name, content in files.items():
+            path = tmp_path / name
+            path.write_text(content, encoding="utf-8")
+            jobs.append(queue.submit(str(path), name))
+        await asyncio.gather(*(job.wait() for job in jobs))
+        await queue.stop()
+        return jobs
+
+    return db, asyncio.run(main())
+
+
+def test_jobs_are_ingested_incrementally_and_cleaned_up(tmp_path):
+    files = {
+        "a.txt": " ".join(f"alpha{i}" for i in range(60)),
+        "b.txt": " ".join(f"beta{i}" for i in range(30)),
+    }
+    db, jobs = run_jobs(tmp_path, files)
+
+    for job in jobs:
+        assert job.status == "completed", job.error
+        assert job.chunks_total > 3
+        assert job.chunks_done == job.chunks_total
+        assert not os.path.exists(tmp_path / job.filename)
+    assert len(db) == sum(job.chunks_total for job in jobs)
+    assert set(jobs[0].to_dict()) >= {"job_id", "status", "chunks_done", "error"}
+
+
+def test_failed_job_reports_error(tmp_path):
+    db, jobs = run_jobs(tmp_path, {"c.bin": "data"})
+    assert jobs[0].status == "failed"
+    assert "Unsupported" in jobs[0].error
+    assert len(db) == 0
+
+
+def test_ingested_chunks_keep_source_and_offsets(tmp_path):
+    content = "0123456789" * 12
+    db, jobs = run_jobs(tmp_path, {"digits.txt": content})
+    for key in db._keys:
+        metadata = db.get_metadata(key)
+        assert metadata["source"] == "digits.txt"
+        assert content[metadata["start"]:metadata["end"]] == key
+
+
+def test_shared_deduplicator_skips_repeated_uploads(tmp_path):
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    queue = IngestionQueue(
+        db,
+        loader_factory=text_loader,
+        splitter=CharacterTextSplitter(chunk_size=50, chunk_overlap=10),
+        embed_batch_size=3,
+        deduplicator=ChunkDeduplicator(),
+    )
+    content = " ".join(f"gamma{i}" for i in range(40))
+
+    async def main():
+        await queue.start()
+        jobs = []
+        for name in ("first.txt", "again.txt"):
+            path = tmp_path / name
+            path.write_text(content, encoding="utf-8")
+            job = queue.submit(str(path), name)
+            await job.wait()
+            jobs.append(job)
+        await queue.stop()
+        return jobs
+
+    first, again = asyncio.run(main())
+
+    assert first.chunks_deduplicated == 0
+    assert again.status == "completed"
+    assert again.chunks_deduplicated == again.chunks_total == again.chunks_done
+    assert again.tokens_saved > 0
+    assert len(db) == first.chunks_total
+
+
+def test_job_can_target_another_database(tmp_path):
+    default_db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    tenant_db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    queue = IngestionQueue(default_db, loader_factory=text_loader, deduplicator=ChunkDeduplicator())
+    path = tmp_path / "tenant.txt"
+    path.write_text("tenant document", encoding="utf-8")
+
+    async def main():
+        await queue.start()
+        job = queue.submit(str(path), "tenant.txt", vector_db=tenant_db, collection="tenant")
+        await job.wait()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(main())
+
+    assert job.status == "completed", job.error
+    assert job.to_dict()["collection"] == "tenant"
+    assert len(tenant_db) == 1 and len(default_db) == 0
+    # The queue-wide deduplicator is only used for the queue's own database
+    assert queue.deduplicator.report.chunks_in == 0
+
+
+def test_reuploading_a_file_replaces_its_old_chunks(tmp_path):
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    queue = IngestionQueue(
+        db,
+        loader_factory=text_loader,
+        splitter=CharacterTextSplitter(chunk_size=20, chunk_overlap=0),
+        compact_threshold=0.1,
+    )
+    path = tmp_path / "notes.txt"
+
+    async def upload(content):
+        path.write_text(content, encoding="utf-8")
+        job = queue.submit(str(path), "notes.txt", delete_file=False)
+        return await job.wait()
+
+    async def main():
+        await queue.start()
+        first = await upload("first paragraph one second paragraph two")
+        second = await upload("first paragraph one a revised ending")
+        await queue.stop()
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert second.status == "completed", second.error
+    assert second.chunks_deleted == 1
+    assert {key.strip() for key in db.keys_where({"source": "notes.txt"})} == {
+        "first paragraph one",
+        "a revised ending",
+    }
+    # Compacted once the deleted share passed the threshold
+    assert db.dead_fraction == 0 and len(db) == 2
+
+
+def upload_versions(tmp_path, deduplicator, uploads, chunk_size=200):
+    """Uploads (filename, content) pairs one after another; returns the database and jobs."""
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    queue = IngestionQueue(
+        db,
+        loader_factory=text_loader,
+        splitter=CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0),
+        deduplicator=deduplicator,
+    )
+
+    async def main():
+        await queue.start()
+        jobs = []
+        for filename, content in uploads:
+            path = tmp_path / filename
+            path.write_text(content, encoding="utf-8")
+            jobs.append(await queue.submit(str(path), filename, delete_file=False).wait())
+        await queue.stop()
+        return jobs
+
+    jobs = asyncio.run(main())
+    assert all(job.status == "completed" for job in jobs), [job.error for job in jobs]
+    return db, jobs
+
+
+def test_revision_is_not_dropped_as_near_duplicate_of_replaced_version(tmp_path):
+    words = " ".join(f"word{i}" for i in range(150))
+    base = "The council approved a budget of {} million dollars. " + words
+    deduplicator = ChunkDeduplicator(near_duplicates=True)
+    # The revision alone would be dropped as a near-duplicate of the first version
+    deduplicator.filter([base.format(12)])
+    assert deduplicator.filter([base.format(13)])[0] == []
+    deduplicator.reset()
+
+    db, _ = upload_versions(
+        tmp_path, deduplicator, [("doc.txt", base.format(12)), ("doc.txt", base.format(13))],
+        chunk_size=5000,
+    )
+
+    assert [key.strip() for key in db.keys_where({"source": "doc.txt"})] == [base.format(13)]
+
+
+def test_reverting_to_an_earlier_version_keeps_its_chunks(tmp_path):
+    v1, v2 = "alpha beta gamma delta", "epsilon zeta eta theta"
+
+    db, _ = upload_versions(
+        tmp_path, ChunkDeduplicator(), [("doc.txt", v1), ("doc.txt", v2), ("doc.txt", v1)]
+    )
+
+    assert [key.strip() for key in db.keys_where({"source": "doc.txt"})] == [v1]
+    assert len(db) == 1
+
+
+def test_replacing_a_file_keeps_chunks_other_files_share(tmp_path):
+    shared = "shared paragraph ok "
+    a_only, b_only = "alpha only text one ", "bravo only text two "
+
+    db, jobs = upload_versions(
+        tmp_path,
+        ChunkDeduplicator(),
+        [("a.txt", a_only + shared), ("b.txt", b_only + shared), ("a.txt", a_only)],
+        chunk_size=20,
+    )
+
+    assert jobs[1].chunks_deduplicated == 1
+    assert jobs[2].chunks_deleted == 0
+    assert sorted(db.keys_where({"source": "b.txt"})) == [b_only, shared]
+    assert db.keys_where({"source": "a.txt"}) == [a_only]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from aimakerspace.ivf_index import IVFIndex
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+class NoEmbeddingModel:
+    """The tests below only search by vector, so no embeddings are ever requested."""
+
+    embeddings_model_name = "none"
+
+
+def clustered_vectors(n, dim=32, n_clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.3 * rng.standard_normal((n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def build_db(vectors):
+    db = VectorDatabase(embedding_model=NoEmbeddingModel(), storage="matrix")
+    for i, vector in enumerate(vectors):
+        db.insert(f"doc-{i}", vector)
+    return db
+
+
+def test_full_probe_matches_exact_search():
+    vectors = clustered_vectors(2000)
+    db = build_db(vectors)
+    db.build_index(n_lists=16, nprobe=16)
+
+    for query in clustered_vectors(20, seed=1):
+        assert [key for key, _ in db.search(query, k=5)] == [
+            key for key, _ in db.search(query, k=5, exact=True)
+        ]
+
+
+def test_recall_improves_with_nprobe():
+    vectors = clustered_vectors(5000)
+    db = build_db(vectors)
+    db.build_index(n_lists=64)
+    queries = clustered_vectors(50, seed=2)
+
+    def recall(nprobe):
+        hits = 0
+        for query in queries:
+            exact = {key for key, _ in db.search(query, k=10, exact=True)}
+            approx = {key for key, _ in db.search(query, k=10, nprobe=nprobe)}
+            hits += len(exact & approx)
+        return hits / (10 * len(queries))
+
+    assert recall(1) <= recall(8) <= recall(64)
+    assert recall(64) == 1.0
+    assert recall(8) > 0.8
+
+
+def test_insert_after_build_is_indexed():
+    db = build_db(clustered_vectors(500))
+    db.build_index(n_lists=8, nprobe=1)
+
+    new_vector = clustered_vectors(1, seed=3)[0]
+    db.insert("new", new_vector)
+    assert db.search(new_vector, k=1)[0][0] == "new"
+
+    # Overwriting a key moves its row to the list of its new vector.
+    db.insert("new", -new_vector)
+    assert db.search(-new_vector, k=1)[0][0] == "new"
+    assert sum(len(lst) for lst in db.index._lists) == len(db)
+
+
+def test_index_requires_matrix_storage_and_training():
+    db = VectorDatabase(embedding_model=NoEmbeddingModel(), storage="dict")
+    with pytest.raises(ValueError):
+        db.build_index()
+    with pytest.raises(ValueError):
+        IVFIndex().add(np.array([0]), np.ones((1, 4), dtype=np.float32))
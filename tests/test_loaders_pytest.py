@@ -103,4 +103,161 @@ def test_image_loader(sample_image_file):
     loader.load()
     docs = loader.documents
     # OCR is not perfect, so just check that the expected word is in the output
-    assert any("Test" in doc for doc in docs) 
\ No newline at end of file
+    assert any("Test" in doc for doc in docs) 
+
+
+@pytest.fixture
+def multi_page_pdf_dir(tmp_path):
+    try:
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
+    except ImportError:
+        pytest.skip("reportlab is required for PDF test")
+    for name, pages in (("first.pdf", 5), ("nested/second.pdf", 3)):
+        file = tmp_path / name
+        file.parent.mkdir(exist_ok=True)
+        c = canvas.Canvas(str(file), pagesize=letter)
+        for page in range(1, pages + 1):
+            c.drawString(100, 750, f"{file.stem} page {page}")
+            c.showPage()
+        c.save()
+    return tmp_path
+
+
+def test_pdf_loader_iter_pages_streams_page_text(multi_page_pdf_dir):
+    pages = list(PDFLoader(str(multi_page_pdf_dir / "first.pdf")).iter_pages())
+    assert [page_number for _, page_number, _ in pages] == [1, 2, 3, 4, 5]
+    assert all(f"first page {n}" in text for _, n, text in pages)
+
+    page_docs = list(PDFLoader(str(multi_page_pdf_dir), split_pages=True).lazy_load())
+    assert len(page_docs) == 8
+    assert {doc.metadata["page"] for doc in page_docs} == {1, 2, 3, 4, 5}
+
+
+def test_pdf_loader_parallel_matches_sequential(multi_page_pdf_dir):
+    sequential = PDFLoader(str(multi_page_pdf_dir)).load_documents()
+    parallel_loader = PDFLoader(
+        str(multi_page_pdf_dir), parallel=True, max_workers=2, pages_per_task=2
+    )
+    assert parallel_loader.load_documents() == sequential
+    assert len(sequential) == 2
+    assert list(parallel_loader.iter_pages()) == list(PDFLoader(str(multi_page_pdf_dir)).iter_pages())
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    try:
+        from PIL import Image
+    except ImportError:
+        pytest.skip("Pillow is required for image test")
+    for i in range(6):
+        Image.new('RGB', (400 + i, 300), color=(255, 255, 255)).save(str(tmp_path / f"scan{i}.png"))
+    return tmp_path
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    import threading
+    seen = []
+    lock = threading.Lock()
+    def image_to_string(image):
+        with lock:
+            seen.append((image.mode, image.size))
+        return f"ocr {image.mode} {image.size[0]}x{image.size[1]}"
+    monkeypatch.setattr("aimakerspace.text_utils.pytesseract.image_to_string", image_to_string)
+    return seen
+
+
+def test_image_loader_concurrent_ocr_keeps_order(image_dir, fake_tesseract):
+    docs = ImageLoader(str(image_dir), max_workers=3).load_documents()
+    sequential = ImageLoader(str(image_dir), max_workers=1).load_documents()
+    assert docs == sequential
+    assert len(docs) == 6
+
+
+def test_image_loader_preprocessing_and_cache(image_dir, fake_tesseract, tmp_path_factory):
+    from aimakerspace.text_utils import OCRCache
+    cache_dir = str(tmp_path_factory.mktemp("ocr_cache"))
+    cache = OCRCache(cache_dir=cache_dir)
+
+    docs = ImageLoader(str(image_dir), grayscale=True, max_side=200, cache=cache).load_documents()
+    assert all(doc.startswith("ocr L 200x") for doc in docs)
+    assert len(fake_tesseract) == 6
+
+    # Same bytes and settings: served from the on-disk cache without OCR
+    again = ImageLoader(str(image_dir), grayscale=True, max_side=200, cache=OCRCache(cache_dir)).load_documents()
+    assert again == docs
+    assert len(fake_tesseract) == 6
+
+    # Different preprocessing settings are cached separately
+    ImageLoader(str(image_dir), cache=cache).load_documents()
+    assert len(fake_tesseract) == 12
+    assert cache.misses == 12
+
+
+def test_ocr_cache_memory_tier_is_lru_bounded():
+    from aimakerspace.text_utils import OCRCache
+    cache = OCRCache(max_entries=2)
+    cache.put("a", "text a")
+    cache.put("b", "text b")
+    assert cache.get("a") == "text a"
+    cache.put("c", "text c")
+    assert list(cache._memory) == ["a", "c"]
+    assert cache.get("b") is None
+
+
+def test_directory_loader_runs_file_loaders_serially(image_dir, fake_tesseract, monkeypatch):
+    from aimakerspace import text_utils
+    pools = []
+    thread_pool = text_utils.ThreadPoolExecutor
+
+    def recording_pool(max_workers):
+        pools.append(max_workers)
+        return thread_pool(max_workers=max_workers)
+
+    monkeypatch.setattr(text_utils, "ThreadPoolExecutor", recording_pool)
+    docs = text_utils.DirectoryLoader(str(image_dir), max_workers=3).load_documents()
+    assert len(docs) == 6
+    assert pools == [3]
+
+
+def test_loader_registry_dispatch():
+    from aimakerspace.text_utils import LOADER_REGISTRY, get_loader_class, TextFileLoader
+    assert get_loader_class("report.PDF") is PDFLoader
+    assert get_loader_class("notes.md") is MarkdownLoader
+    assert get_loader_class("scan.jpeg") is ImageLoader
+    assert LOADER_REGISTRY[".txt"] is TextFileLoader
+    with pytest.raises(ValueError):
+        get_loader_class("archive.zip")
+
+
+def test_lazy_load_yields_documents_with_metadata(tmp_path):
+    for i in range(3):
+        (tmp_path / f"note{i}.md").write_text(f"# Note {i}", encoding="utf-8")
+    (tmp_path / "ignored.txt").write_text("plain", encoding="utf-8")
+
+    lazy = MarkdownLoader(str(tmp_path)).lazy_load()
+    first = next(lazy)
+    assert first.metadata["loader"] == "markdown"
+    assert first.metadata["source"].endswith(".md")
+    assert len(list(lazy)) == 2
+    assert sorted(MarkdownLoader(str(tmp_path)).load_documents()) == ["# Note 0", "# Note 1", "# Note 2"]
+
+
+def test_directory_loader_streams_mixed_files(tmp_path, sample_docx_file):
+    from aimakerspace.text_utils import DirectoryLoader, get_loader
+    (tmp_path / "sub").mkdir()
+    for i in range(20):
+        (tmp_path / "sub" / f"file{i}.txt").write_text(f"text {i}", encoding="utf-8")
+    (tmp_path / "readme.md").write_text("# Readme", encoding="utf-8")
+    (tmp_path / "data.bin").write_bytes(b"\x00\x01")
+
+    documents = list(DirectoryLoader(str(tmp_path), max_workers=3).lazy_load())
+    sequential = list(DirectoryLoader(str(tmp_path), max_workers=1).lazy_load())
+
+    assert [doc.text for doc in documents] == [doc.text for doc in sequential]
+    assert {doc.metadata["loader"] for doc in documents} == {"text", "markdown", "docx"}
+    assert len(documents) == 22
+    assert isinstance(get_loader(str(tmp_path)), DirectoryLoader)
+    only_text = DirectoryLoader(str(tmp_path), extensions=(".txt",)).load_documents()
+    assert len(only_text) == 20
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from aimakerspace.metadata_store import MetadataStore
+
+
+@pytest.fixture
+def store():
+    store = MetadataStore()
+    store.set("a", {"source": "a.pdf", "page": 1, "loader": "pdf"})
+    store.set("b", {"source": "a.pdf", "page": 2, "loader": "pdf"})
+    store.set("c", None)
+    store.set("d", {"source": "notes.md", "loader": "markdown"})
+    store.set("e", {"source": "b.pdf", "page": 7, "loader": "pdf"})
+    return store
+
+
+def rows(mask):
+    return np.flatnonzero(mask).tolist()
+
+
+def test_columns_are_aligned_with_rows(store):
+    assert store.columns["page"] == [1, 2, None, None, 7]
+    assert store.get("a") == {"source": "a.pdf", "page": 1, "loader": "pdf"}
+    assert store.get("c") is None
+    assert store.get("missing") is None
+
+
+@pytest.mark.parametrize(
+    "filter,expected",
+    [
+        ({"source": "a.pdf"}, [0, 1]),
+        ({"loader": {"$in": ["pdf", "markdown"]}}, [0, 1, 3, 4]),
+        ({"loader": {"$nin": ["pdf"]}}, [2, 3]),
+        ({"source": {"$ne": "a.pdf"}}, [2, 3, 4]),
+        ({"page": {"$gte": 2}}, [1, 4]),
+        ({"page": {"$gt": 1, "$lt": 7}}, [1]),
+        ({"page": {"$exists": False}}, [2, 3]),
+        ({"source": "a.pdf", "page": 2}, [1]),
+        ({"source": {"$gte": "b"}}, [3, 4]),
+        ({"source": "nothing"}, []),
+    ],
+)
+def test_filters(store, filter, expected):
+    assert rows(store.mask(filter)) == expected
+
+
+def test_updates_invalidate_column_indexes(store):
+    assert rows(store.mask({"page": {"$gt": 5}})) == [4]
+    store.set("a", {"source": "c.pdf", "page": 9})
+    store.set("f", {"page": 10})
+
+    assert rows(store.mask({"page": {"$gt": 5}})) == [0, 4, 5]
+    assert rows(store.mask({"source": "a.pdf"})) == [1]
+    assert store.get("a") == {"source": "c.pdf", "page": 9}
+
+
+def test_unknown_operator_raises(store):
+    with pytest.raises(ValueError):
+        store.mask({"page": {"$regex": "1"}})
+
+
+def test_round_trip_through_columns(store):
+    keys = ["e", "a", "b", "c", "d"]
+    loaded = MetadataStore.from_columns(keys, store.to_columns(keys))
+    assert all(loaded.get(key) == store.get(key) for key in keys)
+    assert rows(loaded.mask({"source": "a.pdf"})) == [1, 2]
+
+
+def test_deleted_rows_are_masked_until_compacted(store):
+    assert store.delete("b") and not store.delete("b")
+
+    assert len(store) == 4 and store.deleted_count == 1
+    assert store.get("b") is None
+    assert rows(store.mask({"source": "a.pdf"})) == [0]
+    assert rows(store.live_mask()) == [0, 2, 3, 4]
+
+    compacted = store.compacted(np.flatnonzero(store.live_mask()))
+    assert compacted.keys == ["a", "c", "d", "e"] and compacted.deleted_count == 0
+    assert rows(compacted.mask({"loader": "pdf"})) == [0, 3]
@@ -0,0 +1,47 @@
+import asyncio
+
+from aimakerspace.openai_utils.chatmodel import ChatOpenAI
+from aimakerspace.openai_utils.clients import (
+    ClientConfig,
+    get_async_openai_client,
+    get_openai_client,
+)
+from aimakerspace.openai_utils.embedding import EmbeddingModel
+
+
+def test_sync_clients_are_pooled_per_config():
+    config = ClientConfig(api_key="sk-test", timeout=5.0)
+    assert get_openai_client(config) is get_openai_client(ClientConfig(api_key="sk-test", timeout=5.0))
+    assert get_openai_client(config) is not get_openai_client(
+        ClientConfig(api_key="sk-test", timeout=6.0)
+    )
+    assert "sk-test" not in repr(config)
+
+
+def test_async_clients_are_pooled_per_event_loop():
+    config = ClientConfig(api_key="sk-test")
+
+    async def fetch_twice():
+        return get_async_openai_client(config), get_async_openai_client(config)
+
+    first_a, first_b = asyncio.run(fetch_twice())
+    second_a, _ = asyncio.run(fetch_twice())
+    assert first_a is first_b
+    assert first_a is not second_a
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_HTTP_TIMEOUT", "12.5")
+    monkeypatch.setenv("OPENAI_HTTP_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("OPENAI_HTTP2", "true")
+    config = ClientConfig.from_env()
+    assert (config.timeout, config.max_connections, config.http2) == (12.5, 7, True)
+
+
+def test_wrappers_share_clients(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = ClientConfig(api_key="sk-test")
+    first, second = EmbeddingModel(client_config=config), EmbeddingModel(client_config=config)
+    assert first.client is second.client
+    chat = ChatOpenAI(client_config=config)
+    assert chat.client_config is config
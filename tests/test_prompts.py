@@ -0,0 +1,54 @@
+import pytest
+
+from aimakerspace.openai_utils.prompts import (
+    BasePrompt,
+    SystemRolePrompt,
+    UserRolePrompt,
+    compile_template,
+)
+
+
+@pytest.mark.parametrize(
+    "template,values",
+    [
+        ("Hello {name}, you are {age} years old", {"name": "John", "age": 30}),
+        ("{a}{b}{a}", {"a": "x", "b": 1.5}),
+        ("No placeholders at all", {}),
+        ("Escaped {{braces}} and {value}", {"value": None}),
+        ("Score {score:.3f} of {name!r}", {"score": 0.12345, "name": "doc"}),
+    ],
+)
+def test_compiled_rendering_matches_str_format(template, values):
+    assert BasePrompt(template).format_prompt(**values) == template.format(**values)
+
+
+def test_missing_variables_render_empty():
+    prompt = UserRolePrompt("Context: {context}\nQuestion: {question}")
+
+    assert prompt.create_message(question="why?") == {
+        "role": "user",
+        "content": "Context: \nQuestion: why?",
+    }
+    assert prompt.get_input_variables() == ["context", "question"]
+
+
+def test_templates_are_compiled_once():
+    template = "Answer {style}"
+    assert BasePrompt(template).compiled is BasePrompt(template).compiled is compile_template(template)
+
+
+def test_cached_renders_are_identical():
+    prompt = SystemRolePrompt("Keep responses {style}", cache_size=2)
+
+    first = prompt.create_message(style="brief")["content"]
+    assert prompt.create_message(style="brief")["content"] is first
+    prompt.create_message(style="long")
+    prompt.create_message(style="longer")
+    assert prompt.create_message(style="brief")["content"] == first
+    assert len(prompt._renders) == 2
+    # Equal values of different types are cached separately
+    assert prompt.format_prompt(style=1.0) == "Keep responses 1.0"
+    assert prompt.format_prompt(style=1) == "Keep responses 1"
+    assert prompt.format_prompt(style=True) == "Keep responses True"
+    # Unhashable values are rendered without caching
+    assert prompt.format_prompt(style=["a"]) == "Keep responses ['a']"
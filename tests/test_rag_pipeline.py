@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from aimakerspace.answer_cache import AnswerCache
+from aimakerspace.context_packer import ContextPacker
+from aimakerspace.rag_pipeline import RetrievalAugmentedQAPipeline
+from aimakerspace.vectordatabase import VectorDatabase
+from benchmarks.fakes import HashEmbeddingModel
+from tests.fakes import FakeChatModel, FakeEmbeddingModel
+
+TEXTS = [
+    "The mayor election is held every four years.",
+    "Candidates must register before the deadline.",
+    "Polling stations open at 8am.",
+]
+
+
+@pytest.fixture
+def pipeline():
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    asyncio.run(db.abuild_from_list(TEXTS))
+    return RetrievalAugmentedQAPipeline(
+        llm=FakeChatModel("the answer is here"), vector_db_retriever=db, include_scores=True
+    )
+
+
+def test_arun_pipeline_matches_run_pipeline(pipeline):
+    sync_result = pipeline.run_pipeline(TEXTS[1], k=2)
+    async_result = asyncio.run(pipeline.arun_pipeline(TEXTS[1], k=2))
+
+    assert async_result == sync_result
+    assert async_result["response"] == "the answer is here"
+    assert async_result["context"][0][0] == TEXTS[1]
+    assert TEXTS[1] in async_result["prompts_used"]["user"]["content"]
+
+
+def test_astream_pipeline_yields_tokens(pipeline):
+    async def collect():
+        result = await pipeline.astream_pipeline(TEXTS[0], k=1)
+        return result, [token async for token in result["response"]]
+
+    result, tokens = asyncio.run(collect())
+    assert "".join(tokens).strip() == "the answer is here"
+    assert len(tokens) == 4
+    assert result["context_count"] == 1
+
+
+@pytest.fixture
+def cached_pipeline():
+    # Hashed word embeddings, so reworded questions land close together
+    db = VectorDatabase(embedding_model=HashEmbeddingModel(dimension=64), storage="matrix")
+    asyncio.run(db.abuild_from_list(TEXTS))
+    return RetrievalAugmentedQAPipeline(
+        llm=FakeChatModel("the answer is here"),
+        vector_db_retriever=db,
+        answer_cache=AnswerCache(similarity_threshold=0.9),
+    )
+
+
+def test_answer_cache_exact_and_semantic_hits(cached_pipeline):
+    llm, cache = cached_pipeline.llm, cached_pipeline.answer_cache
+    first = cached_pipeline.run_pipeline("When is the mayor election held?", k=2)
+
+    exact = asyncio.run(cached_pipeline.arun_pipeline("  when is the MAYOR election held ", k=2))
+    similar = cached_pipeline.run_pipeline("when is the mayor election held then", k=2)
+    other_k = cached_pipeline.run_pipeline("When is the mayor election held?", k=1)
+
+    assert len(llm.calls) == 2
+    assert "cached" not in first and "cached" not in other_k
+    assert exact["cached"] == "exact" and similar["cached"] == "semantic"
+    assert exact["response"] == similar["response"] == first["response"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["semantic_hits"] == 1
+
+
+def test_answer_cache_is_invalidated_by_inserts(cached_pipeline):
+    cached_pipeline.run_pipeline("When do polling stations open?", k=1)
+    asyncio.run(cached_pipeline.vector_db_retriever.abuild_from_list(["Polls close at 8pm."]))
+
+    result = cached_pipeline.run_pipeline("When do polling stations open?", k=1)
+
+    assert "cached" not in result
+    assert len(cached_pipeline.llm.calls) == 2
+    assert cached_pipeline.answer_cache.stats()["invalidations"] == 1
+
+
+def test_answer_cache_expires_entries(cached_pipeline, monkeypatch):
+    cached_pipeline.answer_cache.ttl_seconds = 10
+    cached_pipeline.run_pipeline("When do polling stations open?", k=1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert "cached" not in cached_pipeline.run_pipeline("When do polling stations open?", k=1)
+
+
+def test_streamed_answer_is_cached_once_complete(cached_pipeline):
+    async def collect(question):
+        result = await cached_pipeline.astream_pipeline(question, k=1)
+        return result, "".join([token async for token in result["response"]])
+
+    _, streamed = asyncio.run(collect("Who must register?"))
+    result, cached = asyncio.run(collect("who must register"))
+
+    assert result["cached"] == "exact"
+    assert cached == streamed
+    assert len(cached_pipeline.llm.calls) == 1
+
+
+def test_context_packer_shapes_the_prompt(pipeline):
+    pipeline.context_packer = ContextPacker(min_relative_score=0.99)
+
+    result = pipeline.run_pipeline(TEXTS[1], k=3)
+
+    assert result["context"] == [(TEXTS[1], pytest.approx(1.0, abs=1e-5))]
+    assert TEXTS[0] not in result["prompts_used"]["user"]["content"]
+    assert result["context_packing"]["chunks_dropped"] == 2
+    assert result["context_packing"]["tokens_saved"] > 0
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from aimakerspace.text_utils import (
+    CharacterTextSplitter,
+    Document,
+    RecursiveCharacterTextSplitter,
+    TokenTextSplitter,
+)
+from aimakerspace.tokenizer import count_tokens
+from aimakerspace.vectordatabase import VectorDatabase
+from tests.fakes import FakeEmbeddingModel
+
+
+@pytest.mark.parametrize("length", [0, 5, 100, 101, 1234])
+def test_spans_match_split(length):
+    text = "".join(chr(97 + i % 26) for i in range(length))
+    splitter = CharacterTextSplitter(chunk_size=100, chunk_overlap=20)
+    assert [text[s:e] for s, e in splitter.iter_spans(text)] == splitter.split(text)
+
+
+def test_iter_split_spans_is_lazy_and_indexed():
+    splitter = CharacterTextSplitter(chunk_size=4, chunk_overlap=1)
+
+    def texts():
+        yield "abcdefg"
+        raise AssertionError("second document should not be read yet")
+
+    spans = splitter.iter_split_spans(texts())
+    assert next(spans) == (0, 0, 4)
+    assert next(spans) == (0, 3, 7)
+
+
+def test_split_documents_keeps_metadata_and_offsets():
+    splitter = CharacterTextSplitter(chunk_size=10, chunk_overlap=2)
+    documents = [Document("x" * 25, {"source": "a.txt"}), "plain string text"]
+
+    chunks = list(splitter.split_documents(documents))
+
+    assert [c.text for c in chunks] == splitter.split_texts(["x" * 25, "plain string text"])
+    assert chunks[0].metadata == {"source": "a.txt", "doc_id": 0, "start": 0, "end": 10}
+    assert chunks[-1].metadata["doc_id"] == 1
+    assert all(
+        (documents[0].text if c.metadata["doc_id"] == 0 else documents[1])[
+            c.metadata["start"]:c.metadata["end"]
+        ] == c.text
+        for c in chunks
+    )
+
+
+def test_streamed_chunks_are_embedded_with_offsets(tmp_path):
+    text = " ".join(f"word{i}" for i in range(200))
+    splitter = CharacterTextSplitter(chunk_size=50, chunk_overlap=10)
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+
+    asyncio.run(db.abuild_from_documents(splitter.split_documents([Document(text, {"source": "s"})]), batch_size=7))
+
+    assert len(db) == len(splitter.split(text))
+    key = db.search_by_text(splitter.split(text)[3], k=1, return_as_text=True)[0]
+    metadata = db.get_metadata(key)
+    assert text[metadata["start"]:metadata["end"]] == key
+
+    db.save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert loaded.get_metadata(key) == metadata
+
+
+SAMPLE = (
+    "Title line\n\n"
+    "The first paragraph talks about elections. It has two sentences.\n\n"
+    "A second, much longer paragraph follows here and it keeps going well past the "
+    "chunk size so that it must be broken on sentence and word boundaries. "
+    "Finally it ends.\n\n"
+    "城市选举。市长候选人。投票结果。"
+)
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(40, 0), (60, 15), (200, 50)])
+def test_recursive_chunks_fit_and_tile(chunk_size, overlap):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    spans = list(splitter.iter_spans(SAMPLE))
+
+    assert all(end - start <= chunk_size for start, end in spans)
+    assert spans[0][0] == 0 and spans[-1][1] == len(SAMPLE)
+    # Consecutive chunks touch or overlap, so no text is dropped
+    assert all(spans[i + 1][0] <= spans[i][1] for i in range(len(spans) - 1))
+    assert splitter.split(SAMPLE) == [SAMPLE[s:e] for s, e in spans]
+
+
+def test_recursive_prefers_coarse_boundaries():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=80, chunk_overlap=0)
+    chunks = splitter.split(SAMPLE)
+
+    assert chunks[0].startswith("Title line\n\nThe first paragraph talks about elections. It has two sentences.\n\n")
+    # Every chunk but the last ends on a separator, never mid-word
+    assert all(chunk[-1] in " \n。" for chunk in chunks[:-1])
+
+
+def test_recursive_falls_back_to_characters():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=0)
+    assert splitter.split("x" * 25) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+@pytest.mark.parametrize("splitter_class", [RecursiveCharacterTextSplitter, TokenTextSplitter])
+def test_recursive_splitters_yield_nothing_for_empty_text(splitter_class):
+    splitter = splitter_class(chunk_size=10, chunk_overlap=0)
+
+    assert splitter.split("") == []
+    assert list(splitter.split_documents([Document(""), Document("abc")])) == [
+        Document("abc", {"doc_id": 1, "start": 0, "end": 3})
+    ]
+
+
+def test_token_splitter_respects_token_budget():
+    text = " ".join(f"token{i} is here." for i in range(300))
+    splitter = TokenTextSplitter(chunk_size=32, chunk_overlap=8)
+    chunks = splitter.split(text)
+
+    assert len(chunks) > 1
+    assert "".join(chunks).replace(" ", "").startswith("token0")
+    # Piece-wise counting may be off by about a token per piece boundary
+    assert max(count_tokens(chunk) for chunk in chunks) <= 32 + 8
+    assert all(chunk.endswith((" ", ".")) for chunk in chunks)
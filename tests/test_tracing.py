@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from aimakerspace.rag_pipeline import RetrievalAugmentedQAPipeline
+from aimakerspace.tracing import Tracer, tracer
+from aimakerspace.vectordatabase import VectorDatabase
+from tests.fakes import FakeChatModel, FakeEmbeddingModel
+
+
+@pytest.fixture
+def enabled_tracer():
+    tracer.reset()
+    tracer.enabled = True
+    yield tracer
+    tracer.enabled = False
+    tracer.reset()
+
+
+@pytest.fixture
+def pipeline():
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    asyncio.run(db.abuild_from_list(["The mayor is elected.", "Polls open at 8am."]))
+    return RetrievalAugmentedQAPipeline(llm=FakeChatModel("an answer"), vector_db_retriever=db)
+
+
+def test_disabled_tracer_records_nothing():
+    local = Tracer()
+    with local.span("search") as first, local.span("llm") as second:
+        pass
+    local.count("tokens_total", 10)
+
+    assert first is second  # the shared no-op span
+    assert local.render_prometheus() == "\n"
+
+
+def test_spans_and_counters_render_as_prometheus():
+    local = Tracer(enabled=True, buckets=(0.1, 1.0))
+    local.observe("search", 0.05, mode="hybrid")
+    local.observe("search", 0.5, mode="hybrid")
+    local.count("tokens_total", 12, kind="prompt")
+    local.add_collector("answer_cache", lambda: {"hit_rate": 0.5, "entries": 3, "note": "x"})
+
+    text = local.render_prometheus()
+
+    assert 'rag_stage_seconds_bucket{stage="search",mode="hybrid",le="0.1"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="search",mode="hybrid",le="+Inf"} 2' in text
+    assert 'rag_stage_seconds_count{stage="search",mode="hybrid"} 2' in text
+    assert 'rag_tokens_total{kind="prompt"} 12' in text
+    assert "rag_answer_cache_hit_rate 0.5" in text and "note" not in text
+
+
+def test_timing_breakdown_works_without_enabling_metrics(pipeline):
+    result = pipeline.run_pipeline("Who is elected?", k=1, timings=True)
+
+    assert {"embed_query", "search", "llm", "rag_request"} <= set(result["timings"])
+    assert "timings" not in pipeline.run_pipeline("Who is elected?", k=1)
+    assert tracer.render_prometheus() == "\n"
+
+
+def test_pipeline_feeds_metrics(pipeline, enabled_tracer):
+    asyncio.run(pipeline.arun_pipeline("Who is elected?", k=1))
+
+    text = enabled_tracer.render_prometheus()
+    for stage in ("rag_request", "search", "llm"):
+        assert f'rag_stage_seconds_count{{stage="{stage}"' in text
+    assert 'rag_tokens_total{kind="completion"}' in text
+
+
+def test_stream_breakdown_includes_llm_once_consumed(pipeline):
+    async def consume():
+        result = await pipeline.astream_pipeline("When do polls open?", k=1, timings=True)
+        tokens = [token async for token in result["response"]]
+        return result, tokens
+
+    result, tokens = asyncio.run(consume())
+
+    assert "".join(tokens).strip() == "an answer"
+    assert {"search", "llm_first_token", "llm"} <= set(result["timings"])
+
+
+def test_traced_iter_times_the_producer(enabled_tracer):
+    items = list(enabled_tracer.traced_iter("load", iter(range(3)), loader="txt"))
+
+    assert items == [0, 1, 2]
+    assert 'rag_stage_seconds_count{stage="load",loader="txt"} 1' in enabled_tracer.render_prometheus()
@@ -0,0 +1,444 @@
+import asyncio
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from aimakerspace.bm25_index import BM25Index
+from aimakerspace.text_utils import Document
+from aimakerspace.vectordatabase import VectorDatabase, cosine_similarity
+from tests.fakes import FakeEmbeddingModel
+
+
+TEXTS = [
+    "I like to eat broccoli and bananas.",
+    "I ate a banana and spinach smoothie for breakfast.",
+    "Chinchillas and kittens are cute.",
+    "My sister adopted a kitten yesterday.",
+    "Look at this cute hamster munching on a piece of broccoli.",
+]
+
+
+def build(storage):
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage=storage)
+    return asyncio.run(db.abuild_from_list(TEXTS))
+
+
+def test_invalid_storage_mode():
+    with pytest.raises(ValueError):
+        VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="list")
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 10])
+def test_matrix_search_matches_dict_search(k):
+    dict_db, matrix_db = build("dict"), build("matrix")
+    query = FakeEmbeddingModel().get_embedding("I think fruit is awesome!")
+
+    expected = dict_db.search(query, k=k)
+    actual = matrix_db.search(query, k=k)
+
+    assert [key for key, _ in actual] == [key for key, _ in expected]
+    np.testing.assert_allclose(
+        [score for _, score in actual], [score for _, score in expected], rtol=1e-5
+    )
+
+
+def test_matrix_search_by_text_and_retrieve():
+    db = build("matrix")
+    assert len(db) == len(TEXTS)
+    assert db.search_by_text(TEXTS[2], k=1, return_as_text=True) == [TEXTS[2]]
+
+    vector = db.retrieve_from_key(TEXTS[0])
+    assert vector.dtype == np.float32
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert db.retrieve_from_key("missing") is None
+
+
+def test_matrix_insert_grows_and_overwrites():
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        db.insert(f"key-{i}", rng.standard_normal(8))
+    assert len(db) == 200
+
+    db.insert("key-5", np.ones(8))
+    assert len(db) == 200
+    assert db.search(np.ones(8), k=1)[0][0] == "key-5"
+
+    with pytest.raises(ValueError):
+        db.insert("bad", np.ones(4))
+
+
+def test_matrix_search_with_custom_distance_measure():
+    db = build("matrix")
+    query = np.asarray(FakeEmbeddingModel().get_embedding(TEXTS[1]))
+    neg_euclidean = lambda a, b: -np.linalg.norm(np.asarray(a) / np.linalg.norm(a) - b)
+    assert db.search(query, k=1, distance_measure=neg_euclidean)[0][0] == TEXTS[1]
+    assert db.search(query, k=1, distance_measure=cosine_similarity)[0][0] == TEXTS[1]
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_search_many_matches_single_search(storage, k):
+    db = build(storage)
+    queries = [FakeEmbeddingModel().get_embedding(text) for text in TEXTS + ["fruit"]]
+
+    batched = db.search_many(queries, k=k)
+
+    assert len(batched) == len(queries)
+    for query, results in zip(queries, batched):
+        expected = db.search(query, k=k)
+        assert [key for key, _ in results] == [key for key, _ in expected]
+        np.testing.assert_allclose(
+            [s for _, s in results], [s for _, s in expected], rtol=1e-5
+        )
+
+
+def test_asearch_many_by_text_uses_one_embedding_call():
+    db = build("matrix")
+    calls = []
+    original = db.embedding_model.async_get_embeddings
+
+    async def counting(list_of_text):
+        calls.append(list(list_of_text))
+        return await original(list_of_text)
+
+    db.embedding_model.async_get_embeddings = counting
+    results = asyncio.run(db.asearch_many_by_text(TEXTS[:3], k=1, return_as_text=True))
+
+    assert calls == [TEXTS[:3]]
+    assert results == [[TEXTS[0]], [TEXTS[1]], [TEXTS[2]]]
+    assert asyncio.run(db.asearch_many_by_text([], k=1)) == []
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load_round_trip(tmp_path, storage, mmap):
+    db = build(storage)
+    db.save(str(tmp_path / "store"))
+
+    loaded = VectorDatabase.load(
+        str(tmp_path / "store"), embedding_model=FakeEmbeddingModel(), mmap=mmap
+    )
+
+    assert loaded.storage == "matrix"
+    assert len(loaded) == len(TEXTS)
+    assert isinstance(loaded._matrix, np.memmap) == mmap
+    query = FakeEmbeddingModel().get_embedding("fruit")
+    assert [key for key, _ in loaded.search(query, k=3)] == [
+        key for key, _ in db.search(query, k=3)
+    ]
+
+
+def test_loaded_memmap_store_accepts_writes(tmp_path):
+    build("matrix").save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+
+    loaded.insert(TEXTS[0], -np.asarray(FakeEmbeddingModel().get_embedding(TEXTS[0])))
+    loaded.insert("new text", FakeEmbeddingModel().get_embedding("new text"))
+
+    assert len(loaded) == len(TEXTS) + 1
+    assert loaded.search_by_text("new text", k=1, return_as_text=True) == ["new text"]
+    # The file on disk is untouched by in-memory writes.
+    reloaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert len(reloaded) == len(TEXTS)
+    assert reloaded.search_by_text(TEXTS[0], k=1, return_as_text=True) == [TEXTS[0]]
+
+
+def test_load_missing_store_raises(tmp_path):
+    with pytest.raises(ValueError):
+        VectorDatabase.load(str(tmp_path / "missing"), embedding_model=FakeEmbeddingModel())
+
+
+def test_saving_over_a_store_swaps_generations(tmp_path):
+    db = build("matrix")
+    db.save(str(tmp_path))
+    first = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    db.delete(TEXTS[:2])
+    db.save(str(tmp_path))
+
+    generations = [name for name in os.listdir(tmp_path) if name.startswith("gen-")]
+    assert len(generations) == 1
+    # The earlier mapping still reads the old generation's rows
+    assert first.search_by_text(TEXTS[0], k=1, return_as_text=True) == [TEXTS[0]]
+    second = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert second.search_by_text(TEXTS[2], k=1, return_as_text=True) == [TEXTS[2]]
+    assert len(second) == len(TEXTS) - 2
+
+
+def test_save_writes_a_snapshot_taken_before_concurrent_inserts(tmp_path):
+    db = build("matrix")
+    snapshot = db._snapshot
+
+    def snapshot_then_insert():
+        taken = snapshot()
+        db.insert("inserted mid-save", np.ones(16))
+        return taken
+
+    db._snapshot = snapshot_then_insert
+    saved_version = db.save(str(tmp_path))
+
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert len(loaded) == len(TEXTS)
+    assert saved_version == db.version - 1
+    assert loaded.search_by_text(TEXTS[4], k=1, return_as_text=True) == [TEXTS[4]]
+
+
+def test_overlapping_saves_leave_one_generation(tmp_path):
+    db = build("matrix")
+    threads = [threading.Thread(target=db.save, args=(str(tmp_path),)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("gen-")]) == 1
+    assert len(VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())) == len(TEXTS)
+
+
+def test_load_rereads_a_sidecar_replaced_by_a_concurrent_save(tmp_path, monkeypatch):
+    db = build("matrix")
+    db.save(str(tmp_path))
+    stale = VectorDatabase._read_sidecar(str(tmp_path))
+    db.delete(TEXTS[:1])
+    db.save(str(tmp_path))
+    reads = []
+    read_sidecar = VectorDatabase._read_sidecar.__func__
+
+    def read_stale_first(cls, path):
+        reads.append(path)
+        return stale if len(reads) == 1 else read_sidecar(cls, path)
+
+    monkeypatch.setattr(VectorDatabase, "_read_sidecar", classmethod(read_stale_first))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+
+    assert len(reads) == 2
+    assert len(loaded) == len(TEXTS) - 1
+
+
+def test_load_reads_stores_without_generations(tmp_path):
+    db = build("matrix")
+    db.save(str(tmp_path))
+    sidecar = VectorDatabase._read_sidecar(str(tmp_path))
+    generation_dir = tmp_path / f"gen-{sidecar.pop('generation')}"
+    os.replace(generation_dir / "embeddings.f32", tmp_path / "embeddings.f32")
+    generation_dir.rmdir()
+    sidecar["format_version"] = 1
+    (tmp_path / "index.json").write_text(json.dumps(sidecar), encoding="utf-8")
+
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert loaded.search_by_text(TEXTS[3], k=1, return_as_text=True) == [TEXTS[3]]
+
+    loaded.save(str(tmp_path))
+    assert not (tmp_path / "embeddings.f32").exists()
+
+
+def test_load_with_another_embedding_model_raises(tmp_path):
+    build("matrix").save(str(tmp_path))
+    other_model = FakeEmbeddingModel()
+    other_model.embeddings_model_name = "other-embedding"
+
+    with pytest.raises(ValueError, match="fake-embedding"):
+        VectorDatabase.load(str(tmp_path), embedding_model=other_model)
+
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    assert loaded.embedding_model_name == "fake-embedding"
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+def test_lexical_search_needs_no_embedding_call(storage):
+    db = build(storage)
+    calls = db.embedding_model.calls
+
+    results = db.search_by_text("kitten adopted", k=2, mode="lexical", return_as_text=True)
+
+    assert results[0] == "My sister adopted a kitten yesterday."
+    assert db.embedding_model.calls == calls
+
+
+def test_hybrid_search_fuses_lexical_and_vector_rankings():
+    db = build("matrix")
+    query = "hamster broccoli"
+    vector = db.search_by_text(query, k=5, return_as_text=True)
+    lexical = db.search_by_text(query, k=5, mode="lexical", return_as_text=True)
+
+    hybrid = db.search_by_text(query, k=3, mode="hybrid")
+
+    # The only text matching both keywords ranks first whatever its vector rank
+    assert hybrid[0][0] == lexical[0] == TEXTS[4]
+    assert set(key for key, _ in hybrid) <= set(vector) | set(lexical)
+    assert asyncio.run(db.asearch_by_text(query, k=3, mode="hybrid")) == hybrid
+    assert asyncio.run(db.asearch_many_by_text([query], k=3, mode="hybrid")) == [hybrid]
+
+
+def test_invalid_search_mode():
+    with pytest.raises(ValueError):
+        build("matrix").search_by_text("kitten", k=1, mode="fuzzy")
+
+
+def test_loaded_store_rebuilds_lexical_index(tmp_path):
+    build("matrix").save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    loaded.insert("A chinchilla ate broccoli.", np.ones(16))
+
+    results = loaded.search_lexical("chinchilla", k=5)
+
+    assert [key for key, _ in results] == ["A chinchilla ate broccoli."]
+
+
+def test_async_search_builds_lexical_index_once_off_the_event_loop(tmp_path, monkeypatch):
+    build("matrix").save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+    builds = []
+    add_many = BM25Index.add_many
+
+    def recording_add_many(index, keys):
+        builds.append(threading.get_ident())
+        return add_many(index, keys)
+
+    async def main():
+        queries = [loaded.asearch_by_text("kitten", k=2, mode=mode) for mode in ("lexical", "hybrid")]
+        results = await asyncio.gather(*queries)
+        return threading.get_ident(), results
+
+    monkeypatch.setattr(BM25Index, "add_many", recording_add_many)
+    loop_thread, (lexical, hybrid) = asyncio.run(main())
+
+    assert len(builds) == 1 and builds[0] != loop_thread
+    assert lexical and hybrid
+
+
+def build_with_metadata(storage):
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage=storage)
+    metadatas = [{"source": f"doc{i % 2}.txt", "page": i} for i in range(len(TEXTS))]
+    return asyncio.run(db.abuild_from_list(TEXTS, metadatas))
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+def test_filtered_search_only_scores_matching_records(storage):
+    db = build_with_metadata(storage)
+    query = FakeEmbeddingModel().get_embedding(TEXTS[1])
+
+    results = db.search(query, k=5, filter={"source": "doc0.txt"})
+    expected = [key for key, _ in db.search(query, k=5) if db.get_metadata(key)["source"] == "doc0.txt"]
+
+    assert [key for key, _ in results] == expected
+    assert len(results) == 3
+    assert db.search(query, k=5, filter={"page": {"$gte": 3}, "source": "doc1.txt"})[0][0] == TEXTS[3]
+    assert db.search(query, k=5, filter={"source": "none"}) == []
+
+
+def test_filter_applies_to_every_search_path():
+    db = build_with_metadata("matrix")
+    only_odd = {"source": "doc1.txt"}
+    allowed = {TEXTS[1], TEXTS[3]}
+    query = FakeEmbeddingModel().get_embedding("kittens")
+
+    assert {key for key, _ in db.search_many([query, query], k=5, filter=only_odd)[1]} == allowed
+    assert {key for key, _ in db.search_lexical("a", k=5, filter=only_odd)} <= allowed
+    for mode in VectorDatabase.SEARCH_MODES:
+        assert set(db.search_by_text("kitten", k=5, mode=mode, filter=only_odd, return_as_text=True)) <= allowed
+    db.build_index(n_lists=2)
+    assert {key for key, _ in db.search(query, k=5, filter=only_odd, nprobe=2)} == allowed
+
+
+def test_records_get_ingest_time_and_metadata_survives_save(tmp_path):
+    db = build_with_metadata("matrix")
+    assert db.get_metadata(TEXTS[0])["ingested_at"] > 0
+
+    db.save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+
+    assert loaded.get_metadata(TEXTS[2]) == db.get_metadata(TEXTS[2])
+    assert {key for key, _ in loaded.search_lexical("kitten", k=5, filter={"page": 3})} == {TEXTS[3]}
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+def test_deleted_records_disappear_from_every_search(storage):
+    db = build_with_metadata(storage)
+    version = db.version
+    query = FakeEmbeddingModel().get_embedding("kittens")
+
+    assert db.delete([TEXTS[2], "missing"]) == 1
+    assert db.delete_where({"source": "doc1.txt"}) == 2
+    live = {TEXTS[0], TEXTS[4]}
+
+    assert db.version > version
+    assert len(db) == 2 and db.get_metadata(TEXTS[2]) is None
+    assert {key for key, _ in db.search(query, k=5)} == live
+    assert {key for key, _ in db.search_many([query], k=5)[0]} == live
+    for mode in VectorDatabase.SEARCH_MODES:
+        assert set(db.search_by_text("kitten broccoli", k=5, mode=mode, return_as_text=True)) <= live
+    with pytest.raises(ValueError):
+        db.delete_where({})
+
+
+def test_deleted_key_can_be_inserted_again():
+    db = build("matrix")
+    vector = db.retrieve_from_key(TEXTS[0])
+    db.delete([TEXTS[0]])
+    assert db.retrieve_from_key(TEXTS[0]) is None
+
+    db.insert(TEXTS[0], vector, {"source": "new.txt"})
+
+    assert len(db) == len(TEXTS)
+    assert db.search(vector, k=1)[0][0] == TEXTS[0]
+    assert db.keys_where({"source": "new.txt"}) == [TEXTS[0]]
+
+
+@pytest.mark.parametrize("storage", ["dict", "matrix"])
+def test_compaction_reclaims_deleted_rows(storage):
+    db = build_with_metadata(storage)
+    if storage == "matrix":
+        db.build_index(n_lists=2)
+    db.search_lexical("kitten", k=5)
+    query = FakeEmbeddingModel().get_embedding("kittens")
+    db.delete_where({"source": "doc1.txt"})
+    before = db.search(query, k=5, nprobe=2) if storage == "matrix" else db.search(query, k=5)
+    assert db.dead_fraction == pytest.approx(2 / 5)
+
+    assert asyncio.run(db.acompact()) == 2
+
+    assert db.dead_fraction == 0 and len(db) == 3
+    after = db.search(query, k=5, nprobe=2) if storage == "matrix" else db.search(query, k=5)
+    assert [key for key, _ in after] == [key for key, _ in before]
+    assert db.keys_where({"source": "doc0.txt"}) == [TEXTS[0], TEXTS[2], TEXTS[4]]
+    assert {key for key, _ in db.search_lexical("kittens", k=5)} == {TEXTS[2]}
+    assert db.compact() == 0
+
+
+def test_compaction_is_abandoned_if_the_database_changed():
+    db = build("matrix")
+    db.delete([TEXTS[0]])
+    plan = db._prepare_compaction()
+    db.insert("a late insert", FakeEmbeddingModel().get_embedding("a late insert"))
+
+    assert db._apply_compaction(plan) == 0
+    assert db.dead_fraction > 0 and len(db) == len(TEXTS)
+
+
+def test_save_writes_only_live_records(tmp_path):
+    db = build_with_metadata("matrix")
+    db.delete([TEXTS[1]])
+    db.save(str(tmp_path))
+
+    loaded = VectorDatabase.load(str(tmp_path), embedding_model=FakeEmbeddingModel())
+
+    assert len(loaded) == len(TEXTS) - 1 and loaded.dead_fraction == 0
+    assert loaded.retrieve_from_key(TEXTS[1]) is None
+
+
+def test_upsert_replaces_a_documents_chunks():
+    db = VectorDatabase(embedding_model=FakeEmbeddingModel(), storage="matrix")
+    old = [Document(text, {"source": "a.txt"}) for text in TEXTS[:3]]
+    other = [Document(TEXTS[4], {"source": "b.txt"})]
+    asyncio.run(db.abuild_from_documents(old + other))
+
+    new = [Document(TEXTS[1], {"source": "a.txt"}), Document(TEXTS[3], {"source": "a.txt"})]
+    deleted = asyncio.run(db.aupsert_documents(new))
+
+    assert deleted == 2
+    assert set(db.keys_where({"source": "a.txt"})) == {TEXTS[1], TEXTS[3]}
+    assert db.keys_where({"source": "b.txt"}) == [TEXTS[4]]